@@ -32,9 +32,12 @@ INSTALLED_APPS = [
     
     # Local
     'trips',
+    'tooling',  # differential harness and benchmarks: no models, not imported by the request path
 ]
 
 MIDDLEWARE = [
+    'trips.middleware.ServerTimingMiddleware',      # outermost, so `total` covers every layer
+    'trips.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -154,11 +157,144 @@ HOS_CONFIG = {
         'MAX_7DAY_HOURS': 60,
         'MAX_8DAY_HOURS': 70,             # §395.3(b)
         'RESTART_HOURS': 34,              # §395.3(c)
+        'CITATIONS': {
+            'driving': '§395.3(a)(3)',
+            'window': '§395.3(a)(2)',
+            'off_duty': '§395.3(a)(1)',
+            'break': '§395.3(a)(3)(ii)',
+            'cycle': '§395.3(b)',
+        },
+    },
+    'PASSENGER_CARRYING': {
+        'MAX_DAILY_DRIVING': 10,          # §395.5(a)(1)
+        'MAX_DAILY_WINDOW': 15,           # §395.5(a)(2), on-duty limit
+        'MIN_OFF_DUTY': 8,                # §395.5(a)(1)
+        'BREAK_AFTER_HOURS': None,        # no 30-minute break rule
+        'BREAK_DURATION': 0,
+        'MAX_7DAY_HOURS': 60,             # §395.5(b)(1)
+        'MAX_8DAY_HOURS': 70,             # §395.5(b)(2)
+        'RESTART_HOURS': None,            # no restart provision
+        'CITATIONS': {
+            'driving': '§395.5(a)(1)',
+            'window': '§395.5(a)(2)',
+            'off_duty': '§395.5(a)(1)',
+            'cycle': '§395.5(b)',
+        },
+    },
+    # Rule sets a trip can be planned under: a base limits block plus
+    # overrides (state intrastate rules adopt the federal rules with
+    # longer daily limits)
+    'RULE_SETS': {
+        'property': {
+            'LABEL': 'Property-carrying CMV (interstate)',
+            'BASE': 'PROPERTY_CARRYING',
+        },
+        'passenger': {
+            'LABEL': 'Passenger-carrying CMV (interstate)',
+            'BASE': 'PASSENGER_CARRYING',
+        },
+        'texas_intrastate': {
+            'LABEL': 'Texas intrastate, property-carrying',
+            'BASE': 'PROPERTY_CARRYING',
+            'MAX_DAILY_DRIVING': 12,      # 37 TAC §4.12
+            'MAX_DAILY_WINDOW': 15,
+            'MIN_OFF_DUTY': 8,
+            'MAX_7DAY_HOURS': 70,
+            'CYCLE_DAYS': 7,
+            'CITATIONS': {'*': '37 TAC §4.12'},
+        },
+        'california_intrastate': {
+            'LABEL': 'California intrastate, property-carrying',
+            'BASE': 'PROPERTY_CARRYING',
+            'MAX_DAILY_DRIVING': 12,      # 13 CCR §1212.5
+            'MAX_DAILY_WINDOW': 16,
+            'MAX_8DAY_HOURS': 80,
+            'CITATIONS': {'*': '13 CCR §1212.5'},
+        },
     },
+    'DEFAULT_RULE_SET': 'property',
     'ASSUMPTIONS': {
         'FUEL_STOP_INTERVAL': 1000,       # miles
         'FUEL_STOP_DURATION': 1,          # hour
         'LOAD_UNLOAD_TIME': 1,            # hour
+        'INSPECTION_TIME': 0.5,           # pre/post-trip inspection, hours
         'AVERAGE_SPEED': 55,              # mph
     }
-}
\ No newline at end of file
+}
+
+# Batch trip planning (/api/trips/batch/)
+TRIP_BATCH = {
+    'MAX_TRIPS': int(os.getenv('TRIP_BATCH_MAX_TRIPS', '1000')),
+    # Processes per web worker (each has its own pool); defaults to the CPU count,
+    # lower it so web workers x this stays within the CPUs
+    'MAX_WORKERS': int(os.getenv('TRIP_BATCH_MAX_WORKERS', str(os.cpu_count() or 1))),
+    'MIN_PARALLEL_TRIPS': 2,              # smaller batches run inline
+}
+
+# Content-addressed cache for trip calculations (in-process LRU, then CACHES[BACKEND])
+TRIP_CALC_CACHE = {
+    'ENABLED': os.getenv('TRIP_CALC_CACHE_ENABLED', 'True') == 'True',
+    'MAX_ENTRIES': 512,
+    'TTL_SECONDS': 3600,
+    'BACKEND': 'default',
+}
+
+
+# Local road-network routing (build the graph with `manage.py build_road_graph`)
+ROUTING = {
+    'GRAPH_FILE': os.getenv('ROUTING_GRAPH_FILE', str(BASE_DIR / 'trips' / 'data' / 'road_graph.bin')),
+    'DETOUR_FACTOR': 1.2,                 # road miles per air mile without a graph path
+    'ROUTE_CACHE_SIZE': 65536,            # memoized node-pair routes per process
+}
+
+# Precomputed lane matrix consulted before routing (build with `manage.py build_lane_matrix`)
+LANE_MATRIX = {
+    'FILE': os.getenv('LANE_MATRIX_FILE', str(BASE_DIR / 'trips' / 'data' / 'lane_matrix.bin')),
+    'LOCATIONS': [],                      # "City, ST" strings; empty = every gazetteer city
+}
+
+# Rendered log sheets (/api/trip/<id>/pdf/ and /svg/), cached by page content hash
+LOG_SHEET = {
+    'CACHE_ENABLED': os.getenv('LOG_SHEET_CACHE_ENABLED', 'True') == 'True',
+    'CACHE_ENTRIES': 256,
+    'CACHE_TTL_SECONDS': 86400,
+}
+
+# Async (ASGI) trip endpoints: HOS work runs on a bounded thread pool per worker
+ASYNC_TRIPS = {
+    'MAX_WORKERS': int(os.getenv('ASYNC_TRIPS_MAX_WORKERS', '4')),
+    'MAX_QUEUED': int(os.getenv('ASYNC_TRIPS_MAX_QUEUED', '64')),   # waiting calculations before 503
+}
+
+# Background planning jobs (manage.py run_planning_worker)
+PLANNING_JOBS = {
+    'POLL_SECONDS': float(os.getenv('PLANNING_JOBS_POLL_SECONDS', '1')),
+    'HEARTBEAT_SECONDS': 30,              # how often a running job reports it is alive
+    'STALE_SECONDS': int(os.getenv('PLANNING_JOBS_STALE_SECONDS', '300')),  # no heartbeat this long = worker died
+    'MAX_ATTEMPTS': 3,
+}
+
+# Per-request phase timing (Server-Timing header, /api/timing/)
+SERVER_TIMING = {
+    'ENABLED': os.getenv('SERVER_TIMING_ENABLED', 'True') == 'True',
+    'SAMPLES': 1024,                      # recent durations kept per endpoint and phase
+}
+
+# Metrics registry served at /metrics (Prometheus text format). With several
+# gunicorn workers set METRICS_DIR to a directory local to the host; each worker
+# writes its snapshot there, a scrape merges them all and deletes those of exited workers.
+METRICS = {
+    'DIR': os.getenv('METRICS_DIR', ''),  # empty = this process only
+    'FLUSH_SECONDS': 1.0,                 # snapshot writes per worker, at most
+}
+
+# Negotiated response compression (brotli when the `brotli` package is installed, else gzip)
+COMPRESSION = {
+    'ENABLED': os.getenv('COMPRESSION_ENABLED', 'True') == 'True',
+    'MIN_BYTES': 1024,                    # smaller bodies are sent as is
+    'BROTLI_QUALITY': 5,                  # 0-11; 5 compresses well at gzip-like speed
+    'TYPES': [
+        'application/json', 'application/vnd.eld.compact+json', 'application/x-ndjson',
+        'application/jsonl', 'text/csv', 'text/plain', 'image/svg+xml',
+    ],
+}
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from trips.views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('trips.urls')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""
+Development tooling for the trips app
+
+The pre-engine calculators and the differential harness that compares
+them with the HOS engine, the benchmark suite, and the management
+commands that run them.
+Only tests and these commands import this package; nothing in the
+request path does.
+"""
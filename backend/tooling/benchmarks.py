@@ -0,0 +1,243 @@
+"""
+Benchmark suite for the HOS calculators and the trip API path
+
+Each benchmark times one entry point over a sweep of trip lengths (log
+days) or batch sizes and records min/median/mean/max wall time per call.
+`manage.py run_benchmarks` writes the results to a JSON file and
+`manage.py compare_benchmarks` diffs two such files, so a slowdown can be
+caught before deploy.
+
+Routing is pinned to a synthetic route of the requested length, so the
+numbers measure HOS work rather than the road graph (and trips far longer
+than any US lane can be planned). The calculation cache is switched off
+while timing, and API calls run inside a rolled-back transaction.
+"""
+
+import math
+import platform
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from unittest import mock
+
+import django
+from django.conf import settings
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from trips.hos_calculator import HOSCalculator
+from trips.models import Trip
+from trips.rule_plan import get_rule_plan
+from trips.serializers import EldLogSerializer, TripInputSerializer
+from trips.services.calc_cache import calculation_cache
+from trips.services.eld_calculator import ELDCalculator
+from trips.services.trip_store import build_eld_log
+
+RESULTS_VERSION = 1
+
+DAY_SWEEP = (1, 7, 14, 30, 60, 90)
+BATCH_SWEEP = (1, 100, 1000, 10000)
+
+# Subset used by --quick (and the test suite)
+QUICK_DAY_SWEEP = (1, 7)
+QUICK_BATCH_SWEEP = (1, 100)
+
+# Relative median slowdown reported as a regression
+DEFAULT_THRESHOLD = 0.10
+
+TRIP_INPUT = {
+    'current_location': 'Dallas, TX',
+    'pickup_location': 'Houston, TX',
+    'dropoff_location': 'Atlanta, GA',
+    'current_cycle_used': 10,
+}
+
+
+def synthetic_route(days, plan=None):
+    """Route whose driving time fills `days` log days at the plan's daily limit"""
+    plan = plan or get_rule_plan()
+    speed = settings.HOS_CONFIG['ASSUMPTIONS']['AVERAGE_SPEED']
+    driving_hours = days * plan.max_driving_hours
+    return {
+        'distance_miles': round(driving_hours * speed, 1),
+        'driving_hours': driving_hours,
+        'estimated_days': days,
+        'average_speed': speed,
+        'note': 'Synthetic benchmark route',
+    }
+
+
+@contextmanager
+def calculation_cache_disabled():
+    enabled = calculation_cache.enabled
+    calculation_cache.enabled = False
+    try:
+        yield
+    finally:
+        calculation_cache.enabled = enabled
+
+
+@contextmanager
+def rolled_back():
+    """Run a block in a transaction that is always rolled back"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def time_calls(func, repeat):
+    """Call `func` `repeat` times; wall-time statistics in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        'runs': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'max': max(timings),
+    }
+
+
+def bench_hos_calculator(days):
+    route = synthetic_route(days)
+    start = date(2024, 1, 1)
+
+    def run():
+        HOSCalculator(TRIP_INPUT, start_date=start).calculate_trip(
+            distance_miles=route['distance_miles'],
+            driving_hours=route['driving_hours']
+        )
+    return run
+
+
+def bench_eld_calculator(days):
+    route = synthetic_route(days)
+    trip = Trip(**TRIP_INPUT)
+
+    def run():
+        with mock.patch('trips.services.eld_calculator.estimate_route', return_value=route):
+            ELDCalculator(trip).calculate_trip()
+    return run
+
+
+def bench_trip_view(days):
+    route = synthetic_route(days)
+    client = Client()
+    url = reverse('trip-calculator')
+
+    def run():
+        with mock.patch('trips.views.TripCalculatorView.calculate_route_info', return_value=route):
+            response = client.post(url, TRIP_INPUT, content_type='application/json')
+        if response.status_code != 201:
+            raise RuntimeError(f'Trip request failed with {response.status_code}: {response.content[:200]!r}')
+    return run
+
+
+def bench_trip_input_serializer(batch_size):
+    trips = [dict(TRIP_INPUT, current_cycle_used=i % 70) for i in range(batch_size)]
+
+    def run():
+        serializer = TripInputSerializer(data=trips, many=True)
+        if not serializer.is_valid():
+            raise RuntimeError('Benchmark trips failed validation')
+    return run
+
+
+def bench_eld_log_serializer(days):
+    route = synthetic_route(days)
+    trip = Trip(**TRIP_INPUT)
+    eld_logs = HOSCalculator(TRIP_INPUT, start_date=date(2024, 1, 1))._calculate_trip(
+        route['distance_miles'], route['driving_hours']
+    )
+    logs = [build_eld_log(trip, day) for day in eld_logs]
+
+    def run():
+        EldLogSerializer(logs, many=True).data
+    return run
+
+
+# name -> (sweep parameter, full sweep, quick sweep, factory)
+BENCHMARKS = {
+    'hos_calculator.calculate_trip': ('days', DAY_SWEEP, QUICK_DAY_SWEEP, bench_hos_calculator),
+    'eld_calculator.calculate_trip': ('days', DAY_SWEEP, QUICK_DAY_SWEEP, bench_eld_calculator),
+    'trip_view.post': ('days', DAY_SWEEP, QUICK_DAY_SWEEP, bench_trip_view),
+    'trip_input_serializer.validate': ('batch', BATCH_SWEEP, QUICK_BATCH_SWEEP, bench_trip_input_serializer),
+    'eld_log_serializer.data': ('days', DAY_SWEEP, QUICK_DAY_SWEEP, bench_eld_log_serializer),
+}
+
+
+def repeat_for(size, repeat):
+    """Fewer runs for the largest inputs so a full sweep stays within minutes"""
+    if size >= 1000:
+        return max(1, math.ceil(repeat / 5))
+    return repeat
+
+
+def run_benchmarks(repeat=5, quick=False, only=None, progress=None):
+    """
+    Run the suite and return a results document
+
+    `only` is a list of substrings; benchmarks whose case name contains
+    none of them are skipped. `progress` is called with each case name
+    and its statistics.
+    """
+    results = {}
+    with calculation_cache_disabled(), rolled_back(), \
+            override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+        for name, (param, sweep, quick_sweep, factory) in BENCHMARKS.items():
+            for size in (quick_sweep if quick else sweep):
+                case = f'{name}[{param}={size}]'
+                if only and not any(pattern in case for pattern in only):
+                    continue
+                run = factory(size)
+                run()  # warm-up: imports, plan compilation, URL resolver
+                stats = time_calls(run, repeat_for(size, repeat))
+                results[case] = {'benchmark': name, param: size, **stats}
+                if progress:
+                    progress(case, stats)
+
+    return {
+        'version': RESULTS_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'machine': platform.platform(),
+        'quick': quick,
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Rows comparing median times of the cases in two results documents
+
+    Each row has the case name, both medians (None when the case is
+    missing on one side), the current/baseline ratio and a verdict:
+    'regression', 'improvement', 'unchanged', 'added' or 'removed'.
+    """
+    old = baseline.get('results', {})
+    new = current.get('results', {})
+    rows = []
+    for case in list(old) + [case for case in new if case not in old]:
+        before = old.get(case, {}).get('median')
+        after = new.get(case, {}).get('median')
+        ratio = None
+        if before is None:
+            verdict = 'added'
+        elif after is None:
+            verdict = 'removed'
+        else:
+            ratio = after / before if before else math.inf
+            if ratio > 1 + threshold:
+                verdict = 'regression'
+            elif ratio < 1 - threshold:
+                verdict = 'improvement'
+            else:
+                verdict = 'unchanged'
+        rows.append({'case': case, 'baseline': before, 'current': after, 'ratio': ratio, 'verdict': verdict})
+    return rows
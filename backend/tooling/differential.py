@@ -0,0 +1,283 @@
+"""
+Differential harness: the pre-engine calculators vs the HOS engine
+
+A seeded generator produces trip scenarios (rule set, distance from 30
+to 15,000 miles on a log scale, average speed, where the pickup falls,
+cycle hours used or a per-day history, start date). Each scenario is run
+through the legacy loop (tooling.legacy_hos) and the engine-backed code of
+every entry point, with the calculation cache off, and the two results
+are compared on:
+
+    day_count             number of log days
+    total_driving_hours   driving over the whole trip (1-minute tolerance)
+    daily_driving_hours   driving per day
+    daily_on_duty_hours   driving plus on-duty time per day
+    compliance            days reported non-compliant (not kept by ELDCalculator)
+
+Divergences are expected: the old loops used fixed overheads and speeds
+and did not simulate the duty-status changes along the route. The
+report counts them per check so a migration can be reviewed with
+evidence, and also checks invariants of the engine itself (driving
+equals the routed minutes, every day covers 24 hours, no violations),
+which must never fail.
+
+The reported speedup is below 1 and that is accepted (see the
+hos_engine module docstring): on 1,500 scenarios it was about 0.7x for
+trip_view and hos_calculator and 0.3x for eld_calculator, whose old
+loop only filled a fixed template per day.
+"""
+
+import math
+import random
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+
+from trips.hos_calculator import HOSCalculator
+from trips.hos_engine import MINUTES_PER_DAY, hours_to_minutes, iter_eld_logs, legs_from_route
+from trips.models import Trip
+from trips.rule_plan import get_rule_plan
+from trips.services.eld_calculator import ELDCalculator
+
+from .benchmarks import calculation_cache_disabled
+from .legacy_hos import LegacyELDCalculator, LegacyHOSCalculator, LegacyTripViewCalculator
+
+REPORT_VERSION = 1
+
+MIN_MILES = 30
+MAX_MILES = 15000
+SPEED_RANGE = (45, 65)
+FIRST_START_DATE = date(2024, 1, 1)
+
+CHECKS = ('day_count', 'total_driving_hours', 'daily_driving_hours', 'daily_on_duty_hours', 'compliance')
+INVARIANTS = ('driving_matches_route', 'days_cover_24_hours', 'engine_compliant')
+
+# Hours that differ by less than this are equal (one minute, plus float noise)
+HOURS_TOLERANCE = 1 / 60 + 1e-9
+
+EXAMPLES_PER_ENTRY_POINT = 5
+
+
+def generate_scenarios(count, seed=0):
+    """`count` reproducible scenarios; the same seed always gives the same list"""
+    rng = random.Random(seed)
+    rule_sets = sorted(settings.HOS_CONFIG['RULE_SETS'])
+    scenarios = []
+
+    for index in range(count):
+        plan = get_rule_plan(rng.choice(rule_sets))
+        miles = round(math.exp(rng.uniform(math.log(MIN_MILES), math.log(MAX_MILES))), 1)
+        speed = rng.uniform(*SPEED_RANGE)
+        # Most trips start at the pickup; the rest deadhead part of the way there
+        to_pickup = 0 if rng.random() < 0.5 else round(miles * rng.uniform(0, 0.3), 1)
+        legs = [
+            {'from': 'Current', 'to': 'Pickup', 'distance_miles': to_pickup, 'driving_hours': to_pickup / speed},
+            {'from': 'Pickup', 'to': 'Dropoff', 'distance_miles': round(miles - to_pickup, 1),
+             'driving_hours': (miles - to_pickup) / speed},
+        ]
+
+        trip = {
+            'current_location': 'Current',
+            'pickup_location': 'Pickup',
+            'dropoff_location': 'Dropoff',
+            'current_cycle_used': round(rng.uniform(0, plan.cycle_hours) * 4) / 4,
+            'rule_set': plan.name,
+        }
+        if rng.random() < 0.25:
+            history = [round(rng.uniform(0, plan.max_window_hours), 2) for _ in range(plan.cycle_days - 1)]
+            trip['cycle_history'] = history
+            trip['current_cycle_used'] = min(plan.cycle_hours, round(sum(history), 2))
+
+        scenarios.append({
+            'id': index,
+            'trip': trip,
+            'route': {
+                'distance_miles': miles,
+                'driving_hours': sum(leg['driving_hours'] for leg in legs),
+                'average_speed': round(speed, 1),
+                'legs': legs,
+            },
+            'start_date': FIRST_START_DATE + timedelta(days=rng.randrange(366)),
+        })
+    return scenarios
+
+
+def day_profile(days, driving='driving_hours', on_duty='on_duty_hours'):
+    """What the checks compare, from a list of day dicts"""
+    return {
+        'days': len(days),
+        'driving': [day[driving] for day in days],
+        'on_duty': [day[on_duty] for day in days],
+        'non_compliant': (
+            sum(not day['compliance']['is_compliant'] for day in days)
+            if days and 'compliance' in days[0] else None
+        ),
+    }
+
+
+def _trip_model(scenario):
+    trip = scenario['trip']
+    return Trip(
+        current_location=trip['current_location'],
+        pickup_location=trip['pickup_location'],
+        dropoff_location=trip['dropoff_location'],
+        current_cycle_used=round(trip['current_cycle_used']),
+        rule_set=trip['rule_set'],
+    )
+
+
+def run_trip_view(scenario, legacy):
+    trip, route, start = scenario['trip'], scenario['route'], scenario['start_date']
+    if legacy:
+        return day_profile(list(LegacyTripViewCalculator().iter_eld_logs(trip, route, start)))
+    return day_profile(list(iter_eld_logs(trip, route, start)))
+
+
+def run_hos_calculator(scenario, legacy):
+    trip, route = scenario['trip'], scenario['route']
+    calculator = (LegacyHOSCalculator if legacy else HOSCalculator)(trip, start_date=scenario['start_date'])
+    return day_profile(calculator.calculate_trip(route['distance_miles'], route['driving_hours']))
+
+
+def run_eld_calculator(scenario, legacy):
+    trip, route = _trip_model(scenario), scenario['route']
+    calculator = (LegacyELDCalculator if legacy else ELDCalculator)(trip)
+    return day_profile(calculator.calculate_trip(route)['daily_logs'])
+
+
+# name -> runner(scenario, legacy) returning a day profile
+ENTRY_POINTS = {
+    'trip_view': run_trip_view,
+    'hos_calculator': run_hos_calculator,
+    'eld_calculator': run_eld_calculator,
+}
+
+
+def _hours_differ(a, b):
+    return abs(a - b) > HOURS_TOLERANCE
+
+
+def _series_differ(a, b):
+    return len(a) != len(b) or any(_hours_differ(x, y) for x, y in zip(a, b))
+
+
+def compare_profiles(old, new):
+    """Names of the checks on which two day profiles disagree"""
+    failed = []
+    if old['days'] != new['days']:
+        failed.append('day_count')
+    if _hours_differ(sum(old['driving']), sum(new['driving'])):
+        failed.append('total_driving_hours')
+    if _series_differ(old['driving'], new['driving']):
+        failed.append('daily_driving_hours')
+    if _series_differ(old['on_duty'], new['on_duty']):
+        failed.append('daily_on_duty_hours')
+    if None not in (old['non_compliant'], new['non_compliant']) and old['non_compliant'] != new['non_compliant']:
+        failed.append('compliance')
+    return failed
+
+
+def check_invariants(scenario):
+    """Names of the engine invariants a scenario breaks (normally none)"""
+    trip, route = scenario['trip'], scenario['route']
+    days = list(iter_eld_logs(trip, route, scenario['start_date']))
+    failed = []
+
+    routed = sum(hours_to_minutes(leg['driving_hours']) for leg in legs_from_route(trip, route))
+    if round(sum(day['driving_hours'] for day in days) * 60) != routed:
+        failed.append('driving_matches_route')
+    if any(round(sum(a['duration'] for a in day['activities']) * 60) != MINUTES_PER_DAY for day in days):
+        failed.append('days_cover_24_hours')
+    if not all(day['compliance']['is_compliant'] for day in days):
+        failed.append('engine_compliant')
+    return failed
+
+
+def _summary(profile):
+    return {
+        'days': profile['days'],
+        'driving_hours': round(sum(profile['driving']), 2),
+        'on_duty_hours': round(sum(profile['on_duty']), 2),
+        'non_compliant_days': profile['non_compliant'],
+    }
+
+
+def _describe(scenario):
+    return {
+        'scenario': scenario['id'],
+        'rule_set': scenario['trip']['rule_set'],
+        'miles': scenario['route']['distance_miles'],
+        'average_speed': scenario['route']['average_speed'],
+        'current_cycle_used': scenario['trip']['current_cycle_used'],
+        'start_date': scenario['start_date'].isoformat(),
+    }
+
+
+def run_differential(count=1000, seed=0, entry_points=None, progress=None):
+    """
+    Replay `count` generated scenarios through the old and new paths
+
+    Returns a report with, per entry point, how many scenarios diverged
+    on each check, total old/new seconds and the speedup, and a few
+    example divergences; plus engine invariant failures. `progress` is
+    called with the number of scenarios done.
+    """
+    scenarios = generate_scenarios(count, seed)
+    names = list(entry_points or ENTRY_POINTS)
+    results = {
+        name: {
+            'diverged': 0,
+            'divergences': dict.fromkeys(CHECKS, 0),
+            'old_seconds': 0.0,
+            'new_seconds': 0.0,
+            'examples': [],
+        }
+        for name in names
+    }
+    invariants = {'failures': dict.fromkeys(INVARIANTS, 0), 'examples': []}
+
+    with calculation_cache_disabled():
+        for done, scenario in enumerate(scenarios, start=1):
+            for name in names:
+                runner = ENTRY_POINTS[name]
+                result = results[name]
+
+                started = time.perf_counter()
+                old = runner(scenario, legacy=True)
+                result['old_seconds'] += time.perf_counter() - started
+                started = time.perf_counter()
+                new = runner(scenario, legacy=False)
+                result['new_seconds'] += time.perf_counter() - started
+
+                failed = compare_profiles(old, new)
+                if failed:
+                    result['diverged'] += 1
+                    for check in failed:
+                        result['divergences'][check] += 1
+                    if len(result['examples']) < EXAMPLES_PER_ENTRY_POINT:
+                        result['examples'].append({
+                            **_describe(scenario), 'checks': failed,
+                            'old': _summary(old), 'new': _summary(new),
+                        })
+
+            failed = check_invariants(scenario)
+            for invariant in failed:
+                invariants['failures'][invariant] += 1
+            if failed and len(invariants['examples']) < EXAMPLES_PER_ENTRY_POINT:
+                invariants['examples'].append({**_describe(scenario), 'invariants': failed})
+
+            if progress:
+                progress(done)
+
+    for result in results.values():
+        new_seconds = result['new_seconds']
+        result['speedup'] = result['old_seconds'] / new_seconds if new_seconds else None
+
+    return {
+        'version': REPORT_VERSION,
+        'scenarios': count,
+        'seed': seed,
+        'entry_points': results,
+        'invariants': invariants,
+    }
@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tooling.benchmarks import DEFAULT_THRESHOLD, compare_results
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare two run_benchmarks result files by median time; exits with an '
+        'error when any case slowed down by more than the threshold'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='Results file from the known-good build')
+        parser.add_argument('current', help='Results file to check')
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help=f'Relative slowdown counted as a regression (default {DEFAULT_THRESHOLD})')
+        parser.add_argument('--no-fail', action='store_true',
+                            help='Report regressions without a non-zero exit status')
+
+    def handle(self, *args, **options):
+        baseline, current = self.load(options['baseline']), self.load(options['current'])
+        rows = compare_results(baseline, current, options['threshold'])
+
+        styles = {
+            'regression': self.style.ERROR,
+            'improvement': self.style.SUCCESS,
+            'added': self.style.WARNING,
+            'removed': self.style.WARNING,
+        }
+        for row in rows:
+            line = (
+                f"{row['case']:<50} {self.ms(row['baseline'])} -> {self.ms(row['current'])}"
+                f"  {self.change(row['ratio'])}  {row['verdict']}"
+            )
+            self.stdout.write(styles.get(row['verdict'], str)(line))
+
+        regressions = [row for row in rows if row['verdict'] == 'regression']
+        if regressions and not options['no_fail']:
+            raise CommandError(
+                f"{len(regressions)} benchmark case(s) slower than baseline by more than "
+                f"{options['threshold']:.0%}"
+            )
+        self.stdout.write(f'{len(rows)} case(s) compared, {len(regressions)} regression(s)')
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                results = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read benchmark results {path}: {e}')
+        if not isinstance(results, dict) or 'results' not in results:
+            raise CommandError(f'{path} is not a run_benchmarks results file')
+        return results
+
+    @staticmethod
+    def ms(seconds):
+        return f'{seconds * 1000:10.3f} ms' if seconds is not None else f"{'-':>13}"
+
+    @staticmethod
+    def change(ratio):
+        return f'{ratio - 1:+8.1%}' if ratio is not None else f"{'':>8}"
@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tooling.differential import ENTRY_POINTS, run_differential
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay generated trip scenarios through the pre-engine calculators and the HOS engine, '
+        'reporting divergences per check, speedups and engine invariant failures'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', type=int, default=1000,
+                            help='Number of generated scenarios (default: 1000)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Scenario generator seed (default: 0)')
+        parser.add_argument('--entry-point', action='append', choices=sorted(ENTRY_POINTS), default=[],
+                            help='Only compare this entry point (repeatable)')
+        parser.add_argument('--output', help='Also write the full report to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['scenarios'] < 1:
+            raise CommandError('--scenarios must be at least 1')
+
+        report = run_differential(
+            count=options['scenarios'],
+            seed=options['seed'],
+            entry_points=options['entry_point'] or None,
+        )
+
+        for name, result in report['entry_points'].items():
+            speedup = f"{result['speedup']:.2f}x" if result['speedup'] else 'n/a'
+            self.stdout.write(
+                f"{name:<16} diverged {result['diverged']:>6}/{report['scenarios']}  "
+                f"old {result['old_seconds']:8.3f} s  new {result['new_seconds']:8.3f} s  speedup {speedup}"
+            )
+            for check, count in result['divergences'].items():
+                if count:
+                    self.stdout.write(f'    {check:<22} {count}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Wrote report to {options['output']}")
+
+        failures = {name: count for name, count in report['invariants']['failures'].items() if count}
+        if failures:
+            raise CommandError(
+                'HOS engine invariants failed: '
+                + ', '.join(f'{name} ({count})' for name, count in failures.items())
+            )
+        self.stdout.write(self.style.SUCCESS('HOS engine invariants held for every scenario'))
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from tooling.benchmarks import run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the HOS calculators, the trip API and the serializers over trip '
+        'lengths of 1-90 days and batch sizes up to 10k, writing the results to JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmarks.json',
+                            help='Results file (default: benchmarks.json)')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per case (fewer for batches of 1000+)')
+        parser.add_argument('--quick', action='store_true',
+                            help='Only the smallest trip lengths and batch sizes')
+        parser.add_argument('--only', action='append', default=[],
+                            help='Run cases whose name contains this text (repeatable)')
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(
+            repeat=max(1, options['repeat']),
+            quick=options['quick'],
+            only=options['only'],
+            progress=self.report,
+        )
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(results['results'])} benchmark case(s) to {options['output']}"
+        ))
+
+    def report(self, case, stats):
+        self.stdout.write(
+            f"{case:<50} median {stats['median'] * 1000:10.3f} ms  "
+            f"min {stats['min'] * 1000:10.3f} ms  ({stats['runs']} runs)"
+        )
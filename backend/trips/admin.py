@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Trip, EldLog
+from .models import Trip, EldLog, PlanningJob
 
 @admin.register(Trip)
 class TripAdmin(admin.ModelAdmin):
@@ -33,7 +33,8 @@ class EldLogAdmin(admin.ModelAdmin):
     search_fields = ('trip__trip_id', 'remarks')
     readonly_fields = ('trip', 'day_number', 'date', 'driving_hours', 'on_duty_hours', 
                        'off_duty_hours', 'sleeper_hours', 'cycle_7day_total', 
-                       'cycle_8day_total', 'requires_restart', 'activities', 'remarks')
+                       'cycle_8day_total', 'requires_restart', 'requires_break',
+                       'has_fuel_stop', 'activities', 'remarks', 'compliance', 'extra')
     
     def get_trip_id(self, obj):
         return obj.trip.trip_id
@@ -44,4 +45,15 @@ class EldLogAdmin(admin.ModelAdmin):
         return False  # ELD logs should only be created via API
     
     def has_change_permission(self, request, obj=None):
-        return False  # ELD logs should not be manually edited
\ No newline at end of file
+        return False  # ELD logs should not be manually edited
+
+@admin.register(PlanningJob)
+class PlanningJobAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'kind', 'status', 'attempts', 'locked_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('job_id', 'locked_by')
+    readonly_fields = ('job_id', 'kind', 'input', 'result', 'error', 'attempts', 'locked_by',
+                       'created_at', 'started_at', 'finished_at')
+    
+    def has_add_permission(self, request):
+        return False  # Jobs are submitted via the API
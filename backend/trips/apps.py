@@ -7,4 +7,8 @@ class TripsConfig(AppConfig):
     
     def ready(self):
         """Initialize any app-specific configurations"""
-        import trips.signals  # If you have signals
\ No newline at end of file
+        import trips.signals  # If you have signals
+        
+        # Compile the exception rules once per process
+        from .exceptions import get_exception_engine
+        get_exception_engine()
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Async (ASGI) trip calculation and history endpoints
+
+Same inputs and responses as TripCalculatorView and TripHistoryView, but
+a request never holds a worker thread while it waits: HOS work is
+awaited on the bounded calculation pool, history reads go through the
+async ORM, and only the transactional write runs via sync_to_async
+(Django 4.2 has no async transactions). Under WSGI these views still
+work, each request running in its own event loop.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.utils.encoders import JSONEncoder
+
+from .pagination import KeysetPaginator
+from .services.async_pool import PoolBusy, calculation_pool
+from .services.trip_store import save_trip_result
+from .views import TripCalculatorView, TripHistoryView
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncTripCalculatorView(View):
+    """Calculate, store and return a trip (see TripCalculatorView)"""
+
+    http_method_names = ['post', 'options']
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return json_response({'error': 'Request body must be JSON'}, status=400)
+        if not isinstance(data, dict):
+            return json_response({'error': 'Request body must be a JSON object'}, status=400)
+
+        calculator = TripCalculatorView()
+        error = await sync_to_async(calculator.validate_input)(data)
+        if error:
+            return json_response({'error': error}, status=400)
+
+        try:
+            result = await calculation_pool.run(calculator.calculate_trip, data)
+            await sync_to_async(save_trip_result)(data, result)
+        except PoolBusy as e:
+            response = json_response({'error': str(e)}, status=503)
+            response['Retry-After'] = '1'
+            return response
+        except Exception as e:
+            return json_response({'error': str(e)}, status=500)
+
+        return json_response(result, status=201)
+
+
+class AsyncTripHistoryView(View):
+    """Keyset-paginated trip history (see TripHistoryView for parameters)"""
+
+    http_method_names = ['get', 'options']
+
+    async def get(self, request):
+        params = request.GET
+        try:
+            trips, summary_only = TripHistoryView.filter_trips(params)
+            paginator = KeysetPaginator(params.get('limit'))
+            page, next_cursor = await paginator.apaginate(trips, params.get('cursor'))
+        except ValueError as e:
+            return json_response({'error': str(e)}, status=400)
+
+        return json_response(TripHistoryView.page_body(page, next_cursor, summary_only))
+
+
+class CalculationPoolMetricsView(View):
+    """Queue depth and totals of this worker's calculation pool"""
+
+    http_method_names = ['get', 'options']
+
+    async def get(self, request):
+        return json_response(calculation_pool.metrics())
@@ -0,0 +1,141 @@
+"""
+Compact columnar encoding of trip results, and `?fields=` selection
+
+The compact format (`?format=compact` or `Accept: application/vnd.eld.compact+json`)
+turns each day's `activities` and `remarks` into parallel arrays:
+
+    "activities": {"status": [0, 3, 2], "start": [0, 300, 330], "end": [300, 330, 570], "text": [0, 1, 2]}
+    "remarks":    {"time": [300], "location": [3], "text": [4]}
+
+`status` indexes `status_codes` (the DutyGrid codes), `start`/`end`/`time`
+are minutes after midnight, and `text`/`location` index the payload-wide
+`strings` table, so the handful of distinct descriptions is sent once per
+response. An activity's duration is (end - start) / 60 hours. Legal
+references are sent as IDs into the `/api/hos/regulations/` catalog.
+"""
+
+from .duty_grid import STATUS_CODES, STATUSES
+from .services.trip_planner import LEGAL_REFERENCES
+
+COMPACT_VERSION = 'compact-v1'
+
+LEGAL_REFERENCE_IDS = {ref['section']: ref['id'] for ref in LEGAL_REFERENCES}
+
+
+def clock_minutes(value):
+    """'HH:MM' as minutes after midnight ('24:00' is 1440)"""
+    hours, _, minutes = value.partition(':')
+    return int(hours) * 60 + int(minutes or 0)
+
+
+class StringTable:
+    """Interns strings into a list, handing out their indexes"""
+
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def __call__(self, value):
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+
+def compact_activities(activities, strings):
+    return {
+        'status': [STATUS_CODES[a['status']] for a in activities],
+        'start': [clock_minutes(a['start']) for a in activities],
+        'end': [clock_minutes(a['end']) for a in activities],
+        'text': [strings(a.get('description', '')) for a in activities],
+    }
+
+
+def compact_remarks(remarks, strings):
+    return {
+        'time': [clock_minutes(r['time']) for r in remarks],
+        'location': [strings(r.get('location', '')) for r in remarks],
+        'text': [strings(r.get('description', '')) for r in remarks],
+    }
+
+
+def compact_day(day, strings):
+    day = dict(day)
+    if isinstance(day.get('activities'), list):
+        day['activities'] = compact_activities(day['activities'], strings)
+    if isinstance(day.get('remarks'), list):
+        day['remarks'] = compact_remarks(day['remarks'], strings)
+    return day
+
+
+def compact_trip(trip, strings):
+    trip = dict(trip)
+    if isinstance(trip.get('eld_logs'), list):
+        trip['eld_logs'] = [compact_day(day, strings) for day in trip['eld_logs']]
+    if isinstance(trip.get('legal_references'), list):
+        trip['legal_references'] = [
+            LEGAL_REFERENCE_IDS.get(ref.get('section'), ref.get('section'))
+            for ref in trip['legal_references']
+        ]
+    return trip
+
+
+def compact_payload(data):
+    """
+    Compact encoding of a trip result, a batch result, or a page of trips
+
+    Anything else (e.g. an error body) is returned unchanged.
+    """
+    if not isinstance(data, dict):
+        return data
+
+    strings = StringTable()
+    if 'eld_logs' in data or 'legal_references' in data:
+        data = compact_trip(data, strings)
+    elif isinstance(data.get('results'), list):
+        data = dict(data)
+        data['results'] = [
+            {**row, 'trip': compact_trip(row['trip'], strings)} if isinstance(row.get('trip'), dict)
+            else compact_trip(row, strings) if 'eld_logs' in row
+            else row
+            for row in data['results']
+        ]
+    else:
+        return data
+
+    return {'format': COMPACT_VERSION, 'status_codes': list(STATUSES), 'strings': strings.strings, **data}
+
+
+def parse_fields(spec):
+    """
+    `?fields=` value as (top-level fields, per-day fields)
+
+    `eld_logs.<name>` selects fields inside each day and implies eld_logs.
+    Returns (None, None) when no selection was requested.
+    """
+    if not spec:
+        return None, None
+    top, day = set(), set()
+    for name in (part.strip() for part in spec.split(',')):
+        if not name:
+            continue
+        section, _, inner = name.partition('.')
+        top.add(section)
+        if section == 'eld_logs' and inner:
+            day.add(inner)
+    return top, day or None
+
+
+def select_fields(data, spec):
+    """Drop the sections of a trip result the client did not ask for"""
+    top, day = parse_fields(spec)
+    if top is None or not isinstance(data, dict):
+        return data
+    selected = {key: value for key, value in data.items() if key in top}
+    if day is not None and isinstance(selected.get('eld_logs'), list):
+        selected['eld_logs'] = [
+            {key: value for key, value in log.items() if key in day}
+            for log in selected['eld_logs']
+        ]
+    return selected
@@ -0,0 +1,161 @@
+"""
+Rolling 60-hour/7-day and 70-hour/8-day cycle tracking
+Reference: 49 CFR §395.3(b)-(c) (PDF pages 10-11)
+
+Per-day on-duty totals live in a fixed-size ring buffer with a running
+sum, so recording time, rolling over at midnight and answering "hours
+available today" are all O(1) no matter how long the trip is.
+"""
+
+
+def prior_daily_hours(cycle_used_hours, days=8, max_daily_hours=14):
+    """
+    Per-day history (oldest first, ending yesterday) for a cycle total
+
+    The hours are charged to the most recent prior days (up to
+    `max_daily_hours` each), so they are recovered as late as possible.
+    This errs on the side of compliance. Anything left over is charged to
+    the oldest day of the window.
+    """
+    remaining = float(cycle_used_hours or 0)
+    history = []
+    while remaining > 0 and len(history) < days - 1:
+        history.append(min(max_daily_hours, remaining))
+        remaining -= history[-1]
+    if remaining > 0:
+        history[-1] += remaining
+    return list(reversed(history))
+
+
+class CycleTracker:
+    """
+    Ring buffer of per-day on-duty minutes for the rolling cycle window
+
+    Slot `_head` holds today; the slot after it holds the oldest day, which
+    drops out of the window at the next midnight.
+    """
+
+    __slots__ = ('days', 'limit_minutes', '_ring', '_head', '_total')
+
+    def __init__(self, limit_hours=70, days=8, history=None):
+        if days < 2:
+            raise ValueError('A cycle window must span at least 2 days')
+
+        self.days = days
+        self.limit_minutes = int(round(limit_hours * 60))
+        self._ring = [0] * days
+        self._head = days - 1
+        self._total = 0
+
+        if history:
+            self.seed(history)
+
+    @classmethod
+    def from_cycle_used(cls, cycle_used_hours, limit_hours=70, days=8, max_daily_hours=14):
+        """
+        Build a tracker when only the total hours used are known
+
+        The hours are spread by `prior_daily_hours`.
+        """
+        return cls(limit_hours, days, history=prior_daily_hours(cycle_used_hours, days, max_daily_hours))
+
+    @classmethod
+    def for_trip(cls, trip_data, limit_hours=70, days=8, max_daily_hours=14):
+        """Seed from `cycle_history` when provided, else from `current_cycle_used`"""
+        history = trip_data.get('cycle_history')
+        if history:
+            return cls(limit_hours, days, history=history)
+        return cls.from_cycle_used(
+            trip_data.get('current_cycle_used', 0) or 0,
+            limit_hours, days, max_daily_hours
+        )
+
+    def seed(self, history):
+        """
+        Load prior-day on-duty hours, oldest first, ending with yesterday
+
+        Only the days that are still inside the window are kept.
+        """
+        history = list(history)[-(self.days - 1):]
+        self._ring = [0] * self.days
+        self._head = self.days - 1
+        for offset, hours in enumerate(reversed(history), start=1):
+            if hours < 0:
+                raise ValueError('Cycle history hours cannot be negative')
+            self._ring[self._head - offset] = int(round(hours * 60))
+        self._total = sum(self._ring)
+
+    def state(self):
+        """The ring and today's slot, as JSON-safe data"""
+        return {'head': self._head, 'ring': list(self._ring)}
+
+    def restore(self, state):
+        """Load a `state()` snapshot taken from a tracker with the same window"""
+        if len(state['ring']) != self.days:
+            raise ValueError(f'Cycle state must hold {self.days} days')
+        self._ring = list(state['ring'])
+        self._head = state['head']
+        self._total = sum(self._ring)
+
+    # Recording
+
+    def add_minutes(self, minutes):
+        """Add on-duty (driving or not-driving) minutes to today"""
+        self._ring[self._head] += minutes
+        self._total += minutes
+
+    def add_hours(self, hours):
+        self.add_minutes(int(round(hours * 60)))
+
+    def advance_day(self):
+        """Roll over at midnight: the oldest day leaves the window"""
+        self._head = (self._head + 1) % self.days
+        self._total -= self._ring[self._head]
+        self._ring[self._head] = 0
+
+    def restart(self):
+        """Apply a 34-hour restart (§395.3(c)): the cycle starts over"""
+        self._ring = [0] * self.days
+        self._total = 0
+
+    # Queries (all O(1))
+
+    @property
+    def used_minutes(self):
+        return self._total
+
+    @property
+    def available_minutes(self):
+        """On-duty minutes still allowed before the cycle limit"""
+        return max(0, self.limit_minutes - self._total)
+
+    @property
+    def recovered_at_midnight_minutes(self):
+        """Minutes that drop out of the window at the next midnight"""
+        return self._ring[(self._head + 1) % self.days]
+
+    def window_minutes(self, days=None):
+        """On-duty minutes over the full window or the window minus its oldest day"""
+        if days is None or days == self.days:
+            return self._total
+        if days == self.days - 1:
+            return self._total - self.recovered_at_midnight_minutes
+        raise ValueError(f'Only {self.days}- and {self.days - 1}-day totals are tracked')
+
+    @property
+    def hours_used(self):
+        return self._total / 60
+
+    @property
+    def hours_available(self):
+        return self.available_minutes / 60
+
+    @property
+    def hours_recovered_at_midnight(self):
+        return self.recovered_at_midnight_minutes / 60
+
+    def window_hours(self, days=None):
+        return self.window_minutes(days) / 60
+
+    def is_exhausted(self):
+        return self._total >= self.limit_minutes
@@ -0,0 +1,163 @@
+"""
+Compact duty-status grid for a single ELD log day
+Reference: 49 CFR §395.8 graph-grid format (PDF pages 15-18)
+
+A day is stored as one signed byte per minute (1440 slots) instead of a
+list of activity dicts. Totals, transitions and the printed grid are all
+computed from the byte array, and the grid converts to and from the
+`activities` JSON stored on EldLog.
+"""
+
+import sys
+from array import array
+from itertools import groupby
+
+MINUTES_PER_DAY = 1440
+
+# Status codes in the order the rows appear on the paper log
+STATUSES = ('off_duty', 'sleeper_berth', 'driving', 'on_duty')
+STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+NO_RECORD = -1
+
+ROW_LABELS = ('1: OFF DUTY', '2: SLEEPER BERTH', '3: DRIVING', '4: ON DUTY')
+
+
+def parse_clock(value):
+    """Parse HH:MM into minutes since midnight (24:00 -> 1440)"""
+    hours, minutes = value.split(':')
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= MINUTES_PER_DAY:
+        raise ValueError(f'Time outside the log day: {value}')
+    return total
+
+
+def format_clock(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class DutyGrid:
+    """
+    One log day as an int8 status-per-slot array
+
+    `resolution` is minutes per slot: 1 (1440 slots, lossless for HH:MM
+    activities) or 15 (96 slots, the paper-log granularity). Activity
+    boundaries and descriptions are kept alongside the grid so the
+    original activities JSON can be rebuilt.
+    """
+
+    __slots__ = ('resolution', 'slots', 'codes', 'starts', 'ends', 'descriptions')
+
+    def __init__(self, resolution=1):
+        if MINUTES_PER_DAY % resolution:
+            raise ValueError('Resolution must divide 1440 minutes evenly')
+        self.resolution = resolution
+        self.slots = array('b', [NO_RECORD]) * (MINUTES_PER_DAY // resolution)
+        self.codes = array('b')
+        self.starts = array('H')
+        self.ends = array('H')
+        self.descriptions = []
+
+    @classmethod
+    def from_activities(cls, activities, resolution=1):
+        """Build a grid from the activities JSON (list of status/start/end dicts)"""
+        grid = cls(resolution)
+        for activity in activities:
+            grid.add(
+                activity['status'],
+                parse_clock(activity['start']),
+                parse_clock(activity['end']),
+                activity.get('description')
+            )
+        return grid
+
+    def add(self, status, start_minute, end_minute, description=None):
+        """Mark [start_minute, end_minute) with a duty status"""
+        if end_minute < start_minute:
+            raise ValueError('Activity ends before it starts')
+        code = STATUS_CODES[status]
+        first = start_minute // self.resolution
+        last = -(-end_minute // self.resolution)
+        self.slots[first:last] = array('b', [code]) * (last - first)
+        self.codes.append(code)
+        self.starts.append(start_minute)
+        self.ends.append(end_minute)
+        self.descriptions.append(sys.intern(description) if description is not None else None)
+
+    def to_activities(self):
+        """Rebuild the activities JSON; durations are derived from the timestamps"""
+        activities = []
+        for code, start, end, description in zip(self.codes, self.starts, self.ends, self.descriptions):
+            activity = {
+                'status': STATUSES[code],
+                'start': format_clock(start),
+                'end': format_clock(end),
+                'duration': (end - start) / 60,
+            }
+            if description is not None:
+                activity['description'] = description
+            activities.append(activity)
+        return activities
+
+    def minutes(self, status):
+        """Total minutes recorded in one status"""
+        return self.slots.count(STATUS_CODES[status]) * self.resolution
+
+    def totals(self):
+        """Hours per status, as shown in the right-hand totals column"""
+        return {status: self.minutes(status) / 60 for status in STATUSES}
+
+    def runs(self):
+        """Merged (status, start_minute, end_minute) runs, skipping unrecorded time"""
+        runs = []
+        position = 0
+        for code, group in groupby(self.slots):
+            length = sum(1 for _ in group) * self.resolution
+            if code != NO_RECORD:
+                runs.append((STATUSES[code], position, position + length))
+            position += length
+        return runs
+
+    def transitions(self):
+        """Duty-status changes as (minute, from_status, to_status)"""
+        changes = []
+        previous = None
+        for status, start, _ in self.runs():
+            if previous is not None and status != previous:
+                changes.append((start, previous, status))
+            previous = status
+        return changes
+
+    def render(self, cells=96):
+        """
+        Render the four-row paper grid as text, one character per cell
+
+        A cell is filled when any minute inside it is in that row's status.
+        """
+        per_cell = MINUTES_PER_DAY // cells
+        rows = {code: [' '] * cells for code in range(len(STATUSES))}
+        for status, start, end in self.runs():
+            row = rows[STATUS_CODES[status]]
+            for cell in range(start // per_cell, -(-end // per_cell)):
+                row[cell] = '#'
+
+        width = max(len(label) for label in ROW_LABELS)
+        lines = [f"{'':{width}} |{''.join(str(h % 12 or 12).ljust(cells // 24) for h in range(24))}|"]
+        for code, label in enumerate(ROW_LABELS):
+            hours = self.minutes(STATUSES[code]) / 60
+            lines.append(f"{label:{width}} |{''.join(rows[code])}| {hours:5.2f}")
+        return '\n'.join(lines)
+
+    def as_numpy(self):
+        """Zero-copy int8 view of the grid (requires NumPy)"""
+        import numpy as np
+        return np.frombuffer(self.slots, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, DutyGrid)
+            and self.resolution == other.resolution
+            and self.slots == other.slots
+        )
@@ -1,8 +1,56 @@
 """
 FMCSA HOS Exceptions based on the provided PDF document.
 Reference: Appendix A (Pages 20-26)
+
+Each exception declares its eligibility as cost-tagged conditions; the
+ExceptionChecker compiles all of them into one shared RuleEngine.
 """
 
+from functools import lru_cache
+
+from .gazetteer import get_gazetteer
+from .metrics import exception_check_seconds
+from .rule_engine import FIELD_COST, LOOKUP_COST, Condition, Rule, RuleContext, RuleEngine
+
+SHORT_HAUL_AIR_MILES = 150
+
+
+def operating_radius(trip_data):
+    """
+    Farthest air-mile distance from the work reporting location
+    (current location) to pickup or dropoff; None if any is unknown
+    """
+    gazetteer = get_gazetteer()
+    origin = trip_data.get('current_location')
+    distances = [
+        gazetteer.air_miles(origin, trip_data.get(field))
+        for field in ('pickup_location', 'dropoff_location')
+    ]
+    if any(distance is None for distance in distances):
+        return None
+    return max(distances)
+
+
+# Predicates over a RuleContext
+
+def requires_cdl(context):
+    return bool(context.trip.get('requires_cdl', True))
+
+
+def does_not_require_cdl(context):
+    return not context.trip.get('requires_cdl', True)
+
+
+def has_adverse_conditions(context):
+    return bool(context.trip.get('adverse_conditions', False))
+
+
+def within_short_haul_radius(context):
+    # Unknown locations cannot be shown to be within the radius
+    distance = context.cached('operating_radius', operating_radius)
+    return distance is not None and distance <= SHORT_HAUL_AIR_MILES
+
+
 class HOSException:
     """Base class for HOS exceptions"""
     
@@ -12,9 +60,28 @@ class HOSException:
         self.description = description
         self.conditions = conditions
     
-    def check_eligibility(self, trip_data):
-        """Check if trip qualifies for this exception"""
+    def rule_conditions(self):
+        """Eligibility checks as Condition objects"""
         raise NotImplementedError
+    
+    def get_benefits(self):
+        return []
+    
+    def check_eligibility(self, trip_data):
+        """Check if trip qualifies for this exception (cheapest checks first)"""
+        context = RuleContext(trip_data)
+        conditions = sorted(self.rule_conditions(), key=lambda condition: condition.cost)
+        return all(condition.predicate(context) for condition in conditions), self.get_benefits()
+    
+    def compile(self):
+        """Rule for the shared engine; the payload matches check_all_exceptions output"""
+        return Rule(self.name, self.rule_conditions(), {
+            'name': self.name,
+            'cfr_section': self.cfr_section,
+            'description': self.description,
+            'conditions': self.conditions,
+            'benefits': self.get_benefits()
+        })
 
 class ShortHaulException(HOSException):
     """
@@ -22,6 +89,8 @@ class ShortHaulException(HOSException):
     PDF Reference: Page 12, §395.1(e)(1)
     """
     
+    MAX_AIR_MILES = SHORT_HAUL_AIR_MILES
+    
     def __init__(self):
         super().__init__(
             name="150 Air-Mile Radius (CDL)",
@@ -35,27 +104,13 @@ class ShortHaulException(HOSException):
             ]
         )
     
-    def check_eligibility(self, trip_data):
-        """Check eligibility based on PDF page 12 requirements"""
-        # Calculate air-mile distance
-        from geopy.distance import geodesic
-        
-        try:
-            # This would require geocoding in real implementation
-            distance = self.calculate_distance(
-                trip_data['current_location'],
-                trip_data['dropoff_location']
-            )
-            
-            conditions_met = [
-                distance <= 150,  # Within 150 air-miles
-                trip_data.get('requires_cdl', True),  # Requires CDL
-                # Additional checks based on PDF
-            ]
-            
-            return all(conditions_met), self.get_benefits()
-        except:
-            return False, []
+    def rule_conditions(self):
+        """Eligibility based on PDF page 12 requirements"""
+        return [
+            Condition('requires_cdl', requires_cdl, FIELD_COST),
+            Condition('within_150_air_miles', within_short_haul_radius, LOOKUP_COST),
+            # Additional checks based on PDF
+        ]
     
     def get_benefits(self):
         """Benefits per PDF page 12-13"""
@@ -84,15 +139,13 @@ class NonCDLShortHaulException(HOSException):
             ]
         )
     
-    def check_eligibility(self, trip_data):
-        """Check eligibility based on PDF page 13"""
-        conditions_met = [
-            not trip_data.get('requires_cdl', True),  # Does NOT require CDL
-            # Distance calculation would go here
+    def rule_conditions(self):
+        """Eligibility based on PDF page 13"""
+        return [
+            Condition('does_not_require_cdl', does_not_require_cdl, FIELD_COST),
+            Condition('within_150_air_miles', within_short_haul_radius, LOOKUP_COST),
             # Additional hour limitations from PDF
         ]
-        
-        return all(conditions_met), self.get_benefits()
     
     def get_benefits(self):
         return [
@@ -119,14 +172,12 @@ class AdverseConditionsException(HOSException):
             ]
         )
     
-    def check_eligibility(self, trip_data):
-        """Check if adverse conditions apply"""
-        conditions_met = [
-            trip_data.get('adverse_conditions', False),
+    def rule_conditions(self):
+        """Adverse conditions must be reported for the trip"""
+        return [
+            Condition('adverse_conditions', has_adverse_conditions, FIELD_COST),
             # Additional checks based on PDF definition
         ]
-        
-        return all(conditions_met), self.get_benefits()
     
     def get_benefits(self):
         return [
@@ -154,14 +205,12 @@ class SixteenHourException(HOSException):
             ]
         )
     
-    def check_eligibility(self, trip_data):
-        """Check eligibility for 16-hour exception"""
-        conditions_met = [
-            trip_data.get('requires_cdl', True),  # CDL required
+    def rule_conditions(self):
+        """Eligibility for the 16-hour exception"""
+        return [
+            Condition('requires_cdl', requires_cdl, FIELD_COST),  # CDL required
             # Additional checks from PDF
         ]
-        
-        return all(conditions_met), self.get_benefits()
     
     def get_benefits(self):
         return [
@@ -170,31 +219,36 @@ class SixteenHourException(HOSException):
             "After 34-hour restart can use again"
         ]
 
+EXCEPTION_CLASSES = (
+    ShortHaulException,
+    NonCDLShortHaulException,
+    AdverseConditionsException,
+    SixteenHourException,
+    # Add other exceptions from Appendix A
+)
+
+
+@lru_cache(maxsize=None)
+def get_exception_engine():
+    """Rule engine for every exception, compiled once per process"""
+    return RuleEngine(exception().compile() for exception in EXCEPTION_CLASSES)
+
+
 class ExceptionChecker:
     """Main class to check all applicable exceptions"""
     
     def __init__(self):
-        self.exceptions = [
-            ShortHaulException(),
-            NonCDLShortHaulException(),
-            AdverseConditionsException(),
-            SixteenHourException(),
-            # Add other exceptions from Appendix A
-        ]
+        self.engine = get_exception_engine()
     
     def check_all_exceptions(self, trip_data):
         """Check all exceptions and return applicable ones"""
-        applicable = []
-        
-        for exception in self.exceptions:
-            is_eligible, benefits = exception.check_eligibility(trip_data)
-            if is_eligible:
-                applicable.append({
-                    'name': exception.name,
-                    'cfr_section': exception.cfr_section,
-                    'description': exception.description,
-                    'conditions': exception.conditions,
-                    'benefits': benefits
-                })
-        
-        return applicable
\ No newline at end of file
+        with exception_check_seconds.time():
+            return self.engine.evaluate(trip_data)
+    
+    def check_many(self, trips):
+        """Applicable exceptions for each trip in a list, in one pass"""
+        return self.engine.evaluate_many(trips)
+    
+    def timings(self):
+        """Per-rule, per-condition evaluation counters for profiling"""
+        return self.engine.timings()
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Log exports: CSV, JSON Lines and the FMCSA ELD output file
+Reference: 49 CFR Part 395 Subpart B, Appendix §4.8.2 (ELD output file)
+
+Exporters take an iterable of EldLog rows (with `trip` loaded) and yield
+text chunks, so views can stream a chunked `.iterator()` queryset and a
+long date range is never held in memory.
+"""
+
+import csv
+import json
+
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .duty_grid import STATUS_CODES, parse_clock
+from .rule_plan import get_rule_plan
+from .services.trip_store import HOUR_FIELDS, eld_log_to_day
+
+ITERATOR_CHUNK_SIZE = 2000
+
+CSV_COLUMNS = (
+    ('trip_id', 'day_number', 'date')
+    + HOUR_FIELDS
+    + ('requires_restart', 'requires_break', 'has_fuel_stop', 'violation_count', 'activities')
+)
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(logs):
+    """One row per log day; activities are packed as status@start-end segments"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for log in logs:
+        violations = (log.compliance or {}).get('violations', [])
+        activities = ';'.join(
+            f"{activity['status']}@{activity['start']}-{activity['end']}"
+            for activity in log.activities
+        )
+        yield writer.writerow(
+            [log.trip.trip_id, log.day_number, log.date.isoformat()]
+            + [getattr(log, field) for field in HOUR_FIELDS]
+            + [log.requires_restart, log.requires_break, log.has_fuel_stop, len(violations), activities]
+        )
+
+
+def iter_jsonl(logs):
+    """One JSON object per log day, in the calculator's day format plus trip_id"""
+    for log in logs:
+        day = {'trip_id': log.trip.trip_id, **eld_log_to_day(log)}
+        yield json.dumps(day, cls=JSONEncoder, separators=(',', ':')) + '\n'
+
+
+# FMCSA ELD output file
+
+# Table 3: alphanumerics map to (ASCII code - 48); everything else counts as 0
+def _char_value(char):
+    return ord(char) - 48 if char.isascii() and char.isalnum() else 0
+
+
+def _rotate_left(value, bits, width):
+    mask = (1 << width) - 1
+    return ((value << bits) | (value >> (width - bits))) & mask
+
+
+def _check_value(fields, xor, width=8):
+    total = sum(_char_value(char) for field in fields for char in str(field))
+    return _rotate_left(total & ((1 << width) - 1), 3, width) ^ xor
+
+
+def event_check_value(fields):
+    """Event data check value (§4.4.5.1.1)"""
+    return _check_value(fields, 0xC3)
+
+
+def line_check_value(line):
+    """Line data check value over the line's characters (§4.4.5.1.2)"""
+    return _check_value([line], 0x96)
+
+
+def file_check_value(line_values):
+    """File data check value over all line check values (§4.4.5.1.3)"""
+    return _rotate_left(sum(line_values) & 0xFFFF, 3, 16) ^ 0x969C
+
+
+def _field(value):
+    """Output-file fields are comma separated ASCII"""
+    return str(value).replace(',', ' ').encode('ascii', 'replace').decode('ascii')
+
+
+class _OutputFile:
+    """Collects line check values while formatting output-file lines"""
+
+    def __init__(self):
+        self.line_values = []
+
+    def line(self, *fields):
+        text = ','.join(_field(field) for field in fields)
+        value = line_check_value(text)
+        self.line_values.append(value)
+        return f'{text},{value:02X}\r\n'
+
+
+SECTIONS_AFTER_EVENTS = (
+    "Driver's Certification/Recertification Actions:",
+    'Malfunctions and Data Diagnostic Events:',
+    'ELD Login/Logout Report:',
+    'CMV Engine Power-Up and Shut Down Activity:',
+    'Unidentified Driver Profile Records:',
+)
+
+
+def duty_status_events(logs):
+    """
+    Duty-status change events (event type 1) from consecutive activities
+
+    An activity continuing the previous status (e.g. across midnight)
+    does not produce a new event. Yields (date, minute, code, description).
+    """
+    previous = None
+    for log in logs:
+        for activity in sorted(log.activities, key=lambda a: parse_clock(a['start'])):
+            status = activity['status']
+            if status == previous:
+                continue
+            previous = status
+            yield log.date, parse_clock(activity['start']), STATUS_CODES[status] + 1, activity.get('description') or ''
+
+
+def iter_fmcsa_file(trip, logs, generated_at=None):
+    """
+    ELD output file for one trip's record of duty status
+
+    Driver, carrier and vehicle identity are not stored by this app, so
+    those header fields are left empty for the carrier to complete. The
+    multiday basis (7 or 8 days) is the cycle of the trip's rule set.
+    """
+    generated_at = generated_at or timezone.now()
+    cycle_days = str(get_rule_plan(trip.rule_set).cycle_days)
+    out = _OutputFile()
+
+    yield 'ELD File Header Segment:\r\n'
+    yield out.line('', '', '', '', '')                       # driver
+    yield out.line('', '', '')                               # co-driver
+    yield out.line('', '', '')                               # CMV
+    yield out.line('', '', cycle_days, '000000', '00')       # carrier, multiday basis, UTC
+    yield out.line(trip.trip_id, '0')                        # shipping document, not exempt
+    yield out.line(generated_at.strftime('%m%d%y'), generated_at.strftime('%H%M%S'), '', '', '', '')
+    yield out.line('', '', '', f'Trip {trip.trip_id}: {trip.current_location} to {trip.dropoff_location}')
+
+    yield 'User List:\r\n'
+    yield 'CMV List:\r\n'
+
+    yield 'ELD Event List:\r\n'
+    annotations = []
+    for sequence, (day, minute, code, description) in enumerate(duty_status_events(logs), start=1):
+        date_text = day.strftime('%m%d%y')
+        time_text = f'{minute // 60:02d}{minute % 60:02d}00'
+        check = event_check_value(['1', code, date_text, time_text, '', '', '', '', '', ''])
+        sequence_id = f'{sequence & 0xFFFF:X}'
+        # Status 1 = active, origin 1 = automatically recorded
+        yield out.line(
+            sequence_id, '1', '1', '1', code, date_text, time_text,
+            '', '', '', '', '', '', '', '0', '0', f'{check:02X}'
+        )
+        if description:
+            # Annotations are limited to 60 characters
+            annotations.append((sequence_id, description[:60], date_text, time_text))
+
+    yield 'ELD Event Annotations or Comments:\r\n'
+    for sequence_id, description, date_text, time_text in annotations:
+        yield out.line(sequence_id, '', description, date_text, time_text, '')
+
+    for section in SECTIONS_AFTER_EVENTS:
+        yield f'{section}\r\n'
+
+    yield 'End of File:\r\n'
+    yield f'{file_check_value(out.line_values):04X}\r\n'
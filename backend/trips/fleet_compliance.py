@@ -0,0 +1,256 @@
+"""
+Vectorized fleet-wide HOS compliance evaluation
+References: 49 CFR §395.3 (PDF pages 6-11)
+
+Input is a stack of per-minute duty-status grids shaped (drivers, days,
+1440) using the DutyGrid status codes. Every rule is evaluated for the
+whole fleet at once with cumulative sums and running maxima over the
+flattened timeline, so there is no Python loop per driver-day.
+"""
+
+import numpy as np
+
+from .cycle_tracker import prior_daily_hours
+from .duty_grid import MINUTES_PER_DAY, NO_RECORD, STATUS_CODES
+from .rule_plan import get_rule_plan
+
+DRIVING = STATUS_CODES['driving']
+ON_DUTY = STATUS_CODES['on_duty']
+
+RULE_DRIVING_LIMIT = 0
+RULE_DUTY_WINDOW = 1
+RULE_OFF_DUTY = 2
+RULE_BREAK = 3
+RULE_CYCLE = 4
+
+
+def rule_labels(plan):
+    """Violation label for each rule code under a rule plan"""
+    return {
+        RULE_DRIVING_LIMIT: plan.driving_rule,
+        RULE_DUTY_WINDOW: plan.window_rule,
+        RULE_OFF_DUTY: plan.off_duty_rule,
+        RULE_BREAK: plan.break_rule,
+        RULE_CYCLE: plan.cycle_rule,
+    }
+
+
+VIOLATION_DTYPE = np.dtype([
+    ('driver', np.int32),
+    ('day', np.int32),
+    ('rule', np.int8),
+    ('actual_hours', np.float32),
+    ('limit_hours', np.float32),
+])
+
+# Upper bound on minutes processed per chunk (drivers x days x 1440)
+CHUNK_MINUTES = 1 << 22
+
+
+def stack_grids(drivers):
+    """
+    Stack DutyGrid objects into an (N, D, 1440) int8 array
+
+    `drivers` is a list of per-driver day lists; shorter histories are
+    padded with unrecorded days.
+    """
+    days = max((len(grids) for grids in drivers), default=0)
+    stacked = np.full((len(drivers), days, MINUTES_PER_DAY), NO_RECORD, dtype=np.int8)
+    for driver, grids in enumerate(drivers):
+        for day, grid in enumerate(grids):
+            if grid.resolution != 1:
+                raise ValueError('Fleet evaluation needs minute-resolution grids')
+            stacked[driver, day] = grid.as_numpy()
+    return stacked
+
+
+def _last_index(events, index):
+    """Position of the most recent True at or before each minute (-1 if none)"""
+    positions = np.where(events, index, -1)
+    np.maximum.accumulate(positions, axis=1, out=positions)
+    return positions
+
+
+def _run_length(mask, index):
+    """Length of the True run ending at each minute (0 where False)"""
+    return np.where(mask, index - _last_index(~mask, index), 0)
+
+
+def _minutes_between(cumulative, start):
+    """Minutes counted in (start, t] given a zero-padded cumulative sum"""
+    return cumulative[:, 1:] - np.take_along_axis(cumulative, start + 1, axis=1)
+
+
+def _daily_max(values, mask, days):
+    """Largest value per driver-day over the minutes selected by `mask`"""
+    masked = np.where(mask, values, 0)
+    return masked.reshape(masked.shape[0], days, MINUTES_PER_DAY).max(axis=2)
+
+
+def prior_cycle_minutes(drivers, days, cycle_days, cycle_used_hours=None, cycle_history=None,
+                        max_daily_hours=14):
+    """
+    On-duty minutes from before day 0 still inside each day's cycle window
+
+    Returns a (drivers, days) array. A driver's prior hours are a per-day
+    history, oldest first and ending yesterday: `cycle_history[i]` when
+    given, else `cycle_used_hours[i]` spread by `prior_daily_hours` like
+    CycleTracker.from_cycle_used does, so a schedule the HOS engine planned
+    from those hours is judged from the same starting cycle. Day d still
+    counts the most recent `cycle_days - 1 - d` prior days.
+    """
+    window = cycle_days - 1
+    history = np.zeros((drivers, window), dtype=np.int32)
+    for driver in range(drivers):
+        hours = cycle_history[driver] if cycle_history is not None else None
+        if not hours:
+            used = cycle_used_hours[driver] if cycle_used_hours is not None else 0
+            hours = prior_daily_hours(used, cycle_days, max_daily_hours)
+        hours = list(hours)[-window:]
+        if hours:
+            history[driver, window - len(hours):] = np.round(np.asarray(hours, dtype=np.float64) * 60)
+
+    # Suffix sums: column d holds the prior days from d - window on
+    remaining = np.cumsum(history[:, ::-1], axis=1)[:, ::-1]
+    prior = np.zeros((drivers, days), dtype=np.int32)
+    shared = min(days, window)
+    prior[:, :shared] = remaining[:, :shared]
+    return prior
+
+
+def _evaluate_chunk(statuses, limits, cycle_days, prior_minutes):
+    drivers, days, _ = statuses.shape
+    total = days * MINUTES_PER_DAY
+    timeline = statuses.reshape(drivers, total)
+    index = np.broadcast_to(np.arange(total, dtype=np.int32), (drivers, total))
+
+    driving = timeline == DRIVING
+    on_duty = driving | (timeline == ON_DUTY)
+    resting = ~on_duty
+    not_driving = ~driving
+
+    cum_driving = np.zeros((drivers, total + 1), dtype=np.int32)
+    np.cumsum(driving, axis=1, out=cum_driving[:, 1:])
+    cum_on_duty = np.zeros((drivers, total + 1), dtype=np.int32)
+    np.cumsum(on_duty, axis=1, out=cum_on_duty[:, 1:])
+
+    rest_run = _run_length(resting, index)
+
+    # 11-hour limit: driving since the last 10 consecutive hours off duty
+    last_rest = _last_index(rest_run == limits['off'], index)
+    shift_driving = _minutes_between(cum_driving, last_rest)
+
+    # 14-hour window: time since the first on-duty minute after that rest
+    next_duty = np.where(on_duty, index, total - 1)
+    next_duty = np.minimum.accumulate(next_duty[:, ::-1], axis=1)[:, ::-1]
+    window_start = np.take_along_axis(next_duty, np.minimum(last_rest + 1, total - 1), axis=1)
+    window_elapsed = index - window_start + 1
+
+    # 30-minute break: driving since 30 consecutive non-driving minutes
+    last_break = _last_index(_run_length(not_driving, index) == limits['break_length'], index)
+    since_break = _minutes_between(cum_driving, last_break)
+
+    # 10-hour off duty: longest rest period touching each day that had duty.
+    # Rest running off either end of the data is assumed long enough.
+    rest_ahead = _run_length(resting[:, ::-1], index)[:, ::-1]
+    rest_total = rest_run + rest_ahead - resting
+    open_ended = (rest_run == index + 1) | (rest_ahead == total - index)
+    rest_total = np.where(open_ended & resting, np.maximum(rest_total, limits['off']), rest_total)
+    longest_rest = _daily_max(rest_total, resting, days)
+    worked = on_duty.reshape(drivers, days, MINUTES_PER_DAY).any(axis=2)
+
+    # 60/70-hour cycle: on-duty minutes since max(window start, last 34-hour restart)
+    last_restart = _last_index(rest_run == limits['restart'], index)
+    day_of_minute = index // MINUTES_PER_DAY
+    cycle_start = np.maximum((day_of_minute - (cycle_days - 1)) * MINUTES_PER_DAY - 1, last_restart)
+    cycle_start = np.maximum(cycle_start, -1)
+    cycle_used = _minutes_between(cum_on_duty, cycle_start)
+    # Prior days still inside the window count until a restart happens
+    cycle_used = cycle_used + np.where(last_restart < 0, prior_minutes[:, day_of_minute[0]], 0)
+
+    checks = (
+        (RULE_DRIVING_LIMIT, _daily_max(shift_driving, driving, days), limits['driving'], False),
+        (RULE_DUTY_WINDOW, _daily_max(window_elapsed, driving, days), limits['window'], False),
+        (RULE_BREAK, _daily_max(since_break, driving, days), limits['break_after'], False),
+        (RULE_CYCLE, _daily_max(cycle_used, driving, days), limits['cycle'], False),
+        (RULE_OFF_DUTY, np.where(worked, longest_rest, limits['off']), limits['off'], True),
+    )
+
+    tables = []
+    for rule, actual, limit, is_minimum in checks:
+        violated = actual < limit if is_minimum else actual > limit
+        driver_idx, day_idx = np.nonzero(violated)
+        table = np.empty(len(driver_idx), dtype=VIOLATION_DTYPE)
+        table['driver'] = driver_idx
+        table['day'] = day_idx
+        table['rule'] = rule
+        table['actual_hours'] = actual[driver_idx, day_idx] / 60
+        table['limit_hours'] = limit / 60
+        tables.append(table)
+    return np.concatenate(tables)
+
+
+def evaluate_fleet(statuses, plan=None, cycle_used_hours=None, cycle_history=None):
+    """
+    Evaluate every HOS rule for an (N drivers, D days, 1440) status stack
+
+    Unrecorded minutes count as off duty. `cycle_history` (per-day hours,
+    oldest first) or `cycle_used_hours` optionally gives each driver's
+    on-duty hours before day 0; see prior_cycle_minutes. Returns a structured
+    array (VIOLATION_DTYPE) with one row per driver, day and broken rule,
+    sorted by driver, day and rule. Limits and the cycle length come from
+    `plan` (the default rule set when omitted); limits the plan does not
+    have are never reported.
+    """
+    plan = plan or get_rule_plan()
+    statuses = np.asarray(statuses, dtype=np.int8)
+    if statuses.ndim != 3 or statuses.shape[2] != MINUTES_PER_DAY:
+        raise ValueError('Expected an array shaped (drivers, days, 1440)')
+
+    drivers, days, _ = statuses.shape
+    cycle_days = plan.cycle_days
+    limits = {
+        'driving': plan.max_driving_minutes,
+        'window': plan.max_window_minutes,
+        'off': plan.min_off_minutes,
+        'break_after': plan.break_after_minutes,
+        'break_length': plan.break_minutes,
+        'cycle': plan.cycle_minutes,
+        'restart': plan.restart_minutes,
+    }
+    if not drivers or not days:
+        return np.empty(0, dtype=VIOLATION_DTYPE)
+
+    prior = prior_cycle_minutes(
+        drivers, days, cycle_days, cycle_used_hours, cycle_history, plan.max_window_hours
+    )
+
+    per_chunk = max(1, CHUNK_MINUTES // (days * MINUTES_PER_DAY))
+    tables = []
+    for first in range(0, drivers, per_chunk):
+        table = _evaluate_chunk(
+            statuses[first:first + per_chunk], limits, cycle_days,
+            prior[first:first + per_chunk]
+        )
+        table['driver'] += first
+        tables.append(table)
+
+    violations = np.concatenate(tables)
+    return violations[np.lexsort((violations['rule'], violations['day'], violations['driver']))]
+
+
+def violation_rows(violations, driver_ids=None, plan=None):
+    """Convert a violation table into dicts shaped like the per-day compliance output"""
+    labels = rule_labels(plan or get_rule_plan())
+    rows = []
+    for row in violations:
+        driver = int(row['driver'])
+        rows.append({
+            'driver': driver_ids[driver] if driver_ids is not None else driver,
+            'day': int(row['day']),
+            'rule': labels[int(row['rule'])],
+            'limit': float(row['limit_hours']),
+            'actual': round(float(row['actual_hours']), 2),
+            'status': 'VIOLATION'
+        })
+    return rows
@@ -0,0 +1,262 @@
+"""
+Offline gazetteer for air-mile radius checks
+Reference: 49 CFR §395.1(e) short-haul exceptions (PDF pages 12-13)
+
+A bundled city/state dataset (trips/data/us_cities.csv) is loaded once
+into parallel coordinate arrays with a one-degree grid index. Location
+strings such as "Chicago, IL" resolve locally with fuzzy matching, and
+distances are great-circle air miles, so no network calls are needed.
+"""
+
+import csv
+import difflib
+import math
+import os
+import re
+import threading
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), 'data', 'us_cities.csv')
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.05
+
+STATE_NAMES = {
+    'alabama': 'AL', 'alaska': 'AK', 'arizona': 'AZ', 'arkansas': 'AR',
+    'california': 'CA', 'colorado': 'CO', 'connecticut': 'CT', 'delaware': 'DE',
+    'district of columbia': 'DC', 'florida': 'FL', 'georgia': 'GA', 'hawaii': 'HI',
+    'idaho': 'ID', 'illinois': 'IL', 'indiana': 'IN', 'iowa': 'IA',
+    'kansas': 'KS', 'kentucky': 'KY', 'louisiana': 'LA', 'maine': 'ME',
+    'maryland': 'MD', 'massachusetts': 'MA', 'michigan': 'MI', 'minnesota': 'MN',
+    'mississippi': 'MS', 'missouri': 'MO', 'montana': 'MT', 'nebraska': 'NE',
+    'nevada': 'NV', 'new hampshire': 'NH', 'new jersey': 'NJ', 'new mexico': 'NM',
+    'new york': 'NY', 'north carolina': 'NC', 'north dakota': 'ND', 'ohio': 'OH',
+    'oklahoma': 'OK', 'oregon': 'OR', 'pennsylvania': 'PA', 'rhode island': 'RI',
+    'south carolina': 'SC', 'south dakota': 'SD', 'tennessee': 'TN', 'texas': 'TX',
+    'utah': 'UT', 'vermont': 'VT', 'virginia': 'VA', 'washington': 'WA',
+    'west virginia': 'WV', 'wisconsin': 'WI', 'wyoming': 'WY',
+}
+STATE_CODES = frozenset(STATE_NAMES.values())
+
+# Minimum difflib similarity for a fuzzy city match
+FUZZY_CUTOFF = 0.8
+
+Place = namedtuple('Place', ['city', 'state', 'lat', 'lon'])
+
+
+def great_circle_miles(lat1, lon1, lat2, lon2):
+    """Haversine distance in statute miles"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+def normalize_name(value):
+    """Lower-case, drop punctuation and spell "Saint" as "st" """
+    value = re.sub(r"[.']", '', value.lower())
+    value = re.sub(r'[^a-z0-9]+', ' ', value).strip()
+    return re.sub(r'^saint ', 'st ', value)
+
+
+def normalize_state(value):
+    """Two-letter state code for a code or full state name, else None"""
+    value = value.strip()
+    if value.upper() in STATE_CODES:
+        return value.upper()
+    return STATE_NAMES.get(normalize_name(value))
+
+
+class GridIndex:
+    """
+    Bucket points into fixed-size lat/lon cells for nearest and radius queries
+
+    Queries only visit the cells that can contain an answer, so lookups
+    stay fast without a tree structure.
+    """
+
+    def __init__(self, lats, lons, cell_degrees=1.0):
+        self.lats = lats
+        self.lons = lons
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        for i, (lat, lon) in enumerate(zip(lats, lons)):
+            self.cells.setdefault(self._cell(lat, lon), []).append(i)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _ring(self, row, col, radius):
+        """Cells on the square ring `radius` cells away from (row, col)"""
+        if radius == 0:
+            yield (row, col)
+            return
+        for d in range(-radius, radius + 1):
+            yield (row - radius, col + d)
+            yield (row + radius, col + d)
+        for d in range(-radius + 1, radius):
+            yield (row + d, col - radius)
+            yield (row + d, col + radius)
+
+    def nearest(self, lat, lon):
+        """Index of the closest point, or None if the index is empty"""
+        if not self.cells:
+            return None
+        row, col = self._cell(lat, lon)
+        best, best_miles = None, math.inf
+        # A cell edge is at least this far from the query point at this latitude
+        cell_miles = self.cell_degrees * MILES_PER_DEGREE_LAT * max(0.05, math.cos(math.radians(min(89.0, abs(lat) + self.cell_degrees))))
+        max_radius = int(360 / self.cell_degrees)
+        for radius in range(max_radius + 1):
+            if best is not None and (radius - 1) * cell_miles > best_miles:
+                break
+            for cell in self._ring(row, col, radius):
+                for i in self.cells.get(cell, ()):
+                    miles = great_circle_miles(lat, lon, self.lats[i], self.lons[i])
+                    if miles < best_miles:
+                        best, best_miles = i, miles
+        return best
+
+    def within(self, lat, lon, miles):
+        """Indexes of all points within `miles` air miles, closest first"""
+        lat_span = miles / MILES_PER_DEGREE_LAT
+        lon_span = miles / (MILES_PER_DEGREE_LAT * max(0.01, math.cos(math.radians(min(89.0, abs(lat) + lat_span)))))
+        row_lo, col_lo = self._cell(lat - lat_span, lon - lon_span)
+        row_hi, col_hi = self._cell(lat + lat_span, lon + lon_span)
+
+        found = []
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                for i in self.cells.get((row, col), ()):
+                    distance = great_circle_miles(lat, lon, self.lats[i], self.lons[i])
+                    if distance <= miles:
+                        found.append((distance, i))
+        return [i for _, i in sorted(found)]
+
+
+class Gazetteer:
+    """
+    City/state lookup table backed by parallel arrays
+
+    Rows keep the dataset order (largest cities first within a state), so a
+    bare state name resolves to its principal city.
+    """
+
+    def __init__(self, rows):
+        self.cities = []
+        self.states = []
+        self.lats = array('d')
+        self.lons = array('d')
+        self._by_key = {}
+        self._names_by_state = {}
+        self._first_in_state = {}
+
+        for city, state, lat, lon in rows:
+            i = len(self.cities)
+            self.cities.append(city)
+            self.states.append(state)
+            self.lats.append(float(lat))
+            self.lons.append(float(lon))
+
+            name = normalize_name(city)
+            self._by_key.setdefault((name, state), i)
+            self._names_by_state.setdefault(state, {}).setdefault(name, i)
+            self._first_in_state.setdefault(state, i)
+
+        self._all_names = {}
+        for (name, _), i in self._by_key.items():
+            self._all_names.setdefault(name, i)
+        self.index = GridIndex(self.lats, self.lons)
+        self._resolve = lru_cache(maxsize=4096)(self._resolve_uncached)
+
+    @classmethod
+    def from_csv(cls, path=DATA_FILE):
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            return cls([(row['city'], row['state'], row['lat'], row['lon']) for row in reader])
+
+    def __len__(self):
+        return len(self.cities)
+
+    def place(self, i):
+        return Place(self.cities[i], self.states[i], self.lats[i], self.lons[i])
+
+    def resolve(self, location):
+        """
+        Resolve "City, ST" (or "City, State", "City ST", "ST") to a Place
+
+        Returns None when nothing in the dataset matches closely enough.
+        """
+        if not location or not location.strip():
+            return None
+        i = self._resolve(location.strip())
+        return self.place(i) if i is not None else None
+
+    def _resolve_uncached(self, location):
+        city, state = self._split(location)
+        if state and not city:
+            return self._first_in_state.get(state)
+
+        name = normalize_name(city)
+        candidates = self._names_by_state.get(state, {}) if state else self._all_names
+        if name in candidates:
+            return candidates[name]
+
+        match = difflib.get_close_matches(name, candidates.keys(), n=1, cutoff=FUZZY_CUTOFF)
+        return candidates[match[0]] if match else None
+
+    def _split(self, location):
+        """Separate the city part from a trailing state code or name"""
+        if ',' in location:
+            city, _, tail = location.rpartition(',')
+            state = normalize_state(tail)
+            if state:
+                return city.strip(), state
+            return location, None
+
+        state = normalize_state(location)
+        if state:
+            return '', state
+
+        words = location.split()
+        for size in (3, 2, 1):
+            if len(words) > size:
+                state = normalize_state(' '.join(words[-size:]))
+                if state:
+                    return ' '.join(words[:-size]), state
+        return location, None
+
+    def nearest(self, lat, lon):
+        """Closest known place to a coordinate"""
+        i = self.index.nearest(lat, lon)
+        return self.place(i) if i is not None else None
+
+    def within(self, lat, lon, miles):
+        """Known places within an air-mile radius, closest first"""
+        return [self.place(i) for i in self.index.within(lat, lon, miles)]
+
+    def air_miles(self, origin, destination):
+        """Great-circle miles between two location strings, or None if either is unknown"""
+        start = self.resolve(origin)
+        end = self.resolve(destination)
+        if start is None or end is None:
+            return None
+        return great_circle_miles(start.lat, start.lon, end.lat, end.lon)
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Process-wide gazetteer, loaded on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.from_csv()
+    return _gazetteer
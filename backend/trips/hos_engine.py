@@ -0,0 +1,745 @@
+"""
+Event-driven HOS simulation engine
+References: 49 CFR §395.3 (PDF pages 6-11)
+
+Time is kept in integer minutes from midnight of the first log day. The
+engine steps from one duty-status change to the next, and every event
+updates the 11-hour, 14-hour, 30-minute break and 60/70-hour clocks in
+constant time, so a multi-week trip is simulated in linear time.
+
+The engine can be stopped and resumed at any midnight. Work is a list of
+tasks walked by a cursor (task index, minutes left of a driving task),
+and an event that runs past midnight is queued with the minutes it has
+left. `checkpoint()` captures
+the clocks, the cycle ring, the cursor and the queue as plain JSON, and
+`HOSEngine.from_checkpoint` continues from it with the same or a
+changed task list, producing exactly the days a full run would.
+
+This is the one HOS calculator: TripCalculatorView, HOSCalculator,
+ELDCalculator and the batch planner all get their day logs from
+`calculate_eld_logs` / `iter_eld_logs` and only reshape the result.
+
+Uncached, a trip costs more than it did in the per-day loops this
+replaced (about 0.2 ms against 0.1-0.15 ms; see tooling.differential).
+Those loops filled a fixed template per day from the trip totals and
+kept no clocks, which is how they drifted into cycle violations and
+dropped driving. The remaining cost is the per-event clock and log
+bookkeeping itself. Events are logged directly and only queued across
+midnight, and the calculation cache serves every entry point from one
+run.
+"""
+
+from collections import deque
+from datetime import date, timedelta
+from .cycle_tracker import CycleTracker
+from .duty_grid import parse_clock
+from .metrics import hos_calculation_seconds
+from .rule_plan import get_rule_plan
+from .services.calc_cache import calculation_cache
+
+OFF_DUTY = 'off_duty'
+SLEEPER_BERTH = 'sleeper_berth'
+DRIVING = 'driving'
+ON_DUTY = 'on_duty'
+
+MINUTES_PER_DAY = 1440
+
+# Activity and remark descriptions other modules match on
+PRETRIP_DESCRIPTION = 'Pre-trip vehicle inspection'
+POSTTRIP_DESCRIPTION = 'Post-trip inspection and paperwork'
+FUEL_DESCRIPTION = 'Fuel stop - refueling vehicle'
+LOADING_DESCRIPTION = 'Loading at pickup'
+UNLOADING_DESCRIPTION = 'Unloading at dropoff'
+
+# Leg fields that determine a schedule (routers add others, e.g. `source`)
+LEG_FIELDS = ('from', 'to', 'distance_miles', 'driving_hours')
+
+# Descriptions for reported activities that do not carry one
+REPORTED_DESCRIPTIONS = {
+    OFF_DUTY: 'Off duty',
+    SLEEPER_BERTH: 'Sleeper berth',
+    DRIVING: 'Driving',
+    ON_DUTY: 'On duty (not driving)',
+}
+
+CHECKPOINT_VERSION = 1
+
+# 'HH:MM' for every minute of the day, formatted once per process
+_CLOCK = tuple(f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(MINUTES_PER_DAY + 1))
+
+
+def hours_to_minutes(hours):
+    """Convert decimal hours to whole minutes"""
+    return int(round(hours * 60))
+
+
+def format_minute(minute_of_day):
+    """Format minutes since midnight as HH:MM (1440 -> 24:00)"""
+    return _CLOCK[minute_of_day]
+
+
+class Task:
+    """One unit of planned work: a driving leg or an on-duty stop"""
+
+    __slots__ = ('status', 'minutes', 'miles', 'description', 'location')
+
+    def __init__(self, status, minutes, description, location, miles=0):
+        self.status = status
+        self.minutes = minutes
+        self.miles = miles
+        self.description = description
+        self.location = location
+
+    def __eq__(self, other):
+        return isinstance(other, Task) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__
+        )
+
+    @property
+    def miles_per_minute(self):
+        return self.miles / self.minutes if self.minutes else 0
+
+
+def first_changed_task(old_tasks, new_tasks):
+    """Index of the first task that differs between two task lists (None if equal)"""
+    for index, (old, new) in enumerate(zip(old_tasks, new_tasks)):
+        if old != new:
+            return index
+    if len(old_tasks) != len(new_tasks):
+        return min(len(old_tasks), len(new_tasks))
+    return None
+
+
+def legs_from_route(trip_data, route_info):
+    """
+    Split route information into current→pickup and pickup→dropoff legs
+
+    Routes without per-leg data are treated as starting at the pickup.
+    """
+    if route_info.get('legs'):
+        return route_info['legs']
+
+    return [
+        {
+            'from': trip_data.get('current_location', 'Current Location'),
+            'to': trip_data.get('pickup_location', 'Pickup Location'),
+            'distance_miles': 0,
+            'driving_hours': 0,
+        },
+        {
+            'from': trip_data.get('pickup_location', 'Pickup Location'),
+            'to': trip_data.get('dropoff_location', 'Dropoff Location'),
+            'distance_miles': route_info['distance_miles'],
+            'driving_hours': route_info['driving_hours'],
+        },
+    ]
+
+
+def build_trip_tasks(trip_data, route_info, plan=None):
+    """
+    Build the task list for a pickup-and-delivery trip
+
+    Drive to the pickup, load, drive to the dropoff, unload. Inspections,
+    breaks, fuel stops and rest periods are inserted by the engine.
+    """
+    plan = plan or get_rule_plan(trip_data.get('rule_set'))
+    load_minutes = plan.load_unload_minutes
+    legs = legs_from_route(trip_data, route_info)
+    tasks = []
+
+    for index, leg in enumerate(legs):
+        minutes = hours_to_minutes(leg['driving_hours'])
+        if minutes > 0:
+            tasks.append(Task(
+                DRIVING, minutes, 'Driving', f"En route to {leg['to']}",
+                miles=leg['distance_miles']
+            ))
+        if index == 0:
+            tasks.append(Task(ON_DUTY, load_minutes, LOADING_DESCRIPTION, leg['to']))
+
+    tasks.append(Task(ON_DUTY, load_minutes, UNLOADING_DESCRIPTION, legs[-1]['to']))
+    return tasks
+
+
+class HOSEngine:
+    """
+    Minute-resolution simulator for HOS rules
+
+    Limits come from a compiled RulePlan (the default rule set unless one
+    is passed in). Rule sets without a restart provision wait off duty
+    until enough hours roll out of the cycle window.
+
+    Clocks (all in minutes):
+      shift_drive       driving since the last 10-hour rest (§395.3(a)(3))
+      window_start      first on-duty minute of the shift (§395.3(a)(2))
+      since_break       driving since the last 30-minute interruption (§395.3(a)(3)(ii))
+      cycle             on-duty minutes in the rolling 8-day window (§395.3(b))
+    """
+
+    def __init__(self, cycle_used_hours=0, start_date=None, start_minute=300,
+                 plan=None, cycle_history=None):
+        plan = plan or get_rule_plan()
+        self.plan = plan
+
+        self.max_drive = plan.max_driving_minutes
+        self.max_window = plan.max_window_minutes
+        self.min_off = plan.min_off_minutes
+        self.break_after = plan.break_after_minutes
+        self.break_length = plan.break_minutes
+        self.cycle_limit = plan.cycle_minutes
+        self.restart_length = plan.restart_minutes
+
+        self.fuel_interval = plan.fuel_interval_miles
+        self.fuel_minutes = plan.fuel_stop_minutes
+        self.inspection_minutes = plan.inspection_minutes
+
+        self.start_date = start_date or date.today()
+        self.start_minute = start_minute
+
+        # Clocks
+        self.now = 0
+        self.shift_drive = 0
+        self.window_start = None
+        self.since_break = 0
+        self.off_run = 0
+        self.non_driving_run = 0
+        self.miles_since_fuel = 0
+        self.needs_pretrip = True
+
+        # Rolling 8-day on-duty minutes
+        self.cycle = CycleTracker.for_trip(
+            {'current_cycle_used': cycle_used_hours, 'cycle_history': cycle_history},
+            limit_hours=plan.cycle_hours,
+            days=plan.cycle_days,
+            max_daily_hours=plan.max_window_hours
+        )
+
+        self.location = None
+
+        # Task cursor, and events queued but not yet (fully) logged:
+        # [status, minutes left, description, already started]
+        self.task_index = 0
+        self.task_remaining = None
+        self.pending = deque()
+        self.started = False
+        self.finished = False
+
+        self._finished_days = deque()
+        self._checkpoints = None
+        self._day_start = None
+        self._reset_day()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def simulate(self, tasks):
+        """Run the whole trip and return the list of day logs"""
+        return list(self.iter_days(tasks))
+
+    def iter_days(self, tasks, checkpoints=None):
+        """
+        Run the trip (or the rest of it), yielding each day log as soon as it is complete
+
+        When a `checkpoints` list is passed, the checkpoint each yielded day
+        starts from is appended to it, in step with the days.
+        """
+        if not self.started:
+            self.started = True
+            if self.start_minute:
+                self.pending.append([OFF_DUTY, self.start_minute, 'Off duty - rest period', False])
+        self._checkpoints = checkpoints
+        if checkpoints is not None:
+            self._day_start = self.checkpoint()
+
+        self._flush()
+        yield from self._drain()
+
+        while self.task_index < len(tasks):
+            task = tasks[self.task_index]
+            if task.status == DRIVING:
+                self.drive(task)
+            else:
+                self.location = task.location
+                self.start_shift()
+                self.task_index += 1
+                self.record(task.status, task.minutes, task.description)
+            yield from self._drain()
+
+        if not self.finished:
+            self.finished = True
+            self.end_shift(description='Off duty - trip complete', until_midnight=True)
+        yield from self._drain()
+
+    def drive(self, task):
+        """
+        Drive a leg, stopping for breaks, fuel, rest and restarts as needed
+
+        Every decision is made from the clocks alone, and its bookkeeping is
+        done before its events are logged, so a run resumed at a midnight
+        inside the leg continues exactly where it stopped.
+        """
+        if self.task_remaining is None:
+            self.task_remaining = task.minutes
+            self.location = task.location
+        miles_per_minute = task.miles_per_minute
+        cycle = self.cycle
+
+        while self.task_remaining > 0:
+            remaining = self.task_remaining
+            cycle_left = cycle.available_minutes
+            if not cycle_left:
+                if self.plan.has_restart:
+                    self.end_shift(self.restart_length, self.plan.restart_description)
+                else:
+                    # Rest through the next midnight, when the oldest day rolls off
+                    self.end_shift(-self.now % MINUTES_PER_DAY or MINUTES_PER_DAY,
+                                   'Off duty - waiting for cycle hours')
+                continue
+
+            if self.needs_pretrip:
+                self.start_shift()
+                continue
+            window_left = self.max_window
+            if self.window_start is not None:
+                window_left -= self.now - self.window_start
+            drive_left = self.max_drive - self.shift_drive
+            if drive_left <= 0 or window_left <= 0:
+                self.end_shift(self.min_off, 'Off duty - required rest period')
+                continue
+
+            break_left = self.break_after - self.since_break
+            if break_left <= 0:
+                self.day_flags['requires_break'] = True
+                self.record(OFF_DUTY, self.break_length, self.plan.break_description)
+                continue
+
+            chunk = min(remaining, drive_left, window_left, break_left, cycle_left)
+            if miles_per_minute:
+                fuel_left = int((self.fuel_interval - self.miles_since_fuel) / miles_per_minute)
+                if fuel_left <= 0:
+                    self.miles_since_fuel = 0
+                    self.day_flags['has_fuel_stop'] = True
+                    self.record(ON_DUTY, self.fuel_minutes, FUEL_DESCRIPTION)
+                    continue
+                if fuel_left < chunk:
+                    chunk = fuel_left
+            self.miles_since_fuel += chunk * miles_per_minute
+            self.task_remaining -= chunk
+            self.record(DRIVING, chunk, task.description)
+
+        self.task_index += 1
+        self.task_remaining = None
+
+    def start_shift(self):
+        """Open a new shift with a pre-trip inspection if one is due (returns whether it did)"""
+        if not self.needs_pretrip:
+            return False
+        self.needs_pretrip = False
+        self.record(ON_DUTY, self.inspection_minutes, PRETRIP_DESCRIPTION)
+        return True
+
+    def end_shift(self, rest_minutes=0, description='Off duty - required rest period',
+                  until_midnight=False):
+        """Close the current shift with a post-trip inspection and a rest period"""
+        inspection = self.inspection_minutes if self.window_start is not None else 0
+        if until_midnight:
+            rest_minutes = -(self.now + inspection) % MINUTES_PER_DAY
+        if rest_minutes >= self.restart_length:
+            self.day_flags['requires_restart'] = True
+        self.needs_pretrip = True
+        if inspection:
+            self.pending.append([ON_DUTY, inspection, POSTTRIP_DESCRIPTION, False])
+        self.record(OFF_DUTY, rest_minutes, description)
+
+    def record(self, status, minutes, description):
+        """Log a duty-status event after anything still queued"""
+        if self.pending:
+            self.pending.append([status, minutes, description, False])
+            self._flush()
+        elif minutes > 0:
+            self._log(status, minutes, description, False)
+
+    def record_day(self, activities, tasks):
+        """
+        Log a day the driver reports instead of the planned one
+
+        Must be called at a midnight (e.g. on an engine restored from that
+        day's checkpoint). `activities` must cover the whole day; whatever
+        the plan had queued is dropped. Reported driving is taken off the
+        remaining legs in order, and a stop counts as made once it is
+        reported with its planned description or driving continues past it.
+        Returns the day log, marked `reported`; planning then carries on
+        from the clocks the reported day left behind.
+        """
+        if self.now % MINUTES_PER_DAY:
+            raise ValueError('Reported days must start at midnight')
+        events = parse_reported_activities(activities)
+
+        self.started = True
+        self.finished = False
+        # Driving still queued was taken off the task when it was planned
+        for status, minutes, _, _ in self.pending:
+            if status == DRIVING and self.task_remaining is not None:
+                self.task_remaining += minutes
+                self.miles_since_fuel -= minutes * tasks[self.task_index].miles_per_minute
+        self.pending.clear()
+        for status, minutes, description in events:
+            self._consume_tasks(status, minutes, description, tasks)
+            self.record(status, minutes, description)
+
+        # A shift still open at midnight continues without a new pre-trip
+        self.needs_pretrip = self.window_start is None
+        day, _ = self._finished_days.pop()
+        day['reported'] = True
+        return day
+
+    def _consume_tasks(self, status, minutes, description, tasks):
+        """Advance the task cursor past the planned work a reported event did"""
+        if status == DRIVING:
+            while minutes > 0 and self.task_index < len(tasks):
+                task = tasks[self.task_index]
+                if task.status != DRIVING:
+                    self.location = task.location
+                    self.task_index += 1
+                    continue
+                if self.task_remaining is None:
+                    self.task_remaining = task.minutes
+                    self.location = task.location
+                driven = min(minutes, self.task_remaining)
+                self.miles_since_fuel += driven * task.miles_per_minute
+                self.task_remaining -= driven
+                minutes -= driven
+                if self.task_remaining == 0:
+                    self.task_index += 1
+                    self.task_remaining = None
+        elif self.task_index < len(tasks):
+            task = tasks[self.task_index]
+            if task.status != DRIVING and task.description == description:
+                self.location = task.location
+                self.task_index += 1
+        if description == FUEL_DESCRIPTION:
+            self.miles_since_fuel = 0
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+
+    def checkpoint(self):
+        """Engine state at a midnight as JSON-safe data (see from_checkpoint)"""
+        return {
+            'version': CHECKPOINT_VERSION,
+            'rule_set': self.plan.name,
+            'now': self.now,
+            'shift_drive': self.shift_drive,
+            'window_start': self.window_start,
+            'since_break': self.since_break,
+            'off_run': self.off_run,
+            'non_driving_run': self.non_driving_run,
+            'miles_since_fuel': self.miles_since_fuel,
+            'needs_pretrip': self.needs_pretrip,
+            'location': self.location,
+            'cycle': self.cycle.state(),
+            'task_index': self.task_index,
+            'task_remaining': self.task_remaining,
+            'pending': [list(event) for event in self.pending],
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, start_date, plan=None, start_minute=300):
+        """
+        Engine that continues from `checkpoint`
+
+        `start_date` is the trip's first log day. Raises ValueError for a
+        checkpoint of another version or rule set.
+        """
+        plan = plan or get_rule_plan(checkpoint.get('rule_set'))
+        if checkpoint.get('version') != CHECKPOINT_VERSION or checkpoint.get('rule_set') != plan.name:
+            raise ValueError('Checkpoint does not match this engine version and rule set')
+        if checkpoint['now'] % MINUTES_PER_DAY:
+            raise ValueError('Checkpoints are taken at midnight')
+
+        engine = cls(start_date=start_date, start_minute=start_minute, plan=plan)
+        for field in ('now', 'shift_drive', 'window_start', 'since_break', 'off_run', 'non_driving_run',
+                      'miles_since_fuel', 'needs_pretrip', 'location', 'task_index', 'task_remaining',
+                      'started', 'finished'):
+            setattr(engine, field, checkpoint[field])
+        engine.cycle.restore(checkpoint['cycle'])
+        engine.pending = deque(list(event) for event in checkpoint['pending'])
+        return engine
+
+    # ------------------------------------------------------------------
+    # Event log
+    # ------------------------------------------------------------------
+
+    def _flush(self):
+        """Log the queued events in order"""
+        pending = self.pending
+        while pending:
+            status, minutes, description, started = pending.popleft()
+            if minutes > 0:
+                self._log(status, minutes, description, started)
+
+    def _log(self, status, minutes, description, started):
+        """
+        Log one event from now on, splitting it at midnight
+
+        Each piece updates the clocks in O(1). While the day closes, the
+        rest of an event running past midnight is back at the head of the
+        queue, so the checkpoint taken then still holds it.
+        """
+        while True:
+            minute_of_day = self.now % MINUTES_PER_DAY
+            if not started:
+                started = True
+                self.day_remarks.append({
+                    'time': _CLOCK[minute_of_day],
+                    'location': self.location or 'Terminal',
+                    'description': description
+                })
+
+            end = minute_of_day + minutes
+            if end > MINUTES_PER_DAY:
+                end = MINUTES_PER_DAY
+            piece = end - minute_of_day
+            self._advance(status, piece)
+            self.day_activities.append({
+                'status': status,
+                'start': _CLOCK[minute_of_day],
+                'end': _CLOCK[end],
+                'duration': piece / 60,
+                'description': description
+            })
+            minutes -= piece
+            if end < MINUTES_PER_DAY:
+                return
+            if not minutes:
+                self._close_day()
+                return
+            self.pending.appendleft([status, minutes, description, True])
+            self._close_day()
+            self.pending.popleft()
+
+    # ------------------------------------------------------------------
+    # Clock bookkeeping
+    # ------------------------------------------------------------------
+
+    def _advance(self, status, minutes):
+        """Apply one event of `minutes` length to every clock"""
+        self.day_minutes[status] += minutes
+
+        if status == DRIVING or status == ON_DUTY:
+            if self.window_start is None:
+                self.window_start = self.now
+            self.cycle.add_minutes(minutes)
+            off_run = self.off_run = 0
+        else:
+            off_run = self.off_run = self.off_run + minutes
+
+        if status == DRIVING:
+            shift_drive = self.shift_drive = self.shift_drive + minutes
+            since_break = self.since_break = self.since_break + minutes
+            self.non_driving_run = 0
+
+            # Worst value of each limit reached while driving today
+            peaks = self.day_peaks
+            if shift_drive > peaks['driving']:
+                peaks['driving'] = shift_drive
+            window = self.now + minutes - self.window_start
+            if window > peaks['window']:
+                peaks['window'] = window
+            if since_break > peaks['break']:
+                peaks['break'] = since_break
+            cycle_used = self.cycle.used_minutes
+            if cycle_used > peaks['cycle']:
+                peaks['cycle'] = cycle_used
+        else:
+            self.non_driving_run += minutes
+            if self.non_driving_run >= self.break_length:
+                self.since_break = 0
+
+        if off_run >= self.min_off:
+            self.shift_drive = 0
+            self.window_start = None
+        if off_run >= self.restart_length:
+            self.cycle.restart()
+
+        self.now += minutes
+
+    def _reset_day(self):
+        self.day_activities = []
+        self.day_remarks = []
+        self.day_minutes = {OFF_DUTY: 0, SLEEPER_BERTH: 0, DRIVING: 0, ON_DUTY: 0}
+        self.day_peaks = {'driving': 0, 'window': 0, 'break': 0, 'cycle': 0}
+        self.day_flags = {'requires_restart': False, 'requires_break': False, 'has_fuel_stop': False}
+
+    def _close_day(self):
+        """Finish the current log day and roll the 8-day window at midnight"""
+        day_number = self.now // MINUTES_PER_DAY
+        minutes = self.day_minutes
+        cycle_8day = self.cycle.window_minutes()
+        cycle_7day = self.cycle.window_minutes(7)
+
+        day = {
+            'day_number': day_number,
+            'date': (self.start_date + timedelta(days=day_number - 1)).isoformat(),
+            'driving_hours': minutes[DRIVING] / 60,
+            'on_duty_hours': (minutes[DRIVING] + minutes[ON_DUTY]) / 60,
+            'off_duty_hours': minutes[OFF_DUTY] / 60,
+            'sleeper_hours': minutes[SLEEPER_BERTH] / 60,
+            'cycle_7day_total': cycle_7day / 60,
+            'cycle_8day_total': cycle_8day / 60,
+            'cycle_hours_available': self.cycle.hours_available,
+            'requires_restart': self.day_flags['requires_restart'] or cycle_8day >= self.cycle_limit,
+            'requires_break': self.day_flags['requires_break'],
+            'has_fuel_stop': self.day_flags['has_fuel_stop'],
+            'activities': self.day_activities,
+            'remarks': self.day_remarks,
+            'compliance': self._day_compliance()
+        }
+
+        self.cycle.advance_day()
+        self._reset_day()
+
+        day_start = self._day_start
+        if self._checkpoints is not None:
+            self._day_start = self.checkpoint()
+        self._finished_days.append((day, day_start))
+
+    def _day_compliance(self):
+        """Report any limit that was exceeded while driving today"""
+        violations = []
+        peaks = self.day_peaks
+
+        if peaks['driving'] > self.max_drive:
+            violations.append({
+                'rule': self.plan.driving_rule,
+                'limit': self.max_drive / 60,
+                'actual': peaks['driving'] / 60,
+                'status': 'VIOLATION'
+            })
+
+        if peaks['window'] > self.max_window:
+            violations.append({
+                'rule': self.plan.window_rule,
+                'limit': self.max_window / 60,
+                'actual': peaks['window'] / 60,
+                'status': 'VIOLATION'
+            })
+
+        if peaks['break'] > self.break_after:
+            violations.append({
+                'rule': self.plan.break_rule,
+                'limit': self.break_after / 60,
+                'actual': peaks['break'] / 60,
+                'status': 'VIOLATION'
+            })
+
+        if peaks['cycle'] > self.cycle_limit:
+            violations.append({
+                'rule': self.plan.cycle_rule,
+                'limit': self.cycle_limit / 60,
+                'actual': peaks['cycle'] / 60,
+                'status': 'VIOLATION',
+                'action': self.plan.cycle_action
+            })
+
+        return {
+            'is_compliant': len(violations) == 0,
+            'violations': violations,
+            'summary': f"{len(violations)} violation(s) found" if violations else "Fully compliant"
+        }
+
+    def _drain(self):
+        while self._finished_days:
+            day, day_start = self._finished_days.popleft()
+            if self._checkpoints is not None:
+                self._checkpoints.append(day_start)
+            yield day
+
+
+def parse_reported_activities(activities):
+    """
+    (status, minutes, description) events from a reported day's activities
+
+    Activities must run back to back from 00:00 to 24:00. Raises ValueError.
+    """
+    events = []
+    expected = 0
+    for activity in activities:
+        status = activity.get('status')
+        if status not in REPORTED_DESCRIPTIONS:
+            raise ValueError(f'Unknown duty status: {status}')
+        start, end = parse_clock(activity.get('start', '')), parse_clock(activity.get('end', ''))
+        if start != expected or end <= start:
+            raise ValueError(f"Activities must be contiguous; expected one starting at {_CLOCK[expected]}")
+        events.append((status, end - start, activity.get('description') or REPORTED_DESCRIPTIONS[status]))
+        expected = end
+    if expected != MINUTES_PER_DAY:
+        raise ValueError('Reported activities must cover the whole day (00:00-24:00)')
+    return events
+
+
+def engine_for_trip(trip_data, start_date=None, plan=None):
+    """Engine seeded with the trip's cycle use (or per-day history) and rule set"""
+    return HOSEngine(
+        cycle_used_hours=float(trip_data.get('current_cycle_used', 0) or 0),
+        cycle_history=trip_data.get('cycle_history'),
+        start_date=start_date,
+        plan=plan or get_rule_plan(trip_data.get('rule_set'))
+    )
+
+
+def iter_eld_logs(trip_data, route_info, start_date=None, plan=None, checkpoints=None):
+    """
+    Yield each day log of a trip as soon as it is complete (uncached)
+
+    Pass a list as `checkpoints` to also collect the state each day starts from.
+    """
+    plan = plan or get_rule_plan(trip_data.get('rule_set'))
+    engine = engine_for_trip(trip_data, start_date, plan)
+    return engine.iter_days(build_trip_tasks(trip_data, route_info, plan), checkpoints)
+
+
+def plan_eld_logs(trip_data, route_info, start_date=None, plan=None):
+    """
+    (day logs, checkpoints) of a trip, served from the calculation cache
+    when the same legs, cycle state, start date and rule set were planned
+    before
+
+    checkpoints[i] is the engine state day i + 1 starts from; storing it
+    with the day lets a changed trip be replanned from that day on.
+    """
+    start_date = start_date or date.today()
+    plan = plan or get_rule_plan(trip_data.get('rule_set'))
+    inputs = {
+        'current_cycle_used': float(trip_data.get('current_cycle_used', 0) or 0),
+        'cycle_history': trip_data.get('cycle_history'),
+        'legs': [
+            {field: leg[field] for field in LEG_FIELDS}
+            for leg in legs_from_route(trip_data, route_info)
+        ],
+        'start_date': start_date.isoformat(),
+        'rule_set': plan.name,
+    }
+
+    def compute():
+        checkpoints = []
+        days = list(iter_eld_logs(trip_data, route_info, start_date, plan, checkpoints))
+        return {'days': days, 'checkpoints': checkpoints}
+
+    with hos_calculation_seconds.time():
+        result = calculation_cache.get_or_compute('hos_engine_checkpointed', inputs, compute)
+    return result['days'], result['checkpoints']
+
+
+def calculate_eld_logs(trip_data, route_info, start_date=None, plan=None):
+    """Day logs of a trip (cached; see plan_eld_logs)"""
+    return plan_eld_logs(trip_data, route_info, start_date, plan)[0]
+
+
+def simulate_trip(trip_data, route_info, start_date=None):
+    """Convenience wrapper: plan a trip end to end and return its day logs"""
+    return list(iter_eld_logs(trip_data, route_info, start_date))
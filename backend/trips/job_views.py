@@ -0,0 +1,72 @@
+"""
+Submit, status and result endpoints for background planning jobs
+"""
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .jobs import job_status, submit_job
+from .models import PlanningJob
+
+
+def job_links(request, job):
+    return {
+        'status_url': request.build_absolute_uri(reverse('planning-job', args=[job.job_id])),
+        'result_url': request.build_absolute_uri(reverse('planning-job-result', args=[job.job_id])),
+    }
+
+
+class PlanningJobSubmitView(APIView):
+    """
+    Queue a trip or batch calculation
+
+    Body: {"kind": "trip", "input": {...trip...}} or
+          {"kind": "batch", "input": [...trips...]}
+
+    Input is checked the way the synchronous endpoints check it, then the
+    job is queued and 202 is returned at once with its status URL.
+    """
+
+    def post(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        try:
+            job = submit_job(data.get('kind'), data.get('input'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        links = job_links(request, job)
+        response = Response({**job_status(job), **links}, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = links['status_url']
+        return response
+
+
+class PlanningJobView(APIView):
+    """Current status of a job"""
+
+    def get(self, request, job_id):
+        try:
+            job = PlanningJob.objects.defer('input', 'result').get(job_id=job_id)
+        except PlanningJob.DoesNotExist:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({**job_status(job), **job_links(request, job)})
+
+
+class PlanningJobResultView(APIView):
+    """
+    Result of a finished job: the body the synchronous endpoint would have returned
+
+    409 while the job is queued or running, or when it failed.
+    """
+
+    def get(self, request, job_id):
+        try:
+            job = PlanningJob.objects.defer('input').get(job_id=job_id)
+        except PlanningJob.DoesNotExist:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if job.status != PlanningJob.SUCCEEDED:
+            error = job.error if job.status == PlanningJob.FAILED else 'Job is not finished'
+            return Response({'error': error, **job_status(job)}, status=status.HTTP_409_CONFLICT)
+        return Response(job.result)
@@ -0,0 +1,217 @@
+"""
+Database-backed queue for planning runs that outlive a request
+
+Clients submit a trip or a batch and get a job ID back at once; a
+`manage.py run_planning_worker` process claims queued jobs, runs them
+exactly like the synchronous endpoints would, and stores the response
+body on the job for the result endpoint.
+
+Claiming uses SELECT ... FOR UPDATE SKIP LOCKED where the database has
+it, so any number of workers take different jobs without waiting on each
+other. SQLite has no row locks (writers are serialized anyway), so there
+a job is claimed with a conditional UPDATE on its status instead.
+
+Running jobs send a heartbeat; a job whose heartbeat stops is requeued.
+A job can therefore run more than once, so it only calculates while it
+runs and saves its trips in the same transaction as its outcome, while
+the claim is still held: a run that lost its claim saves nothing.
+"""
+
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import PlanningJob
+from .views import TripBatchView, TripCalculatorView
+from .services.batch_planner import iter_plan_trips
+from .services.trip_store import save_trip_result
+
+logger = logging.getLogger(__name__)
+
+# Queued rows tried per claim when falling back to conditional updates
+CLAIM_CANDIDATES = 10
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def validate_job_input(kind, data):
+    """Reject a job whose input the synchronous endpoint would reject; raises ValueError"""
+    if kind == PlanningJob.KIND_TRIP:
+        if not isinstance(data, dict):
+            raise ValueError('A trip job input must be a JSON object')
+        error = TripCalculatorView().validate_input(data)
+        if error:
+            raise ValueError(error)
+    elif kind == PlanningJob.KIND_BATCH:
+        TripBatchView.check_batch_size(data)
+    else:
+        raise ValueError(f'Unknown job kind: {kind}')
+
+
+def submit_job(kind, data):
+    """Validate and queue a job"""
+    validate_job_input(kind, data)
+    return PlanningJob.objects.create(kind=kind, input=data)
+
+
+class Heartbeat:
+    """Reports a claimed job alive; `beat` writes at most once per interval"""
+
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = settings.PLANNING_JOBS['HEARTBEAT_SECONDS'] if interval is None else interval
+        self._last = time.monotonic()
+
+    def beat(self):
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+        PlanningJob.objects.filter(
+            pk=self.job.pk, status=PlanningJob.RUNNING, locked_by=self.job.locked_by
+        ).update(heartbeat_at=timezone.now())
+
+
+# Runners calculate a job and return a callable that stores it and returns
+# the job result; run_job calls it inside the outcome transaction.
+
+def _run_trip(data, heartbeat):
+    result = TripCalculatorView().calculate_trip(data)
+
+    def store():
+        save_trip_result(data, result)
+        return result
+    return store
+
+
+def _run_batch(data, heartbeat):
+    results, valid_indexes, valid_trips = TripBatchView.validate_batch(data)
+    outcomes = []
+    for outcome in iter_plan_trips(valid_trips):
+        outcomes.append(outcome)
+        heartbeat.beat()
+    return lambda: TripBatchView.store_batch(results, valid_indexes, valid_trips, outcomes)
+
+
+JOB_RUNNERS = {
+    PlanningJob.KIND_TRIP: _run_trip,
+    PlanningJob.KIND_BATCH: _run_batch,
+}
+
+
+def claim_next_job(worker_id=None):
+    """Mark the oldest queued job as running for this worker and return it, or None"""
+    worker_id = worker_id or default_worker_id()
+    now = timezone.now()
+    claim = {
+        'status': PlanningJob.RUNNING,
+        'locked_by': worker_id,
+        'started_at': now,
+        'heartbeat_at': now,
+    }
+    queued = PlanningJob.objects.filter(status=PlanningJob.QUEUED).order_by('created_at', 'id')
+    connection = connections[router.db_for_write(PlanningJob)]
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=connection.alias):
+            job = queued.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            for field, value in claim.items():
+                setattr(job, field, value)
+            job.attempts += 1
+            job.save(update_fields=list(claim) + ['attempts'])
+            return job
+
+    for pk in queued.values_list('pk', flat=True)[:CLAIM_CANDIDATES]:
+        if PlanningJob.objects.filter(pk=pk, status=PlanningJob.QUEUED).update(
+                attempts=F('attempts') + 1, **claim):
+            return PlanningJob.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """
+    Run a claimed job and store its result or error
+
+    The trips the job creates and its outcome are written in one
+    transaction, and only while this worker still holds the claim; a job
+    that was requeued as stale in the meantime is left to its new owner
+    and nothing is saved. Returns True when the outcome was stored.
+    """
+    outcome = {'status': PlanningJob.FAILED, 'finished_at': None, 'error': '', 'result': None}
+    store = None
+    try:
+        store = JOB_RUNNERS[job.kind](job.input, Heartbeat(job))
+    except Exception as e:
+        logger.exception('Planning job %s failed', job.job_id)
+        outcome['error'] = str(e)
+
+    claim = PlanningJob.objects.filter(pk=job.pk, status=PlanningJob.RUNNING, locked_by=job.locked_by)
+    with transaction.atomic():
+        # Takes the row lock, so the job cannot be requeued while its trips are saved
+        if not claim.update(heartbeat_at=timezone.now()):
+            logger.warning('Planning job %s was reclaimed before it finished', job.job_id)
+            return False
+        if store is not None:
+            try:
+                with transaction.atomic():
+                    outcome['result'] = store()
+                outcome['status'] = PlanningJob.SUCCEEDED
+            except Exception as e:
+                logger.exception('Storing planning job %s failed', job.job_id)
+                outcome['error'] = str(e)
+        outcome['finished_at'] = timezone.now()
+        claim.update(**outcome)
+
+    for field, value in outcome.items():
+        setattr(job, field, value)
+    return True
+
+
+def requeue_stale_jobs(stale_seconds=None, max_attempts=None):
+    """
+    Recover jobs whose worker died mid-run
+
+    Running jobs without a heartbeat for more than `stale_seconds` go
+    back on the queue, or fail once they have used up their attempts.
+    Returns (requeued, failed) counts.
+    """
+    stale_seconds = stale_seconds or settings.PLANNING_JOBS['STALE_SECONDS']
+    max_attempts = max_attempts or settings.PLANNING_JOBS['MAX_ATTEMPTS']
+    cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+    stale = PlanningJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=PlanningJob.RUNNING
+    )
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=PlanningJob.FAILED, error='Worker stopped responding', finished_at=timezone.now()
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status=PlanningJob.QUEUED, locked_by='', started_at=None, heartbeat_at=None
+    )
+    return requeued, failed
+
+
+def job_status(job):
+    """Public view of a job, without its input or result"""
+    return {
+        'job_id': job.job_id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'heartbeat_at': job.heartbeat_at,
+        'finished_at': job.finished_at,
+    }
@@ -0,0 +1,158 @@
+"""
+Precomputed lane distance/duration matrix
+
+`manage.py build_lane_matrix` writes road miles and driving hours for
+every pair of a configured set of locations into one binary file. The
+file is opened with mmap, so all worker processes on a host share a
+single copy through the OS page cache, and a lookup is two float reads.
+
+A rebuild replaces the file by rename. Each process compares the file's
+inode, mtime and size with those of its open mapping whenever it fetches
+the matrix (see get_lane_matrix), so serving workers switch to a new
+matrix without a restart.
+
+File layout (native float32, little-endian flag in the header):
+    header   magic, byte-order flag, location count, name block length
+    names    "City|ST" keys, newline separated, UTF-8, padded to 8 bytes
+    miles    count x count float32, row = origin
+    hours    count x count float32 (NaN where no route exists)
+"""
+
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from django.conf import settings
+
+LANE_MAGIC = b'ELDLANE1'
+LANE_HEADER = struct.Struct('<8sB3xII')
+
+
+def place_key(place):
+    return f'{place.city}|{place.state}'
+
+
+def write_lane_matrix(path, places, rows):
+    """
+    Write a matrix file for `places`
+
+    `rows` yields one list of (miles, hours) per origin, in `places` order;
+    None marks an unreachable pair. The file is written next to `path` and
+    renamed into place so readers never see a partial matrix.
+    """
+    count = len(places)
+    names = '\n'.join(place_key(place) for place in places).encode('utf-8')
+    names += b'\0' * (-(LANE_HEADER.size + len(names)) % 8)
+
+    miles = array('f')
+    hours = array('f')
+    for row in rows:
+        for cell in row:
+            miles.append(cell[0] if cell is not None else math.nan)
+            hours.append(cell[1] if cell is not None else math.nan)
+    if len(miles) != count * count:
+        raise ValueError('Lane matrix rows do not match the location count')
+
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(LANE_HEADER.pack(LANE_MAGIC, sys.byteorder == 'little', count, len(names)))
+        f.write(names)
+        miles.tofile(f)
+        hours.tofile(f)
+    os.replace(temp_path, path)
+
+
+def file_identity(path):
+    """(inode, mtime, size) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class LaneMatrix:
+    """Read-only, memory-mapped view of a lane matrix file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, little_endian, count, names_length = LANE_HEADER.unpack_from(self._map)
+        if magic != LANE_MAGIC:
+            raise ValueError(f'{path} is not a lane matrix file')
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise ValueError(f'{path} was built on a host with a different byte order')
+
+        start = LANE_HEADER.size
+        names = self._map[start:start + names_length].rstrip(b'\0').decode('utf-8')
+        self.index = {key: i for i, key in enumerate(names.split('\n'))} if count else {}
+        self.count = count
+
+        cells = count * count
+        data = memoryview(self._map)[start + names_length:]
+        self._miles = data[:cells * 4].cast('f')
+        self._hours = data[cells * 4:cells * 8].cast('f')
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, place):
+        return place_key(place) in self.index
+
+    def lookup(self, origin, destination):
+        """(miles, hours) between two gazetteer places, or None if either is not in the matrix"""
+        row = self.index.get(place_key(origin))
+        col = self.index.get(place_key(destination))
+        if row is None or col is None:
+            return None
+        cell = row * self.count + col
+        miles = self._miles[cell]
+        if math.isnan(miles):
+            return None
+        return miles, self._hours[cell]
+
+    def close(self):
+        self._miles.release()
+        self._hours.release()
+        self._map.close()
+
+
+_NOT_LOADED = object()
+
+_lanes = None
+_lanes_identity = _NOT_LOADED
+_lanes_lock = threading.Lock()
+
+
+def get_lane_matrix():
+    """
+    Process-wide matrix from LANE_MATRIX['FILE'], or None when not built
+
+    The file is stat'ed on every call and reopened when it was replaced
+    or removed. The old mapping is left to the garbage collector, since
+    lookups still in flight may hold a reference to it.
+    """
+    global _lanes, _lanes_identity
+    path = settings.LANE_MATRIX['FILE']
+    identity = file_identity(path) if path else None
+    if identity != _lanes_identity:
+        with _lanes_lock:
+            if identity != _lanes_identity:
+                _lanes = LaneMatrix(path) if identity is not None else None
+                _lanes_identity = _lanes.identity if _lanes is not None else None
+    return _lanes
+
+
+def reset_lane_matrix():
+    """Reopen the file on the next lookup even if it looks unchanged"""
+    global _lanes, _lanes_identity
+    with _lanes_lock:
+        _lanes = None
+        _lanes_identity = _NOT_LOADED
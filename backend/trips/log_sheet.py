@@ -0,0 +1,316 @@
+"""
+Printable driver's daily log sheets (SVG and PDF)
+Reference: 49 CFR §395.8 graph-grid format (PDF pages 15-18)
+
+Each EldLog day is laid out once as a list of drawing primitives (lines,
+rectangles, text) in page points with a top-left origin, and then
+serialized to SVG or to a PDF content stream. Serialized pages are
+cached under a hash of the day's contents, so reprinting an unchanged
+log is a cache hit. PDFs are streamed one page at a time.
+"""
+
+import zlib
+
+from django.conf import settings
+
+from .duty_grid import MINUTES_PER_DAY, ROW_LABELS, STATUSES, DutyGrid
+from .services.calc_cache import CalculationCache
+from .services.trip_store import eld_log_to_day, result_logs
+
+# Bump when the layout changes so cached pages are not reused
+RENDER_VERSION = 1
+
+# US Letter, landscape
+PAGE_WIDTH = 792
+PAGE_HEIGHT = 612
+
+GRID_LEFT = 130
+GRID_TOP = 150
+HOUR_WIDTH = 24
+ROW_HEIGHT = 26
+GRID_WIDTH = HOUR_WIDTH * 24
+GRID_HEIGHT = ROW_HEIGHT * len(STATUSES)
+TOTALS_LEFT = GRID_LEFT + GRID_WIDTH + 12
+
+REMARK_LINE_HEIGHT = 12
+MAX_REMARK_LINES = 18
+
+render_cache = CalculationCache(
+    max_entries=settings.LOG_SHEET['CACHE_ENTRIES'],
+    ttl_seconds=settings.LOG_SHEET['CACHE_TTL_SECONDS'],
+    backend=settings.TRIP_CALC_CACHE['BACKEND'],
+    enabled=settings.LOG_SHEET['CACHE_ENABLED'],
+)
+
+
+def hour_label(hour):
+    if hour in (0, 24):
+        return 'Mid'
+    if hour == 12:
+        return 'Noon'
+    return str(hour % 12)
+
+
+def page_inputs(trip, day, total_days):
+    """Everything a page depends on; hashed for the render cache key"""
+    return {
+        'version': RENDER_VERSION,
+        'trip_id': trip.trip_id,
+        'from': trip.current_location,
+        'to': trip.dropoff_location,
+        'total_days': total_days,
+        'day': day,
+    }
+
+
+def layout_page(inputs):
+    """Drawing primitives for one log day, top-left origin, in points"""
+    day = inputs['day']
+    ops = []
+
+    # Header
+    ops.append(('text', 36, 40, 16, True, "DRIVER'S DAILY LOG (24 HOURS)", 'start'))
+    ops.append(('text', PAGE_WIDTH - 36, 40, 11, False,
+                f"Date: {day['date']}   Day {day['day_number']} of {inputs['total_days']}", 'end'))
+    ops.append(('text', 36, 62, 10, False, f"Trip: {inputs['trip_id']}", 'start'))
+    ops.append(('text', 36, 78, 10, False, f"From: {inputs['from']}", 'start'))
+    ops.append(('text', 36, 94, 10, False, f"To: {inputs['to']}", 'start'))
+    ops.append(('text', PAGE_WIDTH - 36, 62, 10, False,
+                f"8-day cycle: {day.get('cycle_8day_total', 0):.2f} h   "
+                f"7-day cycle: {day.get('cycle_7day_total', 0):.2f} h", 'end'))
+
+    # Grid frame, row dividers and hour lines
+    ops.append(('rect', GRID_LEFT, GRID_TOP, GRID_WIDTH, GRID_HEIGHT, 1))
+    for row in range(1, len(STATUSES)):
+        y = GRID_TOP + row * ROW_HEIGHT
+        ops.append(('line', GRID_LEFT, y, GRID_LEFT + GRID_WIDTH, y, 0.75))
+    for hour in range(25):
+        x = GRID_LEFT + hour * HOUR_WIDTH
+        if 0 < hour < 24:
+            ops.append(('line', x, GRID_TOP, x, GRID_TOP + GRID_HEIGHT, 0.5))
+        ops.append(('text', x, GRID_TOP - 6, 7, False, hour_label(hour), 'middle'))
+        if hour == 24:
+            continue
+        # Quarter-hour ticks hang from the top of each row
+        for quarter in (1, 2, 3):
+            tick_x = x + quarter * HOUR_WIDTH / 4
+            length = 8 if quarter == 2 else 5
+            for row in range(len(STATUSES)):
+                y = GRID_TOP + row * ROW_HEIGHT
+                ops.append(('line', tick_x, y, tick_x, y + length, 0.4))
+
+    # Row labels and totals column
+    grid = DutyGrid.from_activities(day.get('activities', []))
+    totals = grid.totals()
+    ops.append(('text', TOTALS_LEFT, GRID_TOP - 6, 7, True, 'TOTAL HOURS', 'start'))
+    for row, label in enumerate(ROW_LABELS):
+        y = GRID_TOP + row * ROW_HEIGHT + ROW_HEIGHT / 2 + 3
+        ops.append(('text', 36, y, 8, True, label, 'start'))
+        ops.append(('text', TOTALS_LEFT, y, 9, False, f'{totals[STATUSES[row]]:5.2f}', 'start'))
+    ops.append(('text', TOTALS_LEFT, GRID_TOP + GRID_HEIGHT + 14, 9, True,
+                f'{sum(totals.values()):5.2f}', 'start'))
+
+    # Duty-status line: a horizontal run per status, joined by verticals
+    previous = None
+    for status, start, end in grid.runs():
+        y = GRID_TOP + STATUSES.index(status) * ROW_HEIGHT + ROW_HEIGHT / 2
+        x1 = GRID_LEFT + start * GRID_WIDTH / MINUTES_PER_DAY
+        x2 = GRID_LEFT + end * GRID_WIDTH / MINUTES_PER_DAY
+        if previous is not None and previous[0] == start:
+            ops.append(('line', x1, previous[1], x1, y, 2))
+        ops.append(('line', x1, y, x2, y, 2))
+        previous = (end, y)
+
+    # Remarks
+    top = GRID_TOP + GRID_HEIGHT + 40
+    ops.append(('text', 36, top, 11, True, 'REMARKS', 'start'))
+    remarks = day.get('remarks', [])
+    for index, remark in enumerate(remarks[:MAX_REMARK_LINES]):
+        text = f"{remark.get('time', '')}  {remark.get('location', '')}"
+        if remark.get('description'):
+            text += f" - {remark['description']}"
+        ops.append(('text', 36, top + (index + 1) * REMARK_LINE_HEIGHT, 8, False, text, 'start'))
+    if len(remarks) > MAX_REMARK_LINES:
+        ops.append(('text', 36, top + (MAX_REMARK_LINES + 1) * REMARK_LINE_HEIGHT, 8, False,
+                    f'... {len(remarks) - MAX_REMARK_LINES} more', 'start'))
+
+    # Compliance
+    violations = (day.get('compliance') or {}).get('violations', [])
+    column = PAGE_WIDTH / 2 + 40
+    ops.append(('text', column, top, 11, True, 'HOS COMPLIANCE', 'start'))
+    if violations:
+        for index, violation in enumerate(violations[:MAX_REMARK_LINES]):
+            ops.append(('text', column, top + (index + 1) * REMARK_LINE_HEIGHT, 8, False,
+                        f"{violation['rule']}: {violation['actual']} h (limit {violation['limit']} h)", 'start'))
+    else:
+        ops.append(('text', column, top + REMARK_LINE_HEIGHT, 8, False, 'No violations', 'start'))
+
+    return ops
+
+
+# SVG
+
+def _xml_escape(text):
+    return (str(text).replace('&', '&amp;').replace('<', '&lt;')
+            .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+def _svg_ops(ops):
+    parts = []
+    for op in ops:
+        kind = op[0]
+        if kind == 'line':
+            _, x1, y1, x2, y2, width = op
+            parts.append(f'<line x1="{x1:g}" y1="{y1:g}" x2="{x2:g}" y2="{y2:g}" stroke-width="{width:g}"/>')
+        elif kind == 'rect':
+            _, x, y, w, h, width = op
+            parts.append(f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" fill="none" stroke-width="{width:g}"/>')
+        else:
+            _, x, y, size, bold, text, anchor = op
+            weight = ' font-weight="bold"' if bold else ''
+            parts.append(
+                f'<text x="{x:g}" y="{y:g}" font-size="{size}" text-anchor="{anchor}"{weight}>'
+                f'{_xml_escape(text)}</text>'
+            )
+    return ''.join(parts)
+
+
+def svg_page_body(inputs):
+    """One page's SVG elements (cached)"""
+    return render_cache.get_or_compute(
+        'log_sheet_svg', inputs, lambda: _svg_ops(layout_page(inputs))
+    )
+
+
+def svg_document(bodies, page_count):
+    """Wrap page bodies in one SVG, stacked vertically; yields text chunks"""
+    height = PAGE_HEIGHT * max(page_count, 1)
+    yield (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{PAGE_WIDTH}" height="{height}" '
+        f'viewBox="0 0 {PAGE_WIDTH} {height}" font-family="Helvetica, Arial, sans-serif">'
+    )
+    for index, body in enumerate(bodies):
+        yield (
+            f'<g transform="translate(0 {index * PAGE_HEIGHT})" stroke="#000" fill="#000">'
+            f'<rect width="{PAGE_WIDTH}" height="{PAGE_HEIGHT}" fill="#fff" stroke="none"/>'
+            f'{body}</g>'
+        )
+    yield '</svg>'
+
+
+# PDF
+
+def _pdf_text(text):
+    """Latin-1 PDF string literal with (, ) and \\ escaped"""
+    text = str(text).encode('latin-1', 'replace').decode('latin-1')
+    return '(' + text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+
+def _text_width(text, size):
+    # Helvetica averages a little over half an em per character
+    return len(text) * size * 0.52
+
+
+def _pdf_ops(ops):
+    """PDF content stream operators; y is flipped to the bottom-left origin"""
+    lines = []
+    for op in ops:
+        kind = op[0]
+        if kind == 'line':
+            _, x1, y1, x2, y2, width = op
+            lines.append(f'{width:g} w {x1:.2f} {PAGE_HEIGHT - y1:.2f} m {x2:.2f} {PAGE_HEIGHT - y2:.2f} l S')
+        elif kind == 'rect':
+            _, x, y, w, h, width = op
+            lines.append(f'{width:g} w {x:.2f} {PAGE_HEIGHT - y - h:.2f} {w:.2f} {h:.2f} re S')
+        else:
+            _, x, y, size, bold, text, anchor = op
+            if anchor == 'middle':
+                x -= _text_width(text, size) / 2
+            elif anchor == 'end':
+                x -= _text_width(text, size)
+            font = '/F2' if bold else '/F1'
+            lines.append(f'BT {font} {size} Tf {x:.2f} {PAGE_HEIGHT - y:.2f} Td {_pdf_text(text)} Tj ET')
+    return '\n'.join(lines)
+
+
+def pdf_page_content(inputs):
+    """One page's PDF content stream as latin-1 text (cached)"""
+    return render_cache.get_or_compute(
+        'log_sheet_pdf', inputs, lambda: _pdf_ops(layout_page(inputs))
+    )
+
+
+def pdf_document(contents, page_count):
+    """
+    Stream a PDF from per-page content streams; yields bytes
+
+    Object numbers are fixed by `page_count`, so the page tree is written
+    first and each page follows as soon as its content is available. The
+    cross-reference table comes last, once every offset is known.
+    """
+    offsets = []
+    position = 0
+
+    def emit(body):
+        nonlocal position
+        offsets.append(position)
+        chunk = f'{len(offsets)} 0 obj\n'.encode('latin-1') + body + b'\nendobj\n'
+        position += len(chunk)
+        return chunk
+
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    position = len(header)
+    yield header
+
+    kids = ' '.join(f'{6 + 2 * i} 0 R' for i in range(page_count))
+    yield emit(b'<< /Type /Catalog /Pages 2 0 R >>')
+    yield emit(f'<< /Type /Pages /Kids [{kids}] /Count {page_count} >>'.encode('latin-1'))
+    yield emit(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+    yield emit(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+    for index, content in enumerate(contents):
+        if index >= page_count:
+            raise ValueError('More pages than announced')
+        stream = zlib.compress(content.encode('latin-1'))
+        yield emit(
+            f'<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n'.encode('latin-1')
+            + stream + b'\nendstream'
+        )
+        yield emit((
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {5 + 2 * index} 0 R >>'
+        ).encode('latin-1'))
+
+    if len(offsets) != 4 + 2 * page_count:
+        raise ValueError('Fewer pages than announced')
+
+    xref = [f'xref\n0 {len(offsets) + 1}\n', '0000000000 65535 f \n']
+    xref.extend(f'{offset:010d} 00000 n \n' for offset in offsets)
+    xref.append(f'trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{position}\n%%EOF\n')
+    yield ''.join(xref).encode('latin-1')
+
+
+# Trip-level helpers used by the views
+
+def iter_trip_pages(trip, page_builder, day_number=None, chunk_size=100):
+    """Yield serialized pages for a stored trip, reading log rows in chunks"""
+    total_days = trip.eld_logs.count()
+    logs = result_logs(trip).order_by('day_number')
+    if day_number is not None:
+        logs = logs.filter(day_number=day_number)
+    for log in logs.iterator(chunk_size=chunk_size):
+        yield page_builder(page_inputs(trip, eld_log_to_day(log), total_days))
+
+
+def trip_pdf(trip, day_number=None):
+    """(page_count, byte iterator) for a trip's log sheets"""
+    logs = trip.eld_logs.all()
+    count = logs.filter(day_number=day_number).count() if day_number is not None else logs.count()
+    return count, pdf_document(iter_trip_pages(trip, pdf_page_content, day_number), count)
+
+
+def trip_svg(trip, day_number=None):
+    """(page_count, text iterator) for a trip's log sheets"""
+    logs = trip.eld_logs.all()
+    count = logs.filter(day_number=day_number).count() if day_number is not None else logs.count()
+    return count, svg_document(iter_trip_pages(trip, svg_page_body, day_number), count)
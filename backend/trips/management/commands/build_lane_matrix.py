@@ -0,0 +1,59 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from trips.gazetteer import get_gazetteer
+from trips.lane_matrix import write_lane_matrix
+from trips.routing import RoadGraph, Router, reset_router
+
+
+class Command(BaseCommand):
+    help = (
+        'Precompute road miles and driving hours between configured locations '
+        'into a memory-mapped lane matrix file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--locations-file',
+                            help='Text file with one "City, ST" per line (default: LANE_MATRIX["LOCATIONS"])')
+        parser.add_argument('--output', default=settings.LANE_MATRIX['FILE'])
+
+    def handle(self, *args, **options):
+        gazetteer = get_gazetteer()
+        places = self.resolve_places(gazetteer, self.location_names(options['locations_file']))
+        if not places:
+            raise CommandError('No locations to include in the lane matrix')
+
+        graph_file = settings.ROUTING['GRAPH_FILE']
+        graph = RoadGraph.load(graph_file) if graph_file and os.path.exists(graph_file) else None
+        if graph is None:
+            self.stdout.write(self.style.WARNING('No road graph found; using great-circle estimates'))
+        router = Router(graph, gazetteer)
+
+        rows = (router.measure_from(place, places) for place in places)
+        write_lane_matrix(options['output'], places, rows)
+        # Serving processes notice the replaced file on their next lookup
+        reset_router()
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote a {len(places)}x{len(places)} lane matrix to {options['output']}"
+        ))
+
+    def location_names(self, path):
+        if path:
+            with open(path, encoding='utf-8') as f:
+                return [line.strip() for line in f if line.strip()]
+        return settings.LANE_MATRIX['LOCATIONS']
+
+    def resolve_places(self, gazetteer, names):
+        if not names:
+            return [gazetteer.place(i) for i in range(len(gazetteer))]
+
+        places = []
+        for name in names:
+            place = gazetteer.resolve(name)
+            if place is None:
+                raise CommandError(f'Unknown location: {name}')
+            if place not in places:
+                places.append(place)
+        return places
@@ -0,0 +1,82 @@
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from trips.gazetteer import get_gazetteer, great_circle_miles
+from trips.routing import RoadGraph, reset_router
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the binary road graph used for routing, either from node/edge CSV '
+        'files (e.g. an OSM-derived extract) or by linking gazetteer cities to '
+        'their nearest neighbours'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nodes', help='CSV with id,lat,lon columns')
+        parser.add_argument('--edges', help='CSV with from,to,miles[,minutes][,oneway] columns')
+        parser.add_argument('--from-gazetteer', action='store_true',
+                            help='Link each gazetteer city to its nearest neighbours')
+        parser.add_argument('--neighbors', type=int, default=6,
+                            help='Neighbours per city with --from-gazetteer (default 6)')
+        parser.add_argument('--max-link-miles', type=float, default=400,
+                            help='Longest synthetic link with --from-gazetteer (default 400)')
+        parser.add_argument('--speed', type=float,
+                            default=settings.HOS_CONFIG['ASSUMPTIONS']['AVERAGE_SPEED'],
+                            help='Speed (mph) for edges without a duration')
+        parser.add_argument('--output', default=settings.ROUTING['GRAPH_FILE'])
+
+    def handle(self, *args, **options):
+        if options['from_gazetteer']:
+            nodes, edges = self.gazetteer_network(options)
+        elif options['nodes'] and options['edges']:
+            nodes, edges = self.read_csv(options['nodes'], options['edges'], options['speed'])
+        else:
+            raise CommandError('Pass --nodes and --edges, or --from-gazetteer')
+
+        graph = RoadGraph.from_edges(nodes, edges)
+        graph.save(options['output'])
+        reset_router()
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {graph.node_count} nodes and {graph.edge_count} directed edges to {options['output']}"
+        ))
+
+    def read_csv(self, nodes_path, edges_path, speed):
+        ids = {}
+        nodes = []
+        with open(nodes_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                ids[row['id']] = len(nodes)
+                nodes.append((float(row['lat']), float(row['lon'])))
+
+        edges = []
+        with open(edges_path, newline='', encoding='utf-8') as f:
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    source, target = ids[row['from']], ids[row['to']]
+                except KeyError as e:
+                    raise CommandError(f'{edges_path}:{line}: unknown node {e}')
+                miles = float(row['miles'])
+                minutes = float(row['minutes']) if row.get('minutes') else miles / speed * 60
+                oneway = (row.get('oneway') or '').strip().lower() in ('1', 'true', 'yes')
+                edges.append((source, target, miles, minutes, oneway))
+        return nodes, edges
+
+    def gazetteer_network(self, options):
+        gazetteer = get_gazetteer()
+        detour = settings.ROUTING['DETOUR_FACTOR']
+        nodes = list(zip(gazetteer.lats, gazetteer.lons))
+
+        links = set()
+        for node, (lat, lon) in enumerate(nodes):
+            nearby = gazetteer.index.within(lat, lon, options['max_link_miles'])
+            for other in [i for i in nearby if i != node][:options['neighbors']]:
+                links.add((min(node, other), max(node, other)))
+
+        edges = []
+        for a, b in sorted(links):
+            miles = great_circle_miles(*nodes[a], *nodes[b]) * detour
+            edges.append((a, b, miles, miles / options['speed'] * 60, False))
+        return nodes, edges
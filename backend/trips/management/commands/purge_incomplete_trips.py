@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from trips.services.trip_store import purge_incomplete_trips
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete streamed trips that were never finished (the process writing them '
+        'died mid-stream); readers already skip them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-minutes', type=int, default=60,
+                            help='Only delete trips not written to for this long')
+
+    def handle(self, *args, **options):
+        minutes = options['older_than_minutes']
+        if minutes < 1:
+            raise CommandError('--older-than-minutes must be at least 1')
+        deleted = purge_incomplete_trips(timedelta(minutes=minutes))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} incomplete trips'))
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from trips.jobs import claim_next_job, default_worker_id, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Claim and run queued planning jobs (trip and batch calculations)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run until the queue is empty, then exit')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Exit after this many jobs (default: no limit)')
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.PLANNING_JOBS['POLL_SECONDS'],
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--worker-id', default=None,
+                            help='Name recorded on claimed jobs (default: host:pid)')
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+        max_jobs = options['max_jobs']
+        processed = 0
+        self.stdout.write(f'Planning worker {worker_id} started')
+
+        try:
+            while not max_jobs or processed < max_jobs:
+                requeued, failed = requeue_stale_jobs()
+                if requeued or failed:
+                    self.stdout.write(self.style.WARNING(
+                        f'Recovered stale jobs: {requeued} requeued, {failed} failed'
+                    ))
+
+                job = claim_next_job(worker_id)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                started = time.perf_counter()
+                run_job(job)
+                processed += 1
+                style = self.style.SUCCESS if job.status == job.SUCCEEDED else self.style.ERROR
+                self.stdout.write(style(
+                    f'{job.job_id} ({job.kind}) {job.status} in {time.perf_counter() - started:.2f}s'
+                ))
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted')
+
+        self.stdout.write(f'Planning worker {worker_id} processed {processed} job(s)')
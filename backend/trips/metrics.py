@@ -0,0 +1,353 @@
+"""
+In-process metrics with a file-backed aggregate across workers
+
+Counters and histograms are recorded into per-thread shards, so the hot
+path never takes a lock; shards are only summed when a snapshot is taken,
+and shards of finished threads are folded into a retired total.
+
+Each process writes its snapshot to `METRICS['DIR']/<pid>-<token>.json`
+(atomically, at most every FLUSH_SECONDS while recording). `/metrics`
+flushes the serving worker, merges every file in the directory and
+renders the Prometheus text format, so a scrape sees all gunicorn
+workers no matter which one answers it. Files of processes that have
+exited are deleted when found, so a restarted worker's counts are not
+summed in forever (Prometheus reads the drop as a counter reset). With
+no DIR configured only the serving process is reported.
+"""
+
+import bisect
+import functools
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Metric:
+    """Named metric whose values are kept per label set in per-thread shards"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []       # (thread, {label values: value})
+        self._retired = {}
+
+    def _shard(self):
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f'{self.name} takes labels {self.labels}, got {tuple(labels)}')
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def samples(self):
+        """{label values: value} summed over every thread"""
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # The thread will not write again; fold it into the retired total
+                    for key, value in shard.items():
+                        self._retired[key] = self._merge(self._retired.get(key), value)
+            self._shards = live
+            totals = dict(self._retired)
+            shards = [dict(shard) for _, shard in live]
+
+        for shard in shards:
+            for key, value in shard.items():
+                totals[key] = self._merge(totals.get(key), value)
+        return totals
+
+    def describe(self):
+        return {'type': self.kind, 'help': self.help, 'labels': list(self.labels)}
+
+    def _merge(self, total, value):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonic count; the name should end in `_total`"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, total, value):
+        return (total or 0) + value
+
+
+class Histogram(Metric):
+    """Observations counted into fixed upper-bound buckets, plus sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        entry = shard.get(key)
+        if entry is None:
+            # One slot per bucket, one for +Inf, then sum
+            entry = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def describe(self):
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+    def _merge(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+
+class MetricsRegistry:
+    """The metrics of one process, and the shared directory they are flushed to"""
+
+    def __init__(self, directory=None, flush_seconds=1.0):
+        self.directory = directory or None
+        self.flush_seconds = flush_seconds
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._pid = None
+        self._file = None
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """{name: {type, help, labels[, buckets], samples: [[label values, value], ...]}}"""
+        return {
+            name: {**metric.describe(), 'samples': [[list(key), value] for key, value in metric.samples().items()]}
+            for name, metric in list(self._metrics.items())
+        }
+
+    def snapshot_file(self):
+        """This process's file; a new name after fork so workers never share one"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._file = os.path.join(self.directory, f'{self._pid}-{uuid.uuid4().hex[:8]}.json')
+        return self._file
+
+    def flush(self):
+        """Write this process's snapshot for the other workers to read"""
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.snapshot_file()
+            tmp = f'{path}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, separators=(',', ':'))
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning('Could not write metrics snapshot', exc_info=True)
+
+    def maybe_flush(self):
+        """Flush when the last write is older than flush_seconds (cheap to call often)"""
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def collect(self):
+        """Snapshots of every process, merged"""
+        if not self.directory:
+            return self.snapshot()
+
+        self.flush()
+        merged = {}
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            names = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if not process_alive(snapshot_pid(name)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    merge_snapshot(merged, json.load(f))
+            except (OSError, ValueError):
+                logger.warning('Skipping unreadable metrics snapshot %s', name)
+        return merged
+
+    def reset(self):
+        """Drop recorded values of this process (used in tests)"""
+        for metric in list(self._metrics.values()):
+            with metric._lock:
+                metric._shards = []
+                metric._retired = {}
+            metric._local = threading.local()
+
+
+def snapshot_pid(name):
+    """The pid a `<pid>-<token>.json` snapshot was written by (None if not named so)"""
+    try:
+        return int(name.split('-', 1)[0])
+    except ValueError:
+        return None
+
+
+def process_alive(pid):
+    """Whether process `pid` still exists (True when it cannot be told)"""
+    if pid is None or pid == os.getpid() or os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)  # signal 0: existence check only
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshot(merged, snapshot):
+    """Add one process's snapshot into `merged` (sums counters and buckets)"""
+    for name, metric in snapshot.items():
+        target = merged.setdefault(name, {**metric, 'samples': []})
+        samples = {tuple(labels): value for labels, value in target['samples']}
+        for labels, value in metric['samples']:
+            labels = tuple(labels)
+            previous = samples.get(labels)
+            if previous is None:
+                samples[labels] = value
+            elif metric['type'] == 'histogram':
+                samples[labels] = [a + b for a, b in zip(previous, value)]
+            else:
+                samples[labels] = previous + value
+        target['samples'] = [[list(labels), value] for labels, value in samples.items()]
+    return merged
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshot):
+    """Prometheus text exposition format (0.0.4) for a snapshot"""
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labels, value in sorted(metric['samples']):
+            if metric['type'] != 'histogram':
+                lines.append(f"{name}{_label_text(metric['labels'], labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'] + [math.inf], value[:-1]):
+                cumulative += count
+                le = _label_text(metric['labels'], labels, [('le', _number(bound))])
+                lines.append(f'{name}_bucket{le} {cumulative}')
+            lines.append(f"{name}_sum{_label_text(metric['labels'], labels)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_label_text(metric['labels'], labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+def observe_view(latency, requests):
+    """Decorate an APIView handler to record its latency and response status"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            started = time.perf_counter()
+            response = handler(view, request, *args, **kwargs)
+            latency.observe(time.perf_counter() - started)
+            requests.inc(status=response.status_code)
+            registry.maybe_flush()
+            return response
+        return wrapper
+    return decorator
+
+
+registry = MetricsRegistry(
+    directory=settings.METRICS['DIR'],
+    flush_seconds=settings.METRICS['FLUSH_SECONDS'],
+)
+
+trip_requests = registry.counter(
+    'eld_trip_requests_total', 'Trip calculation requests by response status', labels=('status',)
+)
+trip_request_seconds = registry.histogram(
+    'eld_trip_request_seconds', 'Trip calculation request latency (streamed bodies excluded)'
+)
+trip_days = registry.histogram(
+    'eld_trip_days', 'Log days per calculated trip', buckets=(1, 2, 3, 5, 7, 10, 14, 21, 30, 60, 90)
+)
+trip_miles = registry.histogram(
+    'eld_trip_distance_miles', 'Routed distance per calculated trip',
+    buckets=(50, 150, 300, 500, 1000, 1500, 2000, 3000, 5000)
+)
+hos_calculation_seconds = registry.histogram(
+    'eld_hos_calculation_seconds', 'HOS engine trip calculation latency, cache hits included'
+)
+exception_check_seconds = registry.histogram(
+    'eld_exception_check_seconds', 'ExceptionChecker.check_all_exceptions latency',
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+)
+calc_cache_lookups = registry.counter(
+    'eld_calc_cache_lookups_total', 'Calculation cache lookups by outcome', labels=('result',)
+)
@@ -0,0 +1,195 @@
+"""
+Middleware for the trips API
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from .timing import phase_stats, start_request_timer, stop_request_timer
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+
+class ServerTimingMiddleware:
+    """
+    Time each request's phases and report them in a `Server-Timing` header
+
+    Views mark phases with `trips.timing.span`; template responses (every
+    DRF Response) also get a `render` span. The spans plus the request
+    total are aggregated per URL name in `phase_stats`. Streaming bodies
+    are produced after the headers are sent, so only the work done before
+    the first byte is covered for them.
+
+    Sync and async capable, so it does not force async views onto a thread
+    under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.SERVER_TIMING['ENABLED']
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        timer, token = start_request_timer()
+        request.phase_timer = timer
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_request_timer(token)
+        return self.finish(request, timer, response)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        timer, token = start_request_timer()
+        request.phase_timer = timer
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_request_timer(token)
+        return self.finish(request, timer, response)
+
+    def finish(self, request, timer, response):
+        """Add the header and record the request's phases"""
+        total = timer.elapsed()
+        response['Server-Timing'] = timer.header(total)
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name:
+            phase_stats.record(match.url_name, timer.spans + [('total', total)])
+        return response
+
+    def process_template_response(self, request, response):
+        timer = getattr(request, 'phase_timer', None)
+        if timer is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: timer.add('render', time.perf_counter() - started)
+            )
+        return response
+
+
+def accepted_encodings(header):
+    """{coding: q} from an Accept-Encoding header"""
+    encodings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[coding.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(header):
+    """'br' or 'gzip' for an Accept-Encoding header (brotli preferred), or None"""
+    encodings = accepted_encodings(header)
+    wildcard = encodings.get('*', 0)
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    best = max(candidates, key=lambda coding: encodings.get(coding, wildcard))
+    return best if encodings.get(best, wildcard) > 0 else None
+
+
+def brotli_sequence(sequence, quality):
+    """Brotli-compress a streamed body, flushing after each chunk so lines arrive promptly"""
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Negotiated brotli/gzip compression for large API responses
+
+    Brotli is used when the client accepts it and the `brotli` package is
+    installed, gzip otherwise. Only the JSON/text types in
+    COMPRESSION['TYPES'] are compressed (PDFs already are), and regular
+    bodies only from COMPRESSION['MIN_BYTES']. Streamed bodies (NDJSON,
+    exports) are compressed chunk by chunk. Strong ETags are weakened,
+    as the encoded body is no longer byte-identical. Sync and async
+    capable, like ServerTimingMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = settings.COMPRESSION
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        """Encode the response for the client, if it qualifies"""
+        if not self.config['ENABLED'] or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if response.status_code not in (200, 201) or content_type not in self.config['TYPES']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response  # async iterators would need async wrappers; no view streams that way
+            if encoding == 'br':
+                response.streaming_content = brotli_sequence(response.streaming_content, self.config['BROTLI_QUALITY'])
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content)
+            del response['Content-Length']
+        else:
+            if len(response.content) < self.config['MIN_BYTES']:
+                return response
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=self.config['BROTLI_QUALITY'])
+            else:
+                compressed = compress_string(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.6 on 2026-10-16 20:59
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eldlog',
+            name='compliance',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name='eldlog',
+            name='extra',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='eldlog',
+            name='has_fuel_stop',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='eldlog',
+            name='requires_break',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='compliance_summary',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='route_info',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='current_cycle_used',
+            field=models.IntegerField(default=0, help_text='Hours already used in current 8-day cycle (0-70)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(70)]),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.6 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+def backfill_is_compliant(apps, schema_editor):
+    Trip = apps.get_model('trips', 'Trip')
+    for trip in Trip.objects.exclude(compliance_summary={}).iterator():
+        trip.is_compliant = trip.compliance_summary.get('is_compliant')
+        trip.save(update_fields=['is_compliant'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0002_trip_results'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='trip',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='is_compliant',
+            field=models.BooleanField(blank=True, help_text='Copied from compliance_summary at write time for history filtering', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['-created_at', '-id'], name='trip_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['is_compliant', '-created_at', '-id'], name='trip_history_compliance_idx'),
+        ),
+        migrations.RunPython(backfill_is_compliant, migrations.RunPython.noop),
+    ]
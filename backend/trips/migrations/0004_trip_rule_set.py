@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-16 21:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0003_trip_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='rule_set',
+            field=models.CharField(default='property', help_text="HOS rule set the trip was planned under (HOS_CONFIG['RULE_SETS'])", max_length=32),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0005_planning_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the stored result, set at write time; the basis of ETags', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0006_trip_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eldlog',
+            name='checkpoint',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
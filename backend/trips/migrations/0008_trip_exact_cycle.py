@@ -0,0 +1,24 @@
+# Generated by Django 4.2.6 on 2026-10-16 23:55
+
+from django.db import migrations, models
+import django.core.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0007_eldlog_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trip',
+            name='current_cycle_used',
+            field=models.FloatField(default=0, help_text='Hours already used in current 8-day cycle (0-70)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(70)]),
+        ),
+        migrations.AddField(
+            model_name='trip',
+            name='cycle_history',
+            field=models.JSONField(blank=True, default=list, help_text='Prior-day on-duty hours the trip was planned from, oldest first, ending yesterday'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0008_trip_exact_cycle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planningjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last time the claiming worker reported the job alive', null=True),
+        ),
+    ]
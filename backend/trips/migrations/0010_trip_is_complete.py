@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-16 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0009_planningjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='is_complete',
+            field=models.BooleanField(default=True, help_text='False while a streamed trip is still being written; readers skip such trips'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.6 on 2026-10-17 00:05
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0010_trip_is_complete'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(django.db.models.functions.text.Lower('current_location'), name='trip_current_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(django.db.models.functions.text.Lower('pickup_location'), name='trip_pickup_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(django.db.models.functions.text.Lower('dropoff_location'), name='trip_dropoff_location_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.6 on 2026-10-17 00:10
+
+from django.db import migrations, models
+import django.core.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trips', '0011_trip_location_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trip',
+            name='current_cycle_used',
+            field=models.FloatField(default=0, help_text="On-duty hours already used in the current cycle (bounded by the rule set's cycle limit)", validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
@@ -1,5 +1,20 @@
+import uuid
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Lower
+from django.core.validators import MinValueValidator
+from .duty_grid import DutyGrid
+
+
+def generate_trip_id():
+    """Generate a unique public trip identifier"""
+    return f"TRIP-{uuid.uuid4().hex[:8].upper()}"
+
+
+def generate_job_id():
+    """Generate a unique public planning job identifier"""
+    return f"JOB-{uuid.uuid4().hex[:12].upper()}"
+
 
 class Trip(models.Model):
     """Model for storing trip information"""
@@ -13,6 +28,10 @@ class Trip(models.Model):
     trip_id = models.CharField(max_length=50, unique=True)
     trip_type = models.CharField(max_length=20, choices=TRIP_TYPE_CHOICES, default='interstate')
     state = models.CharField(max_length=2, blank=True, null=True)
+    rule_set = models.CharField(
+        max_length=32, default='property',
+        help_text="HOS rule set the trip was planned under (HOS_CONFIG['RULE_SETS'])"
+    )
     
     # Locations
     current_location = models.CharField(max_length=255)
@@ -20,10 +39,14 @@ class Trip(models.Model):
     dropoff_location = models.CharField(max_length=255)
     
     # HOS Status
-    current_cycle_used = models.IntegerField(
-        validators=[MinValueValidator(0), MaxValueValidator(70)],
+    current_cycle_used = models.FloatField(
+        validators=[MinValueValidator(0)],
         default=0,
-        help_text="Hours already used in current 8-day cycle (0-70)"
+        help_text="On-duty hours already used in the current cycle (bounded by the rule set's cycle limit)"
+    )
+    cycle_history = models.JSONField(
+        default=list, blank=True,
+        help_text="Prior-day on-duty hours the trip was planned from, oldest first, ending yesterday"
     )
     
     # Vehicle info (from PDF page 3)
@@ -37,15 +60,45 @@ class Trip(models.Model):
     adverse_conditions = models.BooleanField(default=False)
     includes_hazmat = models.BooleanField(default=False)
     
+    # Calculated results, stored so trips can be re-read without recomputation
+    route_info = models.JSONField(default=dict, blank=True)
+    compliance_summary = models.JSONField(default=dict, blank=True)
+    is_compliant = models.BooleanField(
+        null=True, blank=True,
+        help_text="Copied from compliance_summary at write time for history filtering"
+    )
+    content_hash = models.CharField(
+        max_length=64, blank=True, default='',
+        help_text="SHA-256 of the stored result, set at write time; the basis of ETags"
+    )
+    is_complete = models.BooleanField(
+        default=True,
+        help_text="False while a streamed trip is still being written; readers skip such trips"
+    )
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Keyset pagination for trip history: (created_at, id) descending
+            models.Index(fields=['-created_at', '-id'], name='trip_history_idx'),
+            models.Index(fields=['is_compliant', '-created_at', '-id'], name='trip_history_compliance_idx'),
+            # Case-insensitive prefix search on the history `location` filter
+            models.Index(Lower('current_location'), name='trip_current_location_idx'),
+            models.Index(Lower('pickup_location'), name='trip_pickup_location_idx'),
+            models.Index(Lower('dropoff_location'), name='trip_dropoff_location_idx'),
+        ]
     
     def __str__(self):
         return f"Trip {self.trip_id}: {self.current_location} → {self.dropoff_location}"
+    
+    def save(self, *args, **kwargs):
+        if not self.trip_id:
+            self.trip_id = generate_trip_id()
+        super().save(*args, **kwargs)
 
 class EldLog(models.Model):
     """Model for storing generated ELD logs"""
@@ -71,14 +124,84 @@ class EldLog(models.Model):
     cycle_7day_total = models.DecimalField(max_digits=5, decimal_places=2)
     cycle_8day_total = models.DecimalField(max_digits=5, decimal_places=2)
     requires_restart = models.BooleanField(default=False)
+    requires_break = models.BooleanField(default=False)
+    has_fuel_stop = models.BooleanField(default=False)
     
     # ELD Grid Data (as JSON)
     activities = models.JSONField(default=list)
     remarks = models.JSONField(default=list)
+    compliance = models.JSONField(default=dict)
+    
+    # Calculator-specific day fields (breaks, fuel_stops, ...)
+    extra = models.JSONField(default=dict, blank=True)
+    
+    # HOS engine state at the start of the day; a changed trip is replanned from here
+    checkpoint = models.JSONField(null=True, blank=True)
     
     class Meta:
         ordering = ['trip', 'day_number']
         unique_together = ['trip', 'day_number']
     
     def __str__(self):
-        return f"Day {self.day_number}: {self.driving_hours}h driving"
\ No newline at end of file
+        return f"Day {self.day_number}: {self.driving_hours}h driving"
+    
+    def duty_grid(self, resolution=1):
+        """Compact per-minute duty-status grid built from `activities`"""
+        return DutyGrid.from_activities(self.activities, resolution)
+
+
+class PlanningJob(models.Model):
+    """Trip or batch calculation run by `manage.py run_planning_worker`"""
+    
+    KIND_TRIP = 'trip'
+    KIND_BATCH = 'batch'
+    KIND_CHOICES = [
+        (KIND_TRIP, 'Single trip'),
+        (KIND_BATCH, 'Trip batch'),
+    ]
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    
+    job_id = models.CharField(max_length=50, unique=True, default=generate_job_id)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    
+    # Request body as submitted, and the response the synchronous endpoint would give
+    input = models.JSONField(encoder=DjangoJSONEncoder)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, default='')
+    
+    # Claim bookkeeping
+    attempts = models.PositiveIntegerField(default=0)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Last time the claiming worker reported the job alive"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at', 'id'], name='planning_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Job {self.job_id} ({self.kind}, {self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
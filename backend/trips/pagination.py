@@ -0,0 +1,74 @@
+"""
+Keyset (cursor) pagination for trip history
+
+Pages are addressed by the (created_at, id) of the last row seen rather
+than an OFFSET, so every page is an index range scan on trip_history_idx
+no matter how deep the client pages.
+"""
+
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj):
+    """Opaque cursor pointing just after `obj`"""
+    raw = json.dumps([obj.created_at.isoformat(), obj.pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = parse_datetime(created_at)
+        if created_at is None or not isinstance(pk, int):
+            raise ValueError
+        return created_at, pk
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+class KeysetPaginator:
+    """Paginate a queryset ordered by (-created_at, -id)"""
+
+    default_limit = 20
+    max_limit = 100
+
+    def __init__(self, limit=None):
+        try:
+            limit = int(limit) if limit else self.default_limit
+        except (TypeError, ValueError):
+            limit = self.default_limit
+        self.limit = max(1, min(limit, self.max_limit))
+
+    def page_queryset(self, queryset, cursor=None):
+        """The rows after `cursor`, plus one extra that tells us whether another page exists"""
+        queryset = queryset.order_by('-created_at', '-id')
+        if cursor:
+            created_at, pk = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        return queryset[:self.limit + 1]
+
+    def split_page(self, rows):
+        next_cursor = None
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            next_cursor = encode_cursor(rows[-1])
+        return rows, next_cursor
+
+    def paginate(self, queryset, cursor=None):
+        """Return (rows, next_cursor) for the page after `cursor`"""
+        return self.split_page(list(self.page_queryset(queryset, cursor)))
+
+    async def apaginate(self, queryset, cursor=None):
+        """paginate() with the query run through the async ORM"""
+        return self.split_page([row async for row in self.page_queryset(queryset, cursor)])
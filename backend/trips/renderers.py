@@ -0,0 +1,111 @@
+"""
+Renderers for the trips API
+"""
+
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .compact import compact_payload
+
+
+def ndjson_line(record):
+    """One newline-terminated JSON record"""
+    return json.dumps(record, cls=JSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Newline-delimited JSON (`Accept: application/x-ndjson` or `?format=ndjson`)
+
+    Views stream their main payload themselves with StreamingHttpResponse;
+    this renderer covers regular responses such as validation errors, one
+    record per list item.
+    """
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        records = data if isinstance(data, list) else [data]
+        return b''.join(ndjson_line(record) for record in records)
+
+
+class CompactJSONRenderer(JSONRenderer):
+    """
+    Columnar trip payloads (`?format=compact` or the vendor media type)
+
+    Activities and remarks become parallel arrays with interned strings;
+    see trips.compact for the layout.
+    """
+
+    media_type = 'application/vnd.eld.compact+json'
+    format = 'compact'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(compact_payload(data), accepted_media_type, renderer_context)
+
+
+class DocumentRenderer(BaseRenderer):
+    """
+    Base for binary/document formats whose views build the body themselves
+
+    Bytes pass through unchanged; anything else (e.g. an error dict) is
+    rendered as JSON.
+    """
+
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(data, cls=JSONEncoder).encode('utf-8')
+
+
+class PDFRenderer(DocumentRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class SVGRenderer(DocumentRenderer):
+    media_type = 'image/svg+xml'
+    format = 'svg'
+
+
+class CSVRenderer(DocumentRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class JSONLinesRenderer(DocumentRenderer):
+    media_type = 'application/jsonl'
+    format = 'jsonl'
+
+
+class FMCSAOutputFileRenderer(DocumentRenderer):
+    """ELD output file (49 CFR 395 Subpart B, Appendix §4.8.2)"""
+    media_type = 'text/plain'
+    format = 'fmcsa'
+
+
+class PrometheusRenderer(DocumentRenderer):
+    """Prometheus text exposition format, built by trips.metrics"""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+EXPORT_RENDERER_CLASSES = [CSVRenderer, JSONLinesRenderer, FMCSAOutputFileRenderer]
+
+TRIP_RENDERER_CLASSES = list(api_settings.DEFAULT_RENDERER_CLASSES) + [CompactJSONRenderer]
+
+STREAMING_RENDERER_CLASSES = TRIP_RENDERER_CLASSES + [NDJSONRenderer]
+
+
+def wants_ndjson(request):
+    return getattr(request, 'accepted_renderer', None) is not None and request.accepted_renderer.format == 'ndjson'
@@ -0,0 +1,389 @@
+"""
+Local road-network routing for trip distances and driving times
+
+A road graph (built from an OSM-derived extract or the bundled gazetteer
+with `manage.py build_road_graph`) is held in compressed sparse row (CSR)
+arrays: per-node offsets into flat target/miles/minutes arrays, plus the
+reverse graph for the backward search. Routes are found with
+bidirectional A* on travel time using a great-circle heuristic.
+
+Pairs found in the precomputed lane matrix skip routing entirely.
+Without a graph file, legs fall back to great-circle miles times a
+detour factor at the configured average speed.
+"""
+
+import heapq
+import math
+import os
+import struct
+import sys
+import threading
+from array import array
+from functools import lru_cache
+
+from django.conf import settings
+
+from .gazetteer import GridIndex, get_gazetteer, great_circle_miles
+from .lane_matrix import get_lane_matrix, reset_lane_matrix
+
+GRAPH_MAGIC = b'ELDROAD1'
+GRAPH_HEADER = struct.Struct('<8sBII')  # magic, little-endian flag, nodes, edges
+
+
+def _csr(node_count, sources, targets, miles, minutes):
+    """Group edges by source node with a counting sort"""
+    offsets = array('I', [0]) * (node_count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for node in range(node_count):
+        offsets[node + 1] += offsets[node]
+
+    edge_count = len(sources)
+    out_targets = array('I', [0]) * edge_count
+    out_miles = array('f', [0.0]) * edge_count
+    out_minutes = array('f', [0.0]) * edge_count
+    cursor = array('I', offsets[:-1])
+    for i in range(edge_count):
+        slot = cursor[sources[i]]
+        cursor[sources[i]] += 1
+        out_targets[slot] = targets[i]
+        out_miles[slot] = miles[i]
+        out_minutes[slot] = minutes[i]
+    return offsets, out_targets, out_miles, out_minutes
+
+
+class RoadGraph:
+    """
+    Directed road graph in CSR form
+
+    Node coordinates are parallel `array('d')` columns; edge weights are
+    miles and free-flow minutes stored as float32.
+    """
+
+    __slots__ = (
+        'lats', 'lons', 'offsets', 'targets', 'miles', 'minutes',
+        'rev_offsets', 'rev_sources', 'rev_miles', 'rev_minutes',
+        'max_mph', '_index', '_route',
+    )
+
+    def __init__(self, lats, lons, forward, reverse):
+        self.lats = lats
+        self.lons = lons
+        self.offsets, self.targets, self.miles, self.minutes = forward
+        self.rev_offsets, self.rev_sources, self.rev_miles, self.rev_minutes = reverse
+        # Fastest edge speed keeps the time heuristic admissible
+        self.max_mph = max(
+            (m / t * 60 for m, t in zip(self.miles, self.minutes) if t > 0),
+            default=settings.HOS_CONFIG['ASSUMPTIONS']['AVERAGE_SPEED']
+        )
+        self._index = GridIndex(lats, lons, cell_degrees=0.5)
+        self._route = lru_cache(maxsize=settings.ROUTING['ROUTE_CACHE_SIZE'])(self._shortest_path)
+
+    @classmethod
+    def from_edges(cls, nodes, edges):
+        """
+        Build from `nodes` [(lat, lon)] and `edges` [(from, to, miles, minutes, oneway)]
+
+        Two-way edges are added in both directions.
+        """
+        lats = array('d', (float(lat) for lat, _ in nodes))
+        lons = array('d', (float(lon) for _, lon in nodes))
+        sources, targets = array('I'), array('I')
+        miles, minutes = array('f'), array('f')
+        for source, target, distance, duration, oneway in edges:
+            pairs = ((source, target),) if oneway else ((source, target), (target, source))
+            for a, b in pairs:
+                sources.append(a)
+                targets.append(b)
+                miles.append(distance)
+                minutes.append(duration)
+
+        forward = _csr(len(lats), sources, targets, miles, minutes)
+        reverse = _csr(len(lats), targets, sources, miles, minutes)
+        return cls(lats, lons, forward, reverse)
+
+    @classmethod
+    def load(cls, path):
+        """Read a graph written by `save`"""
+        with open(path, 'rb') as f:
+            magic, little_endian, node_count, edge_count = GRAPH_HEADER.unpack(f.read(GRAPH_HEADER.size))
+            if magic != GRAPH_MAGIC:
+                raise ValueError(f'{path} is not a road graph file')
+
+            def read(typecode, count):
+                values = array(typecode)
+                values.fromfile(f, count)
+                if bool(little_endian) != (sys.byteorder == 'little'):
+                    values.byteswap()
+                return values
+
+            lats, lons = read('d', node_count), read('d', node_count)
+            forward = (read('I', node_count + 1), read('I', edge_count), read('f', edge_count), read('f', edge_count))
+            reverse = (read('I', node_count + 1), read('I', edge_count), read('f', edge_count), read('f', edge_count))
+        return cls(lats, lons, forward, reverse)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(GRAPH_HEADER.pack(
+                GRAPH_MAGIC, sys.byteorder == 'little', self.node_count, self.edge_count
+            ))
+            for values in (
+                self.lats, self.lons,
+                self.offsets, self.targets, self.miles, self.minutes,
+                self.rev_offsets, self.rev_sources, self.rev_miles, self.rev_minutes,
+            ):
+                values.tofile(f)
+
+    @property
+    def node_count(self):
+        return len(self.lats)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def nearest_node(self, lat, lon):
+        return self._index.nearest(lat, lon)
+
+    def shortest_path(self, source, target):
+        """
+        Fastest route between two nodes as (minutes, miles), or None if unreachable
+
+        Results are memoized per node pair.
+        """
+        return self._route(source, target)
+
+    def paths_from(self, source):
+        """Fastest (minutes, miles) from `source` to every reachable node (one-to-all Dijkstra)"""
+        dist = {source: 0.0}
+        miles = {source: 0.0}
+        done = {}
+        heap = [(0.0, source)]
+        while heap:
+            minutes, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done[node] = (minutes, miles[node])
+            for edge in range(self.offsets[node], self.offsets[node + 1]):
+                nxt = self.targets[edge]
+                candidate = minutes + self.minutes[edge]
+                if candidate < dist.get(nxt, math.inf):
+                    dist[nxt] = candidate
+                    miles[nxt] = miles[node] + self.miles[edge]
+                    heapq.heappush(heap, (candidate, nxt))
+        return done
+
+    def _heuristic(self, node, target):
+        """Lower bound on minutes from `node` to `target`"""
+        return great_circle_miles(self.lats[node], self.lons[node], self.lats[target], self.lons[target]) / self.max_mph * 60
+
+    def _shortest_path(self, source, target):
+        if source == target:
+            return (0.0, 0.0)
+
+        # Average potentials make the reduced edge costs consistent for both
+        # directions (Ikeda et al.), so the search is bidirectional Dijkstra
+        # on reduced costs with the usual stopping rule.
+        potentials = {}
+
+        def potential(node):
+            value = potentials.get(node)
+            if value is None:
+                value = potentials[node] = (self._heuristic(node, target) - self._heuristic(node, source)) / 2
+            return value
+
+        searches = (
+            (self.offsets, self.targets, self.miles, self.minutes, 1),
+            (self.rev_offsets, self.rev_sources, self.rev_miles, self.rev_minutes, -1),
+        )
+        dist = ({source: 0.0}, {target: 0.0})
+        miles = ({source: 0.0}, {target: 0.0})
+        settled = (set(), set())
+        heaps = ([(0.0, source)], [(0.0, target)])
+        best, best_miles = math.inf, None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            offsets, neighbours, edge_miles, edge_minutes, sign = searches[side]
+            key, node = heapq.heappop(heaps[side])
+            if node in settled[side]:
+                continue
+            settled[side].add(node)
+            here = potential(node) * sign
+
+            for edge in range(offsets[node], offsets[node + 1]):
+                nxt = neighbours[edge]
+                reduced = key + edge_minutes[edge] - here + potential(nxt) * sign
+                if reduced < dist[side].get(nxt, math.inf):
+                    dist[side][nxt] = reduced
+                    miles[side][nxt] = miles[side][node] + edge_miles[edge]
+                    heapq.heappush(heaps[side], (reduced, nxt))
+                    other = dist[1 - side].get(nxt)
+                    if other is not None and reduced + other < best:
+                        best = reduced + other
+                        best_miles = miles[side][nxt] + miles[1 - side][nxt]
+
+        if best_miles is None:
+            return None
+        # Undo the potential shift: reduced = real - p(source) + p(target)
+        return (best + potential(source) - potential(target), best_miles)
+
+
+class Router:
+    """
+    Resolve trip locations and route each leg
+
+    Locations are geocoded with the offline gazetteer. A precomputed lane
+    matrix is consulted first; otherwise places are snapped to the nearest
+    graph node and the access distance to that node is added at the
+    fallback detour factor.
+    """
+
+    def __init__(self, graph=None, gazetteer=None, detour_factor=None, average_speed=None, lanes=None):
+        self.graph = graph
+        self.lanes = lanes
+        self.gazetteer = gazetteer or get_gazetteer()
+        self.detour_factor = detour_factor or settings.ROUTING['DETOUR_FACTOR']
+        self.average_speed = average_speed or settings.HOS_CONFIG['ASSUMPTIONS']['AVERAGE_SPEED']
+
+    def route(self, origin, destination):
+        """One leg dict (from/to/distance_miles/driving_hours/source), or None if a location is unknown"""
+        start = self.gazetteer.resolve(origin)
+        end = self.gazetteer.resolve(destination)
+        if start is None or end is None:
+            return None
+
+        leg = {'from': origin, 'to': destination}
+        leg.update(self.measure(start, end))
+        return leg
+
+    def measure(self, start, end):
+        """Distance, driving time and source for a pair of gazetteer places"""
+        if start == end:
+            return {'distance_miles': 0.0, 'driving_hours': 0.0, 'source': 'same_location'}
+
+        lanes = self.lanes
+        if lanes is not None:
+            lane = lanes.lookup(start, end)
+            if lane is not None:
+                miles, hours = lane
+                return {'distance_miles': round(miles, 1), 'driving_hours': round(hours, 3), 'source': 'lane_matrix'}
+
+        path = self._graph_path(start, end)
+        if path is not None:
+            minutes, miles = path
+            return {'distance_miles': round(miles, 1), 'driving_hours': round(minutes / 60, 3), 'source': 'road_graph'}
+
+        miles = great_circle_miles(start.lat, start.lon, end.lat, end.lon) * self.detour_factor
+        return {
+            'distance_miles': round(miles, 1),
+            'driving_hours': round(miles / self.average_speed, 3),
+            'source': 'great_circle'
+        }
+
+    def measure_from(self, start, ends):
+        """
+        (miles, hours) from one place to many, without the lane matrix
+
+        Runs a single one-to-all search on the graph instead of one query
+        per destination; used to build the lane matrix.
+        """
+        if self.graph is None or not self.graph.node_count:
+            return [self._fallback(start, end) for end in ends]
+
+        source = self.graph.nearest_node(start.lat, start.lon)
+        paths = self.graph.paths_from(source)
+        start_minutes, start_miles = self._access(start, source)
+        row = []
+        for end in ends:
+            if end == start:
+                row.append((0.0, 0.0))
+                continue
+            target = self.graph.nearest_node(end.lat, end.lon)
+            path = paths.get(target)
+            if path is None:
+                row.append(self._fallback(start, end))
+                continue
+            end_minutes, end_miles = self._access(end, target)
+            row.append((
+                path[1] + start_miles + end_miles,
+                (path[0] + start_minutes + end_minutes) / 60
+            ))
+        return row
+
+    def route_trip(self, trip_data):
+        """Current→pickup and pickup→dropoff legs, or None if any location is unknown"""
+        stops = [
+            trip_data.get('current_location'),
+            trip_data.get('pickup_location'),
+            trip_data.get('dropoff_location'),
+        ]
+        legs = []
+        for origin, destination in zip(stops, stops[1:]):
+            leg = self.route(origin, destination)
+            if leg is None:
+                return None
+            legs.append(leg)
+        return legs
+
+    def _fallback(self, start, end):
+        miles = great_circle_miles(start.lat, start.lon, end.lat, end.lon) * self.detour_factor
+        return miles, miles / self.average_speed
+
+    def _access(self, place, node):
+        """(minutes, miles) between a place and its snapped graph node"""
+        miles = great_circle_miles(place.lat, place.lon, self.graph.lats[node], self.graph.lons[node]) * self.detour_factor
+        return miles / self.average_speed * 60, miles
+
+    def _graph_path(self, start, end):
+        if self.graph is None or not self.graph.node_count:
+            return None
+        source = self.graph.nearest_node(start.lat, start.lon)
+        target = self.graph.nearest_node(end.lat, end.lon)
+        path = self.graph.shortest_path(source, target)
+        if path is None:
+            return None
+
+        minutes, miles = path
+        for place, node in ((start, source), (end, target)):
+            access_minutes, access_miles = self._access(place, node)
+            minutes += access_minutes
+            miles += access_miles
+        return minutes, miles
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """
+    Process-wide router using ROUTING['GRAPH_FILE'] and the lane matrix when they exist
+
+    The lane matrix is re-checked on every call, so a rebuilt matrix is
+    picked up without restarting the process.
+    """
+    global _router
+    router = _router
+    if router is None:
+        with _router_lock:
+            if _router is None:
+                path = settings.ROUTING['GRAPH_FILE']
+                graph = RoadGraph.load(path) if path and os.path.exists(path) else None
+                _router = Router(graph, lanes=get_lane_matrix())
+            return _router
+
+    lanes = get_lane_matrix()
+    if router.lanes is not lanes:
+        router.lanes = lanes
+    return router
+
+
+def reset_router():
+    """Forget the loaded graph and lane matrix so the next request reloads them"""
+    global _router
+    with _router_lock:
+        _router = None
+    reset_lane_matrix()
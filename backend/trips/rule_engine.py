@@ -0,0 +1,140 @@
+"""
+Compiled rule engine for HOS exception eligibility
+
+Rules are compiled once: each rule's conditions are sorted by declared
+cost so cheap boolean field checks run before gazetteer lookups, and a
+rule stops at its first failed condition. `evaluate_many` runs a whole
+list of trips one condition at a time over the trips still eligible,
+and every condition keeps call, failure and time counters for profiling.
+"""
+
+import threading
+import time
+
+# Relative condition costs
+FIELD_COST = 1          # plain lookups on the trip input
+LOOKUP_COST = 100       # gazetteer / distance work
+
+
+class Condition:
+    """A named predicate over a RuleContext"""
+
+    __slots__ = ('name', 'predicate', 'cost')
+
+    def __init__(self, name, predicate, cost=FIELD_COST):
+        self.name = name
+        self.predicate = predicate
+        self.cost = cost
+
+
+class Rule:
+    """
+    A set of conditions that must all hold, plus the payload returned when they do
+
+    Conditions are kept in cost order (ties keep declaration order).
+    """
+
+    __slots__ = ('key', 'conditions', 'result')
+
+    def __init__(self, key, conditions, result):
+        self.key = key
+        self.conditions = tuple(sorted(conditions, key=lambda condition: condition.cost))
+        self.result = result
+
+
+class RuleContext:
+    """One trip's input plus values computed once and shared between rules"""
+
+    __slots__ = ('trip', '_values')
+
+    def __init__(self, trip):
+        self.trip = trip
+        self._values = {}
+
+    def cached(self, name, compute):
+        if name not in self._values:
+            self._values[name] = compute(self.trip)
+        return self._values[name]
+
+
+class RuleEngine:
+    """Evaluate compiled rules for one trip or a batch of trips"""
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self._lock = threading.Lock()
+        self._timings = {}
+        self.reset_timings()
+
+    def evaluate(self, trip):
+        """Payloads of every rule the trip satisfies, in rule order"""
+        return self.evaluate_many([trip])[0]
+
+    def evaluate_many(self, trips):
+        """
+        Evaluate every rule for a list of trips in one pass
+
+        Each condition runs once over the trips that passed the cheaper
+        conditions before it; a rule stops as soon as no trip is left.
+        """
+        contexts = [RuleContext(trip) for trip in trips]
+        results = [[] for _ in contexts]
+        samples = []
+
+        for rule in self.rules:
+            eligible = range(len(contexts))
+            for condition in rule.conditions:
+                started = time.perf_counter_ns()
+                predicate = condition.predicate
+                passed = [i for i in eligible if predicate(contexts[i])]
+                samples.append((rule.key, condition.name, len(eligible), len(eligible) - len(passed),
+                                time.perf_counter_ns() - started))
+                eligible = passed
+                if not eligible:
+                    break
+            for i in eligible:
+                results[i].append(dict(rule.result))
+
+        self._record(samples)
+        return results
+
+    def _record(self, samples):
+        with self._lock:
+            for rule_key, condition_name, calls, failed, elapsed in samples:
+                counters = self._timings[rule_key][condition_name]
+                counters['calls'] += calls
+                counters['failed'] += failed
+                counters['nanoseconds'] += elapsed
+
+    def timings(self):
+        """
+        Per-rule, per-condition profile:
+        {rule: {'seconds', 'conditions': {name: {'calls', 'failed', 'seconds', 'cost'}}}}
+        """
+        report = {}
+        with self._lock:
+            for rule in self.rules:
+                conditions = {}
+                for condition in rule.conditions:
+                    counters = self._timings[rule.key][condition.name]
+                    conditions[condition.name] = {
+                        'cost': condition.cost,
+                        'calls': counters['calls'],
+                        'failed': counters['failed'],
+                        'seconds': counters['nanoseconds'] / 1e9,
+                    }
+                report[rule.key] = {
+                    'seconds': sum(c['seconds'] for c in conditions.values()),
+                    'conditions': conditions,
+                }
+        return report
+
+    def reset_timings(self):
+        with self._lock:
+            self._timings = {
+                rule.key: {
+                    condition.name: {'calls': 0, 'failed': 0, 'nanoseconds': 0}
+                    for condition in rule.conditions
+                }
+                for rule in self.rules
+            }
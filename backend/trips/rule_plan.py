@@ -0,0 +1,149 @@
+"""
+Compiled HOS rule plans
+References: 49 CFR §395.3 (property-carrying), §395.5 (passenger-carrying)
+
+HOS_CONFIG['RULE_SETS'] names each set of limits a trip can be planned
+under. A rule set is compiled once into a RulePlan: every limit as a
+plain attribute in hours and in minutes, the assumptions the calculators
+need, and pre-formatted violation labels. Plans are immutable tuples, so
+one instance per rule set is shared by every request and thread, and
+calculators never touch settings or string-keyed dicts in their loops.
+"""
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+# Limits a rule set does not have (e.g. no 30-minute break for passenger carriers)
+NO_LIMIT = math.inf
+
+PLAN_FIELDS = (
+    'name', 'label',
+    # Hours
+    'max_driving_hours', 'max_window_hours', 'min_off_hours',
+    'break_after_hours', 'break_hours', 'cycle_hours', 'cycle_days', 'restart_hours',
+    'fuel_interval_miles', 'fuel_stop_hours', 'load_unload_hours', 'inspection_hours',
+    'average_speed',
+    # Minutes, for the event-driven engine
+    'max_driving_minutes', 'max_window_minutes', 'min_off_minutes',
+    'break_after_minutes', 'break_minutes', 'cycle_minutes', 'restart_minutes',
+    'fuel_stop_minutes', 'load_unload_minutes', 'inspection_minutes',
+    # Violation labels and log descriptions
+    'driving_rule', 'window_rule', 'off_duty_rule', 'break_rule', 'cycle_rule',
+    'cycle_action', 'break_description', 'restart_description',
+)
+
+
+class RulePlan(namedtuple('RulePlan', PLAN_FIELDS)):
+    """One compiled rule set; see compile_rule_plan"""
+
+    __slots__ = ()
+
+    @property
+    def has_break_rule(self):
+        return self.break_after_hours != NO_LIMIT
+
+    @property
+    def has_restart(self):
+        return self.restart_hours != NO_LIMIT
+
+
+def _minutes(hours):
+    return hours if hours == NO_LIMIT else int(round(hours * 60))
+
+
+def _limit(value):
+    return NO_LIMIT if value is None else value
+
+
+def rule_set_config(name):
+    """Limits for a rule set: its base block with the set's overrides applied"""
+    rule_sets = settings.HOS_CONFIG['RULE_SETS']
+    if name not in rule_sets:
+        raise ValueError(f'Unknown rule set: {name}')
+    overrides = dict(rule_sets[name])
+    config = dict(settings.HOS_CONFIG[overrides.pop('BASE')])
+    config.update(overrides)
+    return config
+
+
+def compile_rule_plan(name, config, assumptions):
+    """Build a RulePlan from a limits block and HOS_CONFIG['ASSUMPTIONS']"""
+    citations = config.get('CITATIONS', {})
+
+    def cite(rule):
+        citation = citations.get(rule, citations.get('*'))
+        return f' ({citation})' if citation else ''
+
+    cycle_days = config.get('CYCLE_DAYS', 8)
+    cycle_hours = config['MAX_8DAY_HOURS'] if cycle_days == 8 else config['MAX_7DAY_HOURS']
+    break_after = _limit(config['BREAK_AFTER_HOURS'])
+    break_hours = config['BREAK_DURATION'] or 0
+    restart = _limit(config['RESTART_HOURS'])
+    break_minutes = _minutes(break_hours)
+
+    return RulePlan(
+        name=name,
+        label=config.get('LABEL', name),
+        max_driving_hours=config['MAX_DAILY_DRIVING'],
+        max_window_hours=config['MAX_DAILY_WINDOW'],
+        min_off_hours=config['MIN_OFF_DUTY'],
+        break_after_hours=break_after,
+        break_hours=break_hours,
+        cycle_hours=cycle_hours,
+        cycle_days=cycle_days,
+        restart_hours=restart,
+        fuel_interval_miles=assumptions['FUEL_STOP_INTERVAL'],
+        fuel_stop_hours=assumptions['FUEL_STOP_DURATION'],
+        load_unload_hours=assumptions['LOAD_UNLOAD_TIME'],
+        inspection_hours=assumptions['INSPECTION_TIME'],
+        average_speed=assumptions['AVERAGE_SPEED'],
+        max_driving_minutes=_minutes(config['MAX_DAILY_DRIVING']),
+        max_window_minutes=_minutes(config['MAX_DAILY_WINDOW']),
+        min_off_minutes=_minutes(config['MIN_OFF_DUTY']),
+        break_after_minutes=_minutes(break_after),
+        break_minutes=break_minutes,
+        cycle_minutes=_minutes(cycle_hours),
+        restart_minutes=_minutes(restart),
+        fuel_stop_minutes=_minutes(assumptions['FUEL_STOP_DURATION']),
+        load_unload_minutes=_minutes(assumptions['LOAD_UNLOAD_TIME']),
+        inspection_minutes=_minutes(assumptions['INSPECTION_TIME']),
+        driving_rule=f"{config['MAX_DAILY_DRIVING']:g}-hour driving limit{cite('driving')}",
+        window_rule=f"{config['MAX_DAILY_WINDOW']:g}-hour driving window{cite('window')}",
+        off_duty_rule=f"{config['MIN_OFF_DUTY']:g}-hour off-duty requirement{cite('off_duty')}",
+        break_rule=f"{break_minutes}-minute break requirement{cite('break')}",
+        cycle_rule=f"{cycle_hours:g}-hour/{cycle_days}-day limit{cite('cycle')}",
+        cycle_action=(f'{restart:g}-hour restart required' if restart != NO_LIMIT
+                      else 'Off duty until cycle hours are available'),
+        break_description=f'{break_minutes}-minute break required after {break_after:g} hours',
+        restart_description=f'{restart:g}-hour restart - cycle reset',
+    )
+
+
+def rule_set_choices():
+    """(name, label) pairs for every configured rule set"""
+    return [(name, rule_set['LABEL']) for name, rule_set in settings.HOS_CONFIG['RULE_SETS'].items()]
+
+
+@lru_cache(maxsize=None)
+def _get_rule_plan(name):
+    return compile_rule_plan(name, rule_set_config(name), settings.HOS_CONFIG['ASSUMPTIONS'])
+
+
+def get_rule_plan(name=None):
+    """
+    Shared plan for a rule set (the default set when `name` is empty)
+
+    Raises ValueError for an unknown rule set.
+    """
+    return _get_rule_plan(name or settings.HOS_CONFIG['DEFAULT_RULE_SET'])
+
+
+@receiver(setting_changed)
+def _reset_rule_plans(setting, **kwargs):
+    if setting == 'HOS_CONFIG':
+        _get_rule_plan.cache_clear()
@@ -1,5 +1,8 @@
 from rest_framework import serializers
+from django.conf import settings
 from .models import Trip, EldLog
+from .rule_plan import get_rule_plan, rule_set_choices
+from .services.trip_planner import InvalidTripInput, check_trip_input
 import re
 
 class LocationField(serializers.CharField):
@@ -22,20 +25,26 @@ class TripSerializer(serializers.ModelSerializer):
     class Meta:
         model = Trip
         fields = [
-            'trip_id', 'trip_type', 'state',
+            'trip_id', 'trip_type', 'state', 'rule_set',
             'current_location', 'pickup_location', 'dropoff_location',
             'current_cycle_used', 'cmv_weight', 'requires_cdl',
             'adverse_conditions', 'includes_hazmat'
         ]
         read_only_fields = ['trip_id']
     
-    def validate_current_cycle_used(self, value):
-        """Validate cycle hours (0-70)"""
-        if value < 0 or value > 70:
-            raise serializers.ValidationError(
-                "Current cycle used must be between 0 and 70 hours"
-            )
-        return value
+    def validate(self, attrs):
+        """Cycle hours used are bounded by the trip's rule set (60/70/80 hours)"""
+        rule_set = attrs.get('rule_set', getattr(self.instance, 'rule_set', None))
+        try:
+            plan = get_rule_plan(rule_set)
+        except ValueError as e:
+            raise serializers.ValidationError({'rule_set': str(e)})
+        cycle_used = attrs.get('current_cycle_used', getattr(self.instance, 'current_cycle_used', 0))
+        if cycle_used < 0 or cycle_used > plan.cycle_hours:
+            raise serializers.ValidationError({
+                'current_cycle_used': f'Current cycle used must be between 0 and {plan.cycle_hours:g} hours'
+            })
+        return attrs
     
     def validate_cmv_weight(self, value):
         """Validate CMV weight according to FMCSA rules"""
@@ -57,4 +66,47 @@ class EldLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = EldLog
         fields = '__all__'
-        read_only_fields = ['trip', 'day_number', 'date']
\ No newline at end of file
+        read_only_fields = ['trip', 'day_number', 'date']
+
+class TripInputSerializer(serializers.Serializer):
+    """Validates a single trip calculation request (used by the batch endpoint)"""
+    
+    current_location = LocationField(max_length=255)
+    pickup_location = LocationField(max_length=255)
+    dropoff_location = LocationField(max_length=255)
+    current_cycle_used = serializers.FloatField(min_value=0)
+    cycle_history = serializers.ListField(
+        child=serializers.FloatField(min_value=0, max_value=24),
+        max_length=7, required=False,
+        help_text="Prior-day on-duty hours, oldest first, ending yesterday"
+    )
+    cmv_weight = serializers.IntegerField(required=False)
+    requires_cdl = serializers.BooleanField(default=True)
+    adverse_conditions = serializers.BooleanField(default=False)
+    includes_hazmat = serializers.BooleanField(default=False)
+    trip_type = serializers.ChoiceField(choices=Trip.TRIP_TYPE_CHOICES, default='interstate')
+    state = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    rule_set = serializers.ChoiceField(
+        choices=rule_set_choices(), default=settings.HOS_CONFIG['DEFAULT_RULE_SET']
+    )
+    
+    def validate(self, attrs):
+        """The same checks as the single-trip endpoints (check_trip_input)"""
+        try:
+            check_trip_input(attrs)
+        except InvalidTripInput as e:
+            raise serializers.ValidationError({e.field: str(e)})
+        return attrs
+
+
+class TripHistorySerializer(serializers.ModelSerializer):
+    """Summary row for the trip history endpoint"""
+    
+    class Meta:
+        model = Trip
+        fields = [
+            'trip_id', 'trip_type', 'current_location', 'pickup_location',
+            'dropoff_location', 'current_cycle_used', 'is_compliant',
+            'compliance_summary', 'created_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,117 @@
+"""
+Bounded executor for HOS work requested from async views
+
+Async views await calculations on a small thread pool instead of holding
+a worker thread for the whole request, so slow clients only cost an idle
+coroutine. At most MAX_WORKERS calculations run at once per process and at
+most MAX_QUEUED wait behind them; beyond that callers get PoolBusy and the
+view answers 503. Threads (rather than processes) keep the in-process
+calculation cache shared with the rest of the worker.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class PoolBusy(Exception):
+    """Raised when the wait queue is full"""
+
+
+class CalculationPool:
+    """Thread pool with admission control and queue-depth counters"""
+
+    def __init__(self, max_workers, max_queued):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self.reset_metrics()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix='hos-calc'
+                )
+            return self._executor
+
+    async def run(self, func, *args):
+        """Run `func(*args)` on the pool and await its result"""
+        with self._lock:
+            if self._queued >= self.max_queued and self._running >= self.max_workers:
+                self._rejected += 1
+                raise PoolBusy('Too many trip calculations in progress')
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+        future = self._get_executor().submit(self._call, time.perf_counter(), func, args)
+        future.add_done_callback(self._discard_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _discard_cancelled(self, future):
+        # A request that went away before its calculation started
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def _call(self, submitted, func, args):
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait_seconds += started - submitted
+        failed = True
+        try:
+            result = func(*args)
+            failed = False
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._failed += failed
+                self._run_seconds += time.perf_counter() - started
+
+    def metrics(self):
+        """Current queue depth and totals since the last reset"""
+        with self._lock:
+            completed = self._completed
+            return {
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'running': self._running,
+                'queued': self._queued,
+                'peak_queued': self._peak_queued,
+                'completed': completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'avg_wait_seconds': self._wait_seconds / completed if completed else 0.0,
+                'avg_run_seconds': self._run_seconds / completed if completed else 0.0,
+            }
+
+    def reset_metrics(self):
+        """Zero the totals; running and queued are live gauges and are kept"""
+        with self._lock:
+            self._peak_queued = self._queued
+            self._completed = 0
+            self._failed = 0
+            self._rejected = 0
+            self._wait_seconds = 0.0
+            self._run_seconds = 0.0
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+calculation_pool = CalculationPool(
+    max_workers=max(1, settings.ASYNC_TRIPS['MAX_WORKERS']),
+    max_queued=max(0, settings.ASYNC_TRIPS['MAX_QUEUED']),
+)
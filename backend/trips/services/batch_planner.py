@@ -0,0 +1,104 @@
+"""
+Batch trip planning on a shared process pool
+
+HOS calculations are pure CPU work, so a batch is fanned out across worker
+processes instead of being run one trip after another in the request thread.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .trip_planner import plan_trip
+
+logger = logging.getLogger(__name__)
+
+# Pool size when TRIP_BATCH['MAX_WORKERS'] is not set
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_worker_count():
+    """
+    Pool size from TRIP_BATCH['MAX_WORKERS'], else the machine's CPU count
+
+    Every web worker process gets its own pool; with several web workers
+    per host, lower TRIP_BATCH_MAX_WORKERS so the pools share the CPUs.
+    """
+    return max(1, settings.TRIP_BATCH.get('MAX_WORKERS') or DEFAULT_WORKERS)
+
+
+def _init_worker():
+    """Make sure Django is configured in spawned (non-forked) workers"""
+    import django
+    django.setup()
+
+
+def get_executor():
+    """Return the process pool shared by all batch requests in this process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=get_worker_count(),
+                initializer=_init_worker
+            )
+        return _executor
+
+
+def shutdown_executor():
+    """Tear down the shared pool (used after a worker crash and in tests)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _plan_one(trip_data):
+    """Worker entry point: never raise, report the failure for this trip"""
+    try:
+        return {'status': 'ok', 'trip': plan_trip(trip_data)}
+    except Exception as e:
+        logger.exception('Batch trip planning failed')
+        return {'status': 'error', 'errors': {'non_field_errors': [str(e)]}}
+
+
+def plan_trips(trips):
+    """Plan a list of validated trips, preserving input order"""
+    return list(iter_plan_trips(trips))
+
+
+def iter_plan_trips(trips):
+    """
+    Yield planning outcomes in input order as they become available
+
+    Small batches (or a single configured worker) run inline, where the
+    cost of pickling the work outweighs the parallel speedup.
+    """
+    workers = get_worker_count()
+    if workers == 1 or len(trips) < settings.TRIP_BATCH['MIN_PARALLEL_TRIPS']:
+        for trip in trips:
+            yield _plan_one(trip)
+        return
+
+    # A few chunks per worker keeps the pool busy without per-trip IPC
+    chunksize = max(1, len(trips) // (workers * 4))
+    finished = 0
+    try:
+        for outcome in get_executor().map(_plan_one, trips, chunksize=chunksize):
+            finished += 1
+            yield outcome
+    except BrokenProcessPool:
+        # Keep what finished; the trips still in flight fail alone. They are
+        # not retried inline, as one of them may be what killed the worker.
+        logger.error('Batch worker pool crashed with %d trips unfinished, recreating it', len(trips) - finished)
+        shutdown_executor()
+        for _ in trips[finished:]:
+            yield {'status': 'error', 'errors': {'non_field_errors': ['Planning worker crashed; retry this trip']}}
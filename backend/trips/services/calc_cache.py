@@ -0,0 +1,135 @@
+"""
+Content-addressed cache for trip calculations
+
+Results are keyed by a SHA-256 of the normalized calculator inputs plus
+the active HOS_CONFIG, so a config change never serves stale schedules.
+Lookups try a per-process LRU with TTL first and then Django's cache
+framework, which can be shared between workers.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from ..metrics import calc_cache_lookups
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'trips:calc:'
+
+
+def cache_key(kind, inputs):
+    """Canonical hash of a calculation's inputs and the HOS configuration"""
+    payload = json.dumps(
+        {'kind': kind, 'inputs': inputs, 'config': settings.HOS_CONFIG},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return KEY_PREFIX + hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CalculationCache:
+    """
+    Two-level cache: in-process LRU with TTL, then Django's cache
+
+    Values are stored as JSON text, so every hit returns fresh objects that
+    callers may modify freely.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=3600, backend='default', enabled=True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def get_or_compute(self, kind, inputs, compute):
+        """Return the cached result for `inputs`, computing and storing it on a miss"""
+        if not self.enabled:
+            return compute()
+
+        key = cache_key(kind, inputs)
+        payload = self._get_local(key)
+        if payload is not None:
+            self._count('local_hits')
+            return json.loads(payload)
+
+        payload = self._get_shared(key)
+        if payload is not None:
+            self._count('shared_hits')
+            self._set_local(key, payload)
+            return json.loads(payload)
+
+        self._count('misses')
+        result = compute()
+        payload = json.dumps(result, separators=(',', ':'))
+        self._set_local(key, payload)
+        self._set_shared(key, payload)
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['local_entries'] = len(self._entries)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = (lookups - stats['misses']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop local entries and reset counters (the shared cache is left alone)"""
+        with self._lock:
+            self._entries.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+        calc_cache_lookups.inc(result=name)
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def _set_local(self, key, payload):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, key):
+        try:
+            return caches[self.backend].get(key)
+        except Exception:
+            logger.warning('Shared calculation cache unavailable', exc_info=True)
+            return None
+
+    def _set_shared(self, key, payload):
+        try:
+            caches[self.backend].set(key, payload, self.ttl_seconds)
+        except Exception:
+            logger.warning('Could not write to shared calculation cache', exc_info=True)
+
+
+calculation_cache = CalculationCache(
+    max_entries=settings.TRIP_CALC_CACHE['MAX_ENTRIES'],
+    ttl_seconds=settings.TRIP_CALC_CACHE['TTL_SECONDS'],
+    backend=settings.TRIP_CALC_CACHE['BACKEND'],
+    enabled=settings.TRIP_CALC_CACHE['ENABLED'],
+)
@@ -0,0 +1,194 @@
+"""
+Incremental replanning of a stored trip
+
+A trip that changes mid-route (a new pickup or dropoff, or days the
+driver reports as actually driven) is not planned again from scratch.
+The new task list is compared with the one the stored days were planned
+from, the HOS engine is restored from the checkpoint of the latest day
+that starts before the first changed task, and only the days from there
+on are recalculated and rewritten; earlier rows are left as they are.
+
+Reported days replace the planned day with the driver's own activities
+(see HOSEngine.record_day). They are kept as reported through later
+replans, which re-apply every reported day they recalculate.
+
+Trips saved before checkpoints were stored also predate exact cycle
+hours and cycle history (they were rounded or dropped), so they cannot be
+replanned from the state they were planned from; replan_trip refuses them
+with ReplanUnavailable.
+"""
+
+from datetime import datetime
+
+from django.db import transaction
+
+from ..hos_engine import (
+    MINUTES_PER_DAY, PRETRIP_DESCRIPTION, HOSEngine, build_trip_tasks, first_changed_task
+)
+from ..models import EldLog
+from ..rule_plan import get_rule_plan
+from ..signals import eld_logs_created
+from .trip_planner import LOCATION_FIELDS, estimate_route, summarize_compliance
+from .trip_store import BULK_BATCH_SIZE, build_eld_log, eld_log_to_day, result_hash
+
+class ReplanUnavailable(Exception):
+    """The stored trip does not hold the state needed to replan it"""
+
+
+def stored_trip_data(trip):
+    """The planning inputs a stored trip was calculated from"""
+    return {
+        'current_location': trip.current_location,
+        'pickup_location': trip.pickup_location,
+        'dropoff_location': trip.dropoff_location,
+        'current_cycle_used': trip.current_cycle_used,
+        'cycle_history': trip.cycle_history,
+        'rule_set': trip.rule_set,
+    }
+
+
+def can_resume_at(checkpoint, task_index):
+    """
+    Whether a day starting from `checkpoint` is unaffected by tasks from `task_index` on
+
+    The engine must not have started the task yet, nor queued the
+    pre-trip inspection that opens it (the order of the cycle check and
+    the inspection depends on the kind of task).
+    """
+    if checkpoint['task_index'] != task_index:
+        return checkpoint['task_index'] < task_index
+    return checkpoint['task_remaining'] is None and not any(
+        event[2] == PRETRIP_DESCRIPTION for event in checkpoint['pending']
+    )
+
+
+def resume_day(logs, task_index):
+    """Number of the latest stored day a replan for a change at `task_index` can start from"""
+    resume = 1
+    for log in logs:
+        if can_resume_at(log.checkpoint, task_index):
+            resume = log.day_number
+        else:
+            break
+    return resume
+
+
+def run_from(engine, tasks, start_date, plan, reported):
+    """
+    (days, checkpoints) from `engine` to the end of the trip
+
+    `reported` maps day numbers to the activities the driver reported for
+    them; those days are recorded as reported and planning continues from
+    them. Raises ValueError for a report after the day the trip ends.
+    """
+    days, checkpoints = [], []
+    for day_number in sorted(reported):
+        if engine.now < (day_number - 1) * MINUTES_PER_DAY:
+            # Plan the days before the reported one, then restart from its checkpoint
+            planned = []
+            for day in engine.iter_days(tasks, planned):
+                if day['day_number'] == day_number:
+                    engine = HOSEngine.from_checkpoint(planned[-1], start_date, plan)
+                    break
+                days.append(day)
+                checkpoints.append(planned[-1])
+            else:
+                if engine.now != (day_number - 1) * MINUTES_PER_DAY:
+                    raise ValueError(f'Day {day_number} is after the end of the trip')
+        checkpoints.append(engine.checkpoint())
+        days.append(engine.record_day(reported[day_number], tasks))
+
+    planned = []
+    days.extend(engine.iter_days(tasks, planned))
+    checkpoints.extend(planned)
+    return days, checkpoints
+
+
+def replan_trip(trip, locations=None, actual_days=None):
+    """
+    Apply new locations and/or reported days to a stored trip
+
+    `locations` holds any of LOCATION_FIELDS; `actual_days` maps day
+    numbers to reported activities. Days before the first affected one
+    are reused from the database; the rest are recalculated, replaced
+    and returned. The caller should hold a lock on the trip row.
+
+    Returns (result, replan): the trip result as TripDetailView returns
+    it, and {'first_recomputed_day', 'reused_days', 'recomputed_days'}.
+    Raises ValueError for reports the trip cannot take, and
+    ReplanUnavailable for a trip stored without checkpoints.
+    """
+    logs = list(trip.eld_logs.order_by('day_number'))
+    if not logs or not all(log.checkpoint for log in logs):
+        raise ReplanUnavailable(
+            f'Trip {trip.trip_id} was stored without planning checkpoints and cannot be replanned; '
+            'calculate it again as a new trip'
+        )
+
+    plan = get_rule_plan(trip.rule_set)
+    actual_days = actual_days or {}
+    old_data = stored_trip_data(trip)
+    new_data = {**old_data, **(locations or {})}
+
+    route_info = trip.route_info
+    if any(new_data[field] != old_data[field] for field in LOCATION_FIELDS):
+        route_info = estimate_route(new_data)
+    tasks = build_trip_tasks(new_data, route_info, plan)
+
+    start_date = logs[0].date
+    reported = {
+        log.day_number: log.activities for log in logs if log.extra.get('reported')
+    }
+    reported.update(actual_days)
+
+    changed = first_changed_task(build_trip_tasks(old_data, trip.route_info, plan), tasks)
+    first_day = len(logs) + 1 if changed is None else resume_day(logs, changed)
+    if actual_days:
+        # A report for the day after the last one needs the engine at the end of the trip
+        first_day = min(first_day, min(actual_days), len(logs))
+
+    kept = [eld_log_to_day(log) for log in logs[:first_day - 1]]
+    days, checkpoints = [], []
+    if first_day <= len(logs):
+        engine = HOSEngine.from_checkpoint(logs[first_day - 1].checkpoint, start_date, plan)
+        days, checkpoints = run_from(
+            engine, tasks, start_date, plan,
+            {number: activities for number, activities in reported.items() if number >= first_day}
+        )
+
+    eld_logs = kept + days
+    compliance_summary = summarize_compliance(eld_logs)
+    result = {
+        'trip_id': trip.trip_id,
+        'route': route_info,
+        'eld_logs': eld_logs,
+        'compliance_summary': compliance_summary,
+        'generated_at': datetime.now().isoformat(),
+    }
+
+    with transaction.atomic():
+        if days:
+            trip.eld_logs.filter(day_number__gte=first_day).delete()
+            EldLog.objects.bulk_create(
+                [build_eld_log(trip, day, checkpoint) for day, checkpoint in zip(days, checkpoints)],
+                batch_size=BULK_BATCH_SIZE
+            )
+            transaction.on_commit(
+                lambda: eld_logs_created.send(sender=EldLog, trip=trip, count=len(days))
+            )
+        for field in LOCATION_FIELDS:
+            setattr(trip, field, new_data[field])
+        if days or route_info != trip.route_info:
+            trip.content_hash = result_hash(result)
+        trip.route_info = route_info
+        trip.compliance_summary = compliance_summary
+        trip.is_compliant = compliance_summary.get('is_compliant')
+        trip.save(update_fields=[
+            *LOCATION_FIELDS, 'route_info', 'compliance_summary', 'is_compliant', 'content_hash', 'updated_at'
+        ])
+
+    return result, {
+        'first_recomputed_day': first_day if days else None,
+        'reused_days': len(kept),
+        'recomputed_days': len(days),
+    }
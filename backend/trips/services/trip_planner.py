@@ -0,0 +1,205 @@
+"""
+Shared trip planning helpers used by the single-trip and batch endpoints
+"""
+
+import math
+import re
+
+from ..hos_engine import plan_eld_logs
+from ..models import generate_trip_id
+from ..routing import get_router
+from ..rule_plan import get_rule_plan
+
+# `id` is what compact responses send in place of the full entry
+LEGAL_REFERENCES = [
+    {
+        'id': 'driving-limit',
+        'section': '49 CFR §395.3(a)(3)',
+        'title': '11-Hour Driving Limit',
+        'reference': 'PDF Page 6'
+    },
+    {
+        'id': 'driving-window',
+        'section': '49 CFR §395.3(a)(2)',
+        'title': '14-Hour Driving Window',
+        'reference': 'PDF Page 6'
+    },
+    {
+        'id': 'break',
+        'section': '49 CFR §395.3(a)(3)(ii)',
+        'title': '30-Minute Break Requirement',
+        'reference': 'PDF Page 10'
+    },
+    {
+        'id': 'cycle-limit',
+        'section': '49 CFR §395.3(b)',
+        'title': '70-Hour/8-Day Limit',
+        'reference': 'PDF Page 10'
+    }
+]
+
+
+LOCATION_FIELDS = ('current_location', 'pickup_location', 'dropoff_location')
+
+
+REQUIRED_FIELDS = LOCATION_FIELDS + ('current_cycle_used',)
+
+
+class InvalidTripInput(ValueError):
+    """Trip input that cannot be planned; `field` names the input at fault"""
+
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+
+
+def check_trip_input(data):
+    """
+    Raise InvalidTripInput for the first problem with a trip's input
+
+    Shared by the single-trip endpoints (raw JSON) and the batch serializer
+    (already typed values), so both accept exactly the same trips.
+    """
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            raise InvalidTripInput(field, f'Missing required field: {field}')
+
+    # Resolve the HOS rule set (compiled once per process)
+    try:
+        plan = get_rule_plan(data.get('rule_set'))
+    except ValueError as e:
+        raise InvalidTripInput('rule_set', str(e))
+
+    try:
+        current_cycle_used = float(data['current_cycle_used'])
+    except (TypeError, ValueError):
+        raise InvalidTripInput('current_cycle_used', 'current_cycle_used must be a number')
+    if current_cycle_used < 0 or current_cycle_used > plan.cycle_hours:
+        raise InvalidTripInput(
+            'current_cycle_used', f'current_cycle_used must be between 0 and {plan.cycle_hours:g} hours'
+        )
+
+    # CMV weight must be ≥10,001 lbs (PDF page 3)
+    if data.get('cmv_weight') is not None:
+        try:
+            cmv_weight = int(data['cmv_weight'])
+        except (TypeError, ValueError):
+            raise InvalidTripInput('cmv_weight', 'cmv_weight must be a number')
+        if cmv_weight < 10001:
+            raise InvalidTripInput('cmv_weight', 'CMV must weigh at least 10,001 lbs or transport placarded hazmat')
+
+    state = data.get('state')
+    if state not in (None, '') and not (isinstance(state, str) and re.fullmatch(r'[A-Za-z]{2}', state)):
+        raise InvalidTripInput('state', 'state must be a two-letter state code')
+
+    # Optional per-day history (oldest first, ending yesterday)
+    cycle_history = data.get('cycle_history')
+    if cycle_history is not None:
+        if (not isinstance(cycle_history, list) or len(cycle_history) > 7 or
+                not all(isinstance(h, (int, float)) and 0 <= h <= 24 for h in cycle_history)):
+            raise InvalidTripInput(
+                'cycle_history', 'cycle_history must be a list of up to 7 daily on-duty hours (0-24)'
+            )
+
+    # Stops outside the gazetteer are planned with an estimated route
+    for field in LOCATION_FIELDS:
+        value = data[field]
+        if not isinstance(value, str) or not value.strip():
+            raise InvalidTripInput(field, f'{field} must be a non-empty string')
+
+
+def estimate_route(data):
+    """
+    Route current→pickup→dropoff and total the per-leg results
+
+    Falls back to the old fixed estimate when a location is not in the
+    gazetteer; that result is marked with source 'estimate'.
+    """
+    legs = get_router().route_trip(data)
+    if legs is None:
+        return legacy_route_estimate()
+
+    distance = round(sum(leg['distance_miles'] for leg in legs), 1)
+    hours = sum(leg['driving_hours'] for leg in legs)
+    sources = {leg['source'] for leg in legs}
+
+    return {
+        'distance_miles': distance,
+        'driving_hours': hours,
+        'estimated_days': math.ceil(hours / 11),  # Max 11 hours per day
+        'average_speed': round(distance / hours, 1) if hours else 0,
+        'legs': legs,
+        'note': (
+            'Great-circle distance with detour factor (no road graph loaded)'
+            if 'great_circle' in sources
+            else 'Routed with the local road network'
+        )
+    }
+
+
+def legacy_route_estimate():
+    """Fixed estimate used when the trip locations cannot be resolved"""
+    estimated_distance = 1200  # miles
+    estimated_hours = estimated_distance / 55  # Assuming 55 mph average
+    estimated_days = math.ceil(estimated_hours / 11)  # Max 11 hours per day
+
+    return {
+        'distance_miles': estimated_distance,
+        'driving_hours': estimated_hours,
+        'estimated_days': estimated_days,
+        'average_speed': 55,
+        'source': 'estimate',
+        'note': 'Locations not recognized; using estimated values'
+    }
+
+
+class ComplianceSummary:
+    """Running compliance totals, updated one day at a time"""
+
+    def __init__(self):
+        self.violation_count = 0
+        self.total_trip_hours = 0
+        self.total_days = 0
+        self.requires_restart = False
+
+    def add(self, log):
+        self.violation_count += len(log['compliance']['violations'])
+        self.total_trip_hours += log['driving_hours']
+        self.total_days += 1
+        self.requires_restart = self.requires_restart or bool(log['requires_restart'])
+
+    def as_dict(self):
+        return {
+            'is_compliant': self.violation_count == 0,
+            'violation_count': self.violation_count,
+            'total_trip_hours': self.total_trip_hours,
+            'total_days': self.total_days,
+            'requires_34hr_restart': self.requires_restart
+        }
+
+
+def summarize_compliance(eld_logs):
+    """Generate compliance summary for all logs"""
+    summary = ComplianceSummary()
+    for log in eld_logs:
+        summary.add(log)
+    return summary.as_dict()
+
+
+def plan_trip(trip_data):
+    """
+    Plan a single validated trip with the HOS engine
+
+    Returns a plain dict so the result can cross process boundaries. Its
+    per-day engine `checkpoints` are removed by save_trip_result.
+    """
+    route_info = estimate_route(trip_data)
+    eld_logs, checkpoints = plan_eld_logs(trip_data, route_info)
+
+    return {
+        'trip_id': generate_trip_id(),
+        'route': route_info,
+        'eld_logs': eld_logs,
+        'compliance_summary': summarize_compliance(eld_logs),
+        'checkpoints': checkpoints,
+    }
@@ -0,0 +1,279 @@
+"""
+Persistence for calculated trips
+
+A trip and all of its log days are written in one transaction, with the
+days inserted by a single bulk_create. The trip keeps the exact cycle
+hours and per-day cycle history it was planned from, so it can be
+recalculated from the same state. bulk_create skips post_save, so a
+single eld_logs_created audit event is sent per trip once it commits.
+Streaming responses use TripResultWriter to write days in batches as
+they are produced.
+
+Every write also stores a content hash of the result on the Trip, so
+conditional GETs can be answered from the Trip row alone.
+
+A streamed trip is written over many transactions, so its Trip row is
+marked incomplete until TripResultWriter.finish. Readers go through
+`completed_trips` and never see a half-written trip; the rows of a
+stream whose process died are removed by `purge_incomplete_trips`.
+
+Each day row can also keep the HOS engine checkpoint the day starts from
+(see trips.hos_engine), so a trip that changes mid-route is replanned
+from the first affected day instead of from scratch. Checkpoints are not
+part of the result: they are not hashed or returned, and read paths
+defer the column.
+"""
+
+import hashlib
+import json
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from ..models import EldLog, Trip
+from ..signals import eld_logs_created
+
+# Day-dict keys stored in their own EldLog columns; anything else goes to `extra`
+HOUR_FIELDS = (
+    'driving_hours', 'on_duty_hours', 'off_duty_hours', 'sleeper_hours',
+    'cycle_7day_total', 'cycle_8day_total',
+)
+COLUMN_FIELDS = HOUR_FIELDS + (
+    'day_number', 'date', 'requires_restart', 'requires_break', 'has_fuel_stop',
+    'activities', 'remarks', 'compliance',
+)
+
+TRIP_INPUT_FIELDS = (
+    'trip_type', 'state', 'rule_set', 'cmv_weight', 'requires_cdl', 'adverse_conditions',
+    'includes_hazmat',
+)
+
+BULK_BATCH_SIZE = 500
+
+
+def _hours(value):
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+class ContentHasher:
+    """SHA-256 over the route, each day in order, then the compliance summary"""
+
+    def __init__(self, route):
+        self._hash = hashlib.sha256()
+        self.update(route)
+
+    def update(self, value):
+        self._hash.update(json.dumps(value, sort_keys=True, separators=(',', ':'), default=str).encode())
+        self._hash.update(b'\n')
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def result_hash(result):
+    """
+    Content hash of a trip result as it is served once stored
+
+    Days are hashed as eld_log_to_day rebuilds them from their rows (hours
+    at the stored 0.01 precision), so a calculated result, its stored rows
+    and a recalculation serving the same content all hash alike.
+    """
+    hasher = ContentHasher(result['route'])
+    for day in result['eld_logs']:
+        hasher.update(served_day(day))
+    hasher.update(result['compliance_summary'])
+    return hasher.hexdigest()
+
+
+def build_eld_log(trip, day, checkpoint=None):
+    """Map a calculated day dict (and the checkpoint it starts from) onto an unsaved EldLog row"""
+    return EldLog(
+        trip=trip,
+        day_number=day['day_number'],
+        date=day['date'],
+        requires_restart=bool(day.get('requires_restart')),
+        requires_break=bool(day.get('requires_break')),
+        has_fuel_stop=bool(day.get('has_fuel_stop')),
+        activities=day.get('activities', []),
+        remarks=day.get('remarks', []),
+        compliance=day.get('compliance', {}),
+        extra={key: value for key, value in day.items() if key not in COLUMN_FIELDS},
+        checkpoint=checkpoint,
+        **{field: _hours(day.get(field)) for field in HOUR_FIELDS}
+    )
+
+
+def served_day(day):
+    """A calculated day dict as it is served after a store and reload"""
+    return eld_log_to_day(build_eld_log(None, day))
+
+
+def save_trip_result(trip_data, result):
+    """
+    Persist a calculated trip and its ELD logs atomically
+
+    `result` is the calculator output with trip_id, route, eld_logs and
+    compliance_summary. Its `checkpoints` (one per day, when the engine
+    provided them) are stored with the days and removed from `result`,
+    which is then the response body. Returns the saved Trip.
+    """
+    checkpoints = result.pop('checkpoints', None) or [None] * len(result['eld_logs'])
+    inputs = {field: trip_data[field] for field in TRIP_INPUT_FIELDS if field in trip_data}
+
+    with transaction.atomic():
+        trip = Trip.objects.create(
+            trip_id=result['trip_id'],
+            current_location=trip_data['current_location'],
+            pickup_location=trip_data['pickup_location'],
+            dropoff_location=trip_data['dropoff_location'],
+            current_cycle_used=float(trip_data.get('current_cycle_used', 0)),
+            cycle_history=list(trip_data.get('cycle_history') or []),
+            route_info=result['route'],
+            compliance_summary=result['compliance_summary'],
+            is_compliant=result['compliance_summary'].get('is_compliant'),
+            content_hash=result_hash(result),
+            **inputs
+        )
+        logs = EldLog.objects.bulk_create(
+            [build_eld_log(trip, day, checkpoint) for day, checkpoint in zip(result['eld_logs'], checkpoints)],
+            batch_size=BULK_BATCH_SIZE
+        )
+        transaction.on_commit(
+            lambda: eld_logs_created.send(sender=EldLog, trip=trip, count=len(logs))
+        )
+
+    return trip
+
+
+class TripResultWriter:
+    """
+    Persist a trip while its days are still being calculated
+
+    Used by the streaming endpoints: the Trip row is created up front, days
+    are bulk-inserted every `batch_size` rows, and the compliance summary is
+    filled in by `finish`, which also marks the trip complete. Only one
+    batch of unsaved rows is held at a time. `abort` deletes a trip whose
+    calculation did not complete.
+    """
+
+    def __init__(self, trip_data, trip_id, route_info, batch_size=BULK_BATCH_SIZE):
+        inputs = {field: trip_data[field] for field in TRIP_INPUT_FIELDS if field in trip_data}
+        self.batch_size = batch_size
+        self.count = 0
+        self._pending = []
+        self._hasher = ContentHasher(route_info)
+        self.trip = Trip.objects.create(
+            trip_id=trip_id,
+            current_location=trip_data['current_location'],
+            pickup_location=trip_data['pickup_location'],
+            dropoff_location=trip_data['dropoff_location'],
+            current_cycle_used=float(trip_data.get('current_cycle_used', 0)),
+            cycle_history=list(trip_data.get('cycle_history') or []),
+            route_info=route_info,
+            compliance_summary={},
+            is_complete=False,
+            **inputs
+        )
+
+    def add(self, day, checkpoint=None):
+        log = build_eld_log(self.trip, day, checkpoint)
+        self._hasher.update(eld_log_to_day(log))
+        self._pending.append(log)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            EldLog.objects.bulk_create(self._pending)
+            self.count += len(self._pending)
+            self._pending = []
+
+    def finish(self, compliance_summary):
+        """Write the remaining days and the summary; returns the saved Trip"""
+        with transaction.atomic():
+            self.flush()
+            self._hasher.update(compliance_summary)
+            self.trip.compliance_summary = compliance_summary
+            self.trip.is_compliant = compliance_summary.get('is_compliant')
+            self.trip.content_hash = self._hasher.hexdigest()
+            self.trip.is_complete = True
+            self.trip.save(update_fields=[
+                'compliance_summary', 'is_compliant', 'content_hash', 'is_complete', 'updated_at'
+            ])
+        eld_logs_created.send(sender=EldLog, trip=self.trip, count=self.count)
+        return self.trip
+
+    def abort(self):
+        self._pending = []
+        self.trip.delete()
+
+
+def eld_log_to_day(log):
+    """Rebuild the day dict returned by the calculators from a stored row"""
+    day = {
+        'day_number': log.day_number,
+        'date': log.date.isoformat() if hasattr(log.date, 'isoformat') else log.date,
+    }
+    for field in HOUR_FIELDS:
+        day[field] = float(getattr(log, field))
+    day.update({
+        'requires_restart': log.requires_restart,
+        'requires_break': log.requires_break,
+        'has_fuel_stop': log.has_fuel_stop,
+        'activities': log.activities,
+        'remarks': log.remarks,
+        'compliance': log.compliance,
+    })
+    day.update(log.extra)
+    return day
+
+
+def completed_trips():
+    """Trips whose days have all been written; every read path starts here"""
+    return Trip.objects.filter(is_complete=True)
+
+
+def purge_incomplete_trips(older_than):
+    """Delete trips left incomplete for longer than `older_than` (a timedelta); returns the count"""
+    stale = Trip.objects.filter(is_complete=False, updated_at__lt=timezone.now() - older_than)
+    count = stale.count()
+    stale.delete()
+    return count
+
+
+def result_logs(trip):
+    """A trip's day rows without their checkpoints, for building responses"""
+    return trip.eld_logs.defer('checkpoint')
+
+
+def result_logs_prefetch():
+    """Prefetch of the day rows (without checkpoints) for trip_to_result"""
+    return Prefetch('eld_logs', queryset=EldLog.objects.defer('checkpoint'))
+
+
+def trip_to_result(trip, logs=None):
+    """Rebuild the calculation response for a stored trip"""
+    logs = trip.eld_logs.all() if logs is None else logs
+    return {
+        'trip_id': trip.trip_id,
+        'route': trip.route_info,
+        'eld_logs': [eld_log_to_day(log) for log in logs],
+        'compliance_summary': trip.compliance_summary,
+        'generated_at': trip.created_at.isoformat(),
+    }
+
+
+def ensure_content_hash(trip):
+    """Hash of a stored trip, computed from its rows once for trips saved before hashing"""
+    if not trip.content_hash:
+        trip.content_hash = result_hash(trip_to_result(trip))
+        Trip.objects.filter(pk=trip.pk).update(content_hash=trip.content_hash)
+    return trip.content_hash
+
+
+def load_trip_result(trip_id):
+    """Read a stored trip by its public ID (raises Trip.DoesNotExist)"""
+    trip = completed_trips().prefetch_related(result_logs_prefetch()).get(trip_id=trip_id)
+    return trip_to_result(trip)
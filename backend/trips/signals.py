@@ -3,20 +3,22 @@ Signals for the trips app
 """
 
 from django.db.models.signals import post_save
-from django.dispatch import receiver
-from .models import Trip, EldLog
+from django.dispatch import receiver, Signal
+from .models import Trip
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Sent once per trip after its ELD logs are bulk-written (kwargs: trip, count)
+eld_logs_created = Signal()
+
 @receiver(post_save, sender=Trip)
 def log_trip_creation(sender, instance, created, **kwargs):
     """Log when a new trip is created"""
     if created:
         logger.info(f'New trip created: {instance.trip_id} - {instance.current_location} to {instance.dropoff_location}')
 
-@receiver(post_save, sender=EldLog)
-def log_eld_creation(sender, instance, created, **kwargs):
-    """Log when ELD logs are generated"""
-    if created:
-        logger.info(f'ELD log created for Trip {instance.trip.trip_id}, Day {instance.day_number}')
\ No newline at end of file
+@receiver(eld_logs_created)
+def log_eld_creation(sender, trip, count, **kwargs):
+    """Log one audit event per trip when its ELD logs are generated"""
+    logger.info(f'{count} ELD log(s) created for Trip {trip.trip_id}')
\ No newline at end of file
@@ -2,9 +2,55 @@ from django.test import TestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Trip
+from .models import Trip, EldLog, PlanningJob
+from .signals import eld_logs_created
+from .services.calc_cache import CalculationCache, cache_key
+from datetime import date, timedelta
 from .hos_calculator import HOSCalculator
+from .hos_engine import HOSEngine, build_trip_tasks, iter_eld_logs
+from tooling.differential import ENTRY_POINTS, generate_scenarios, run_differential
+from .services.eld_calculator import ELDCalculator
+from .cycle_tracker import CycleTracker
+from .duty_grid import DutyGrid
+from .fleet_compliance import RULE_BREAK, RULE_CYCLE, RULE_DRIVING_LIMIT, evaluate_fleet, stack_grids
+from .gazetteer import get_gazetteer, great_circle_miles
+from .exceptions import ExceptionChecker, ShortHaulException
+from .rule_engine import Condition, Rule, RuleEngine
+from .rule_plan import get_rule_plan, rule_set_choices
+from .routing import RoadGraph, Router, get_router, reset_router
+from .lane_matrix import LaneMatrix, write_lane_matrix
+from .log_sheet import render_cache
+from .exporters import file_check_value, line_check_value
+import csv
+import io
+import xml.etree.ElementTree as ET
+from .services.trip_planner import estimate_route
+from .services.async_pool import CalculationPool, PoolBusy
+from .jobs import Heartbeat, claim_next_job, requeue_stale_jobs, run_job
+from tooling.benchmarks import compare_results, run_benchmarks
+from .timing import phase_stats
+from .serializers import TripSerializer
+from .middleware import CompressionMiddleware, ServerTimingMiddleware
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from .metrics import MetricsRegistry, render_prometheus
+from .services.trip_store import result_hash, save_trip_result
+import gzip
+from django.core.management import call_command
+from django.core.management.base import CommandError
+import asyncio
+import threading
+import os
+import subprocess
+import sys
+import tempfile
 import json
+from unittest import mock
+from django.db import DatabaseError
+from django.utils import timezone
+from django.conf import settings
+from concurrent.futures.process import BrokenProcessPool
 
 class HOSCalculatorTestCase(TestCase):
     """Test HOS calculator logic"""
@@ -33,6 +79,581 @@ class HOSCalculatorTestCase(TestCase):
         self.assertTrue(has_break)
 
 
+class HOSEngineTestCase(TestCase):
+    """Test the event-driven HOS engine"""
+    
+    trip_data = {
+        'current_location': 'Dallas, TX',
+        'pickup_location': 'Houston, TX',
+        'dropoff_location': 'Atlanta, GA',
+    }
+    
+    def simulate(self, miles, cycle_used=0, start_minute=300):
+        route = {'distance_miles': miles, 'driving_hours': miles / 55}
+        engine = HOSEngine(cycle_used_hours=cycle_used, start_minute=start_minute)
+        return engine.simulate(build_trip_tasks(self.trip_data, route))
+    
+    def test_days_cover_24_hours(self):
+        """Every log day accounts for all 1440 minutes"""
+        for day in self.simulate(2500):
+            total = sum(a['duration'] for a in day['activities'])
+            self.assertAlmostEqual(total, 24)
+            self.assertEqual(day['activities'][0]['start'], '00:00')
+            self.assertEqual(day['activities'][-1]['end'], '24:00')
+    
+    def test_multi_week_trip_is_compliant(self):
+        """Long trips respect the 11/14-hour and cycle limits"""
+        days = self.simulate(12000, cycle_used=40)
+        self.assertTrue(all(d['compliance']['is_compliant'] for d in days))
+        self.assertTrue(any(d['requires_restart'] for d in days))
+        self.assertAlmostEqual(sum(d['driving_hours'] for d in days), round(12000 / 55 * 60) / 60)
+    
+    def test_shift_crosses_midnight(self):
+        """A shift starting in the evening continues past midnight"""
+        days = self.simulate(400, start_minute=20 * 60)
+        self.assertEqual(days[0]['activities'][-1]['status'], 'driving')
+        self.assertEqual(days[0]['activities'][-1]['end'], '24:00')
+        self.assertEqual(days[1]['activities'][0]['status'], 'driving')
+        self.assertEqual(days[1]['activities'][0]['start'], '00:00')
+    
+    def test_break_after_8_hours(self):
+        """A 30-minute break is inserted before the 9th hour of driving"""
+        day = self.simulate(600)[0]
+        self.assertTrue(day['requires_break'])
+        statuses = [a['status'] for a in day['activities']]
+        self.assertIn('off_duty', statuses[statuses.index('driving'):])
+
+
+class CanonicalEngineTestCase(TestCase):
+    """Test that every calculator is scheduled by the HOS engine"""
+    
+    trip_data = {
+        'current_location': 'Dallas, TX',
+        'pickup_location': 'Houston, TX',
+        'dropoff_location': 'Atlanta, GA',
+        'current_cycle_used': 20,
+    }
+    route = {'distance_miles': 1500, 'driving_hours': 1500 / 55}
+    
+    def test_entry_points_share_the_engine_schedule(self):
+        """HOSCalculator and ELDCalculator reshape the engine's days without changing them"""
+        days = list(iter_eld_logs(self.trip_data, self.route, date(2024, 3, 1)))
+        
+        logs = HOSCalculator(self.trip_data, start_date=date(2024, 3, 1)).calculate_trip(1500, 1500 / 55)
+        self.assertEqual([log['driving_hours'] for log in logs], [day['driving_hours'] for day in days])
+        self.assertEqual(sum(len(log['fuel_stops']) for log in logs), 1)
+        self.assertEqual(sum(log['load_unload_time'] for log in logs), 2)
+        
+        trip = Trip(current_location='Dallas, TX', pickup_location='Houston, TX',
+                    dropoff_location='Atlanta, GA', current_cycle_used=20)
+        result = ELDCalculator(trip).calculate_trip(self.route)
+        self.assertEqual(result['total_days'], len(days))
+        self.assertEqual(result['fuel_stops'], 1)
+        for log, day in zip(result['daily_logs'], days):
+            self.assertEqual(log['on_duty_hours'], day['on_duty_hours'])
+            self.assertEqual([e['activity'] for e in log['entries']][:1], ['OFF'])
+            self.assertEqual(len(log['entries']), len(day['activities']))
+    
+    def test_scenarios_are_reproducible(self):
+        """The same seed yields the same scenarios, within the generator's bounds"""
+        scenarios = generate_scenarios(50, seed=7)
+        self.assertEqual(scenarios, generate_scenarios(50, seed=7))
+        self.assertNotEqual(scenarios, generate_scenarios(50, seed=8))
+        for scenario in scenarios:
+            self.assertTrue(30 <= scenario['route']['distance_miles'] <= 15000)
+            get_rule_plan(scenario['trip']['rule_set'])
+    
+    def test_differential_report(self):
+        """The harness compares every entry point and the engine invariants hold"""
+        report = run_differential(count=30, seed=3)
+        self.assertEqual(set(report['entry_points']), set(ENTRY_POINTS))
+        for result in report['entry_points'].values():
+            self.assertLessEqual(result['diverged'], 30)
+            self.assertGreater(result['new_seconds'], 0)
+            self.assertLessEqual(len(result['examples']), 5)
+        self.assertEqual(sum(report['invariants']['failures'].values()), 0)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'report.json')
+            call_command('compare_hos_engines', '--scenarios', '5', '--output', path, stdout=io.StringIO())
+            with open(path) as f:
+                self.assertEqual(json.load(f)['scenarios'], 5)
+
+
+class CalculationCacheTestCase(TestCase):
+    """Test the content-addressed calculation cache"""
+    
+    def setUp(self):
+        self.cache = CalculationCache(max_entries=2, ttl_seconds=60, backend='default')
+        self.calls = 0
+    
+    def compute(self):
+        self.calls += 1
+        return [{'day_number': 1, 'driving_hours': 11}]
+    
+    def test_hits_after_first_miss(self):
+        """Identical inputs are computed once; hits return independent copies"""
+        inputs = {'distance_miles': 600.0, 'start_date': '2024-01-01'}
+        first = self.cache.get_or_compute('test', inputs, self.compute)
+        first[0]['driving_hours'] = 0
+        second = self.cache.get_or_compute('test', dict(inputs), self.compute)
+        
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(second[0]['driving_hours'], 11)
+        stats = self.cache.stats()
+        self.assertEqual((stats['misses'], stats['local_hits']), (1, 1))
+    
+    def test_key_covers_inputs_and_config(self):
+        """Start date and HOS_CONFIG are part of the key"""
+        base = cache_key('test', {'start_date': '2024-01-01'})
+        self.assertNotEqual(base, cache_key('test', {'start_date': '2024-01-02'}))
+        with self.settings(HOS_CONFIG={'PROPERTY_CARRYING': {}, 'ASSUMPTIONS': {}}):
+            self.assertNotEqual(base, cache_key('test', {'start_date': '2024-01-01'}))
+    
+    def test_falls_back_to_shared_cache(self):
+        """Entries evicted from the LRU are still found in Django's cache"""
+        for distance in (1, 2, 3):
+            self.cache.get_or_compute('test', {'distance': distance}, self.compute)
+        self.cache.get_or_compute('test', {'distance': 1}, self.compute)
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(self.cache.stats()['shared_hits'], 1)
+    
+    def test_calculator_uses_injected_start_date(self):
+        """Day dates come from the injected start date, not the wall clock"""
+        calculator = HOSCalculator({'current_cycle_used': 0}, start_date=date(2024, 3, 1))
+        logs = calculator.calculate_trip(distance_miles=900, driving_hours=16)
+        self.assertEqual([log['date'] for log in logs], ['2024-03-01', '2024-03-02'])
+
+
+class CycleTrackerTestCase(TestCase):
+    """Test the rolling 7/8-day cycle ring buffer"""
+    
+    def test_hours_roll_off_after_8_days(self):
+        """Hours leave the 8-day window at the 8th midnight"""
+        tracker = CycleTracker(limit_hours=70)
+        tracker.add_hours(10)
+        for _ in range(8):
+            self.assertEqual(tracker.hours_used, 10)
+            tracker.advance_day()
+        self.assertEqual(tracker.hours_used, 0)
+    
+    def test_seeded_history(self):
+        """Prior-day history drives availability and midnight recovery"""
+        tracker = CycleTracker(limit_hours=70, history=[12, 0, 8, 10, 10, 10, 10])
+        self.assertEqual(tracker.hours_used, 60)
+        self.assertEqual(tracker.hours_available, 10)
+        self.assertEqual(tracker.hours_recovered_at_midnight, 12)
+        self.assertEqual(tracker.window_hours(7), 48)
+        tracker.advance_day()
+        self.assertEqual(tracker.hours_available, 22)
+    
+    def test_cycle_used_is_charged_to_recent_days(self):
+        """Without history, hours are recovered as late as possible"""
+        tracker = CycleTracker.from_cycle_used(30, max_daily_hours=14)
+        self.assertEqual(tracker.hours_used, 30)
+        self.assertEqual(tracker.hours_recovered_at_midnight, 0)
+    
+    def test_restart(self):
+        """A 34-hour restart clears the cycle"""
+        tracker = CycleTracker.from_cycle_used(70)
+        self.assertTrue(tracker.is_exhausted())
+        tracker.restart()
+        self.assertEqual(tracker.hours_available, 70)
+
+
+class DutyGridTestCase(TestCase):
+    """Test the compact per-minute duty-status grid"""
+    
+    def setUp(self):
+        route = {'distance_miles': 900, 'driving_hours': 900 / 55}
+        trip = {'current_location': 'A', 'pickup_location': 'B', 'dropoff_location': 'C'}
+        self.days = HOSEngine().simulate(build_trip_tasks(trip, route))
+    
+    def test_round_trip_is_lossless(self):
+        """activities JSON -> grid -> activities JSON is unchanged"""
+        for day in self.days:
+            grid = DutyGrid.from_activities(day['activities'])
+            self.assertEqual(len(grid), 1440)
+            self.assertEqual(grid.to_activities(), day['activities'])
+    
+    def test_totals_match_day_log(self):
+        """Totals computed from the grid match the engine's day totals"""
+        for day in self.days:
+            totals = DutyGrid.from_activities(day['activities']).totals()
+            self.assertAlmostEqual(totals['driving'], day['driving_hours'])
+            self.assertAlmostEqual(totals['driving'] + totals['on_duty'], day['on_duty_hours'])
+    
+    def test_transitions_and_render(self):
+        """Transitions merge same-status runs; the rendered grid has four rows"""
+        grid = DutyGrid.from_activities([
+            {'status': 'off_duty', 'start': '00:00', 'end': '06:00'},
+            {'status': 'driving', 'start': '06:00', 'end': '10:00'},
+            {'status': 'driving', 'start': '10:00', 'end': '12:00'},
+            {'status': 'on_duty', 'start': '12:00', 'end': '12:30'},
+        ])
+        self.assertEqual(grid.transitions(), [(360, 'off_duty', 'driving'), (720, 'driving', 'on_duty')])
+        self.assertEqual(len(grid.render().splitlines()), 5)
+        self.assertEqual(grid.totals()['driving'], 6)
+
+
+class FleetComplianceTestCase(TestCase):
+    """Test vectorized fleet compliance evaluation"""
+    
+    def test_engine_schedules_are_compliant(self):
+        """Schedules produced by the engine have no violations"""
+        trip = {'current_location': 'A', 'pickup_location': 'B', 'dropoff_location': 'C'}
+        drivers = []
+        for miles in (400, 2500, 6000):
+            route = {'distance_miles': miles, 'driving_hours': miles / 55}
+            days = HOSEngine(cycle_used_hours=30).simulate(build_trip_tasks(trip, route))
+            drivers.append([DutyGrid.from_activities(d['activities']) for d in days])
+        
+        violations = evaluate_fleet(stack_grids(drivers), cycle_used_hours=[30, 30, 30])
+        self.assertEqual(len(violations), 0)
+    
+    def test_engine_schedules_pass_under_every_rule_set(self):
+        """The fleet check starts from the same prior cycle the engine planned from"""
+        trip = {'current_location': 'A', 'pickup_location': 'B', 'dropoff_location': 'C'}
+        for rule_set, _ in rule_set_choices():
+            plan = get_rule_plan(rule_set)
+            drivers, cycle_used = [], []
+            for miles in (400, 2500, 6000):
+                for used in (0, 30, 60):
+                    used = min(used, plan.cycle_hours)
+                    route = {'distance_miles': miles, 'driving_hours': miles / plan.average_speed}
+                    engine = HOSEngine(cycle_used_hours=used, plan=plan)
+                    days = engine.simulate(build_trip_tasks(trip, route, plan))
+                    drivers.append([DutyGrid.from_activities(d['activities']) for d in days])
+                    cycle_used.append(used)
+            
+            violations = evaluate_fleet(stack_grids(drivers), plan=plan, cycle_used_hours=cycle_used)
+            self.assertEqual(len(violations), 0, rule_set)
+    
+    def test_cycle_history_matches_spread_cycle_hours(self):
+        """Prior hours given per day are read the same as a total spread by the tracker"""
+        day = DutyGrid.from_activities([
+            {'status': 'off_duty', 'start': '00:00', 'end': '06:00'},
+            {'status': 'driving', 'start': '06:00', 'end': '16:00'},
+            {'status': 'off_duty', 'start': '16:00', 'end': '24:00'},
+        ])
+        statuses = stack_grids([[day] * 3, [day] * 3])
+        # 62 hours spread at 14 a day: 6, 14, 14, 14, 14 ending yesterday
+        spread = evaluate_fleet(statuses, cycle_used_hours=[62, 0])
+        history = evaluate_fleet(statuses, cycle_history=[[6, 14, 14, 14, 14], []])
+        self.assertEqual(spread.tolist(), history.tolist())
+        cycle = {(int(v['driver']), int(v['day'])) for v in spread if v['rule'] == RULE_CYCLE}
+        self.assertIn((0, 0), cycle)
+        self.assertFalse(any(driver == 1 for driver, _ in cycle))
+    
+    def test_audit_command_checks_stored_trips(self):
+        """The nightly audit re-checks stored trips and writes the violation table"""
+        trip = {
+            'current_location': 'Seattle, WA', 'pickup_location': 'Chicago, IL',
+            'dropoff_location': 'Miami, FL', 'current_cycle_used': 60,
+        }
+        self.client.post(reverse('trip-calculator'), trip, content_type='application/json')
+        self.client.post(reverse('trip-calculator'), {**trip, 'rule_set': 'passenger'},
+                         content_type='application/json')
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'violations.csv')
+            out = io.StringIO()
+            call_command('audit_fleet_compliance', '--output', path, '--chunk-size', '1', stdout=out)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(list(csv.DictReader(f)), [])
+        self.assertIn('Audited 2 trips: 0 violations', out.getvalue())
+    
+    def test_audit_visits_each_trip_once(self):
+        """Trips sharing a rule set are audited in one pass, without duplicate violation rows"""
+        trip = {
+            'current_location': 'Dallas, TX', 'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA', 'current_cycle_used': 10,
+        }
+        trip_ids = [
+            self.client.post(reverse('trip-calculator'), trip, content_type='application/json').json()['trip_id']
+            for _ in range(3)
+        ]
+        # Twelve hours of driving without a break on the first trip's first day
+        EldLog.objects.filter(trip__trip_id=trip_ids[0], day_number=1).update(activities=[
+            {'status': 'off_duty', 'start': '00:00', 'end': '06:00'},
+            {'status': 'driving', 'start': '06:00', 'end': '18:00'},
+            {'status': 'off_duty', 'start': '18:00', 'end': '24:00'},
+        ])
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'violations.csv')
+            out = io.StringIO()
+            call_command('audit_fleet_compliance', '--output', path, '--chunk-size', '2', stdout=out)
+            with open(path, encoding='utf-8') as f:
+                rows = [(row['driver'], row['day'], row['rule']) for row in csv.DictReader(f)]
+        self.assertTrue(rows)
+        self.assertEqual(len(rows), len(set(rows)))
+        self.assertEqual({driver for driver, _, _ in rows}, {trip_ids[0]})
+        self.assertIn(f'Audited 3 trips: {len(rows)} violations in 1 trips', out.getvalue())
+    
+    def test_detects_violations(self):
+        """Driving 12 hours without a break breaks the 11-hour and break rules"""
+        day = DutyGrid.from_activities([
+            {'status': 'off_duty', 'start': '00:00', 'end': '06:00'},
+            {'status': 'driving', 'start': '06:00', 'end': '18:00'},
+            {'status': 'off_duty', 'start': '18:00', 'end': '24:00'},
+        ])
+        violations = evaluate_fleet(stack_grids([[day], [day]]), cycle_used_hours=[0, 60])
+        rules = {(int(v['driver']), int(v['rule'])) for v in violations}
+        self.assertIn((0, RULE_DRIVING_LIMIT), rules)
+        self.assertIn((0, RULE_BREAK), rules)
+        self.assertNotIn((0, RULE_CYCLE), rules)
+        self.assertIn((1, RULE_CYCLE), rules)
+
+
+class RulePlanTestCase(TestCase):
+    """Test compiled HOS rule plans"""
+    
+    def test_plan_is_shared_and_immutable(self):
+        """One plan per rule set; attributes cannot be changed"""
+        plan = get_rule_plan()
+        self.assertIs(plan, get_rule_plan('property'))
+        self.assertEqual(plan.max_driving_minutes, 660)
+        self.assertEqual(plan.driving_rule, '11-hour driving limit (§395.3(a)(3))')
+        with self.assertRaises(AttributeError):
+            plan.max_driving_hours = 12
+        with self.assertRaises(ValueError):
+            get_rule_plan('unknown')
+    
+    def test_intrastate_overrides_base(self):
+        """State rule sets keep the federal limits they do not override"""
+        plan = get_rule_plan('texas_intrastate')
+        self.assertEqual(plan.max_driving_hours, 12)
+        self.assertEqual((plan.cycle_hours, plan.cycle_days), (70, 7))
+        self.assertEqual(plan.restart_hours, 34)
+        self.assertEqual(plan.cycle_rule, '70-hour/7-day limit (37 TAC §4.12)')
+    
+    def test_passenger_engine_has_no_break_or_restart(self):
+        """Passenger carriers drive 10 hours without a 30-minute break and wait out the cycle"""
+        plan = get_rule_plan('passenger')
+        route = {'distance_miles': 3000, 'driving_hours': 3000 / 55}
+        trip = {'current_location': 'A', 'pickup_location': 'B', 'dropoff_location': 'C'}
+        days = HOSEngine(cycle_used_hours=60, plan=plan).simulate(build_trip_tasks(trip, route, plan))
+        
+        self.assertAlmostEqual(sum(d['driving_hours'] for d in days), 3000 / 55, places=1)
+        for day in days:
+            self.assertFalse(day['requires_break'])
+            self.assertTrue(day['compliance']['is_compliant'], day['compliance'])
+        descriptions = {a['description'] for d in days for a in d['activities']}
+        self.assertIn('Off duty - waiting for cycle hours', descriptions)
+        self.assertNotIn('34-hour restart - cycle reset', descriptions)
+    
+    def test_calculator_uses_trip_rule_set(self):
+        """HOSCalculator reads the trip's rule set; plans are part of the cache key"""
+        trip = {'current_cycle_used': 0, 'rule_set': 'california_intrastate'}
+        logs = HOSCalculator(trip, start_date=date(2024, 3, 4)).calculate_trip(1200, 24)
+        self.assertEqual(logs[0]['driving_hours'], 12)
+        self.assertEqual(len(logs), 2)
+        
+        logs = HOSCalculator({'current_cycle_used': 0}, start_date=date(2024, 3, 4)).calculate_trip(1200, 24)
+        self.assertEqual(logs[0]['driving_hours'], 11)
+    
+    def test_trip_serializer_bounds_cycle_by_rule_set(self):
+        """Stored trips accept the cycle hours their own rule set allows"""
+        data = {
+            'current_location': 'Fresno, CA',
+            'pickup_location': 'Sacramento, CA',
+            'dropoff_location': 'Los Angeles, CA',
+            'current_cycle_used': 75,
+            'rule_set': 'california_intrastate',
+        }
+        self.assertTrue(TripSerializer(data=data).is_valid())
+        serializer = TripSerializer(data=dict(data, rule_set='property'))
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('current_cycle_used', serializer.errors)
+
+
+class GazetteerTestCase(TestCase):
+    """Test offline location lookup and air-mile radius checks"""
+    
+    def test_resolve_variants(self):
+        """City/state strings resolve with state names and small typos"""
+        gazetteer = get_gazetteer()
+        self.assertEqual(gazetteer.resolve('Chicago, IL').city, 'Chicago')
+        self.assertEqual(gazetteer.resolve('chicago, illinois').state, 'IL')
+        self.assertEqual(gazetteer.resolve('Chicgo, IL').city, 'Chicago')
+        self.assertEqual(gazetteer.resolve('Saint Louis MO').city, 'St. Louis')
+        self.assertEqual(gazetteer.resolve('Springfield, MA').state, 'MA')
+        self.assertEqual(gazetteer.resolve('PA').city, 'Philadelphia')
+        self.assertIsNone(gazetteer.resolve('Atlantis, ZZ'))
+    
+    def test_distances_and_index(self):
+        """Great-circle miles and grid-index queries agree"""
+        gazetteer = get_gazetteer()
+        self.assertAlmostEqual(gazetteer.air_miles('Chicago, IL', 'Milwaukee, WI'), 81, delta=3)
+        self.assertAlmostEqual(great_circle_miles(0, 0, 0, 1), 69.1, delta=0.1)
+        self.assertEqual(gazetteer.nearest(41.85, -87.65).city, 'Chicago')
+        nearby = {place.city for place in gazetteer.within(41.8781, -87.6298, 100)}
+        self.assertIn('Milwaukee', nearby)
+        self.assertNotIn('Detroit', nearby)
+    
+    def test_short_haul_eligibility(self):
+        """The 150 air-mile exception uses the local gazetteer"""
+        exception = ShortHaulException()
+        local = {
+            'current_location': 'Chicago, IL',
+            'pickup_location': 'Joliet, IL',
+            'dropoff_location': 'Milwaukee, WI',
+            'requires_cdl': True
+        }
+        self.assertTrue(exception.check_eligibility(local)[0])
+        self.assertFalse(exception.check_eligibility(dict(local, dropoff_location='Denver, CO'))[0])
+        self.assertFalse(exception.check_eligibility(dict(local, dropoff_location='Nowhere'))[0])
+
+class RuleEngineTestCase(TestCase):
+    """Test the compiled exception rule engine"""
+    
+    def test_cost_order_and_short_circuit(self):
+        """Cheap conditions run first and a failure skips the rest"""
+        calls = []
+        def expensive(context):
+            calls.append(context.trip['id'])
+            return True
+        engine = RuleEngine([Rule('rule', [
+            Condition('expensive', expensive, cost=100),
+            Condition('flag', lambda context: context.trip['flag'], cost=1),
+        ], {'name': 'rule'})])
+        
+        self.assertEqual([c.name for c in engine.rules[0].conditions], ['flag', 'expensive'])
+        results = engine.evaluate_many([{'id': 1, 'flag': False}, {'id': 2, 'flag': True}])
+        self.assertEqual(results, [[], [{'name': 'rule'}]])
+        self.assertEqual(calls, [2])
+        
+        timings = engine.timings()['rule']['conditions']
+        self.assertEqual((timings['flag']['calls'], timings['flag']['failed']), (2, 1))
+        self.assertEqual(timings['expensive']['calls'], 1)
+    
+    def test_exception_checker(self):
+        """Batch evaluation matches the per-trip results and class checks"""
+        checker = ExceptionChecker()
+        trips = [
+            {'current_location': 'Chicago, IL', 'pickup_location': 'Joliet, IL',
+             'dropoff_location': 'Milwaukee, WI', 'requires_cdl': True},
+            {'current_location': 'Chicago, IL', 'pickup_location': 'Joliet, IL',
+             'dropoff_location': 'Denver, CO', 'requires_cdl': False, 'adverse_conditions': True},
+        ]
+        batch = checker.check_many(trips)
+        self.assertEqual(batch, [checker.check_all_exceptions(trip) for trip in trips])
+        self.assertEqual(
+            [e['name'] for e in batch[0]],
+            ['150 Air-Mile Radius (CDL)', '16-Hour Short-Haul']
+        )
+        self.assertEqual([e['name'] for e in batch[1]], ['Adverse Driving Conditions'])
+        self.assertIn('150 Air-Mile Radius (CDL)', checker.timings())
+
+class RoutingTestCase(TestCase):
+    """Test the CSR road graph and per-leg routing"""
+    
+    def setUp(self):
+        # Chicago, Joliet, Milwaukee, Madison; a slow direct Chicago-Madison road
+        nodes = [(41.8781, -87.6298), (41.5250, -88.0817), (43.0389, -87.9065), (43.0731, -89.4012)]
+        edges = [
+            (0, 1, 45, 50, False),
+            (0, 2, 92, 90, False),
+            (2, 3, 80, 75, False),
+            (0, 3, 150, 240, False),
+            (1, 3, 140, 200, True),
+        ]
+        self.graph = RoadGraph.from_edges(nodes, edges)
+    
+    def test_fastest_path(self):
+        """Bidirectional A* picks the fastest route and respects one-way edges"""
+        self.assertEqual(self.graph.shortest_path(0, 3), (165.0, 172.0))
+        self.assertEqual(self.graph.shortest_path(1, 3), (200.0, 140.0))
+        self.assertEqual(self.graph.shortest_path(3, 1), (215.0, 217.0))
+        self.assertEqual(self.graph.shortest_path(2, 2), (0.0, 0.0))
+    
+    def test_save_and_load(self):
+        """The binary graph file round-trips"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'graph.bin')
+            self.graph.save(path)
+            loaded = RoadGraph.load(path)
+        self.assertEqual(loaded.edge_count, self.graph.edge_count)
+        self.assertEqual(loaded.shortest_path(0, 3), self.graph.shortest_path(0, 3))
+    
+    def test_router_legs(self):
+        """Legs come from the graph, or great-circle miles without one"""
+        trip = {
+            'current_location': 'Joliet, IL',
+            'pickup_location': 'Chicago, IL',
+            'dropoff_location': 'Madison, WI'
+        }
+        legs = Router(self.graph).route_trip(trip)
+        self.assertEqual([leg['source'] for leg in legs], ['road_graph', 'road_graph'])
+        self.assertAlmostEqual(legs[1]['distance_miles'], 172.0, delta=0.5)
+        self.assertAlmostEqual(legs[1]['driving_hours'], 2.75, delta=0.01)
+        
+        fallback = Router(None, detour_factor=1.2).route_trip(trip)
+        self.assertEqual(fallback[1]['source'], 'great_circle')
+        self.assertGreater(fallback[1]['distance_miles'], 140)
+    
+    def test_lane_matrix(self):
+        """Precomputed lanes are memory-mapped and consulted before routing"""
+        gazetteer = get_gazetteer()
+        places = [gazetteer.resolve(name) for name in ('Joliet, IL', 'Chicago, IL', 'Madison, WI')]
+        router = Router(self.graph)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'lanes.bin')
+            write_lane_matrix(path, places, (router.measure_from(place, places) for place in places))
+            lanes = LaneMatrix(path)
+            miles, hours = lanes.lookup(places[1], places[2])
+            self.assertAlmostEqual(miles, 172.0, places=3)
+            self.assertAlmostEqual(hours, 2.75, places=3)
+            self.assertIsNone(lanes.lookup(places[0], gazetteer.resolve('Denver, CO')))
+            
+            leg = Router(self.graph, lanes=lanes).route('Chicago, IL', 'Madison, WI')
+            self.assertEqual(leg['source'], 'lane_matrix')
+            self.assertEqual(leg['distance_miles'], router.route('Chicago, IL', 'Madison, WI')['distance_miles'])
+            lanes.close()
+    
+    def test_rebuilt_lane_matrix_is_picked_up(self):
+        """A serving process switches to a rebuilt matrix file without reset_router"""
+        gazetteer = get_gazetteer()
+        places = [gazetteer.resolve(name) for name in ('Chicago, IL', 'Madison, WI')]
+        router = Router(self.graph)
+        self.addCleanup(reset_router)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'lanes.bin')
+            with self.settings(LANE_MATRIX={'FILE': path, 'LOCATIONS': []}):
+                reset_router()
+                self.assertIsNone(get_router().lanes)
+                
+                write_lane_matrix(path, places, (router.measure_from(place, places) for place in places))
+                first = get_router().lanes
+                self.assertEqual(len(first), 2)
+                self.assertIs(get_router().lanes, first)
+                
+                places.append(gazetteer.resolve('Joliet, IL'))
+                write_lane_matrix(path, places, (router.measure_from(place, places) for place in places))
+                self.assertEqual(len(get_router().lanes), 3)
+                
+                os.remove(path)
+                self.assertIsNone(get_router().lanes)
+    
+    def test_estimate_route(self):
+        """Routes total their legs; unknown places get the fixed estimate"""
+        route = estimate_route({
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA'
+        })
+        self.assertEqual(len(route['legs']), 2)
+        self.assertAlmostEqual(route['distance_miles'], sum(leg['distance_miles'] for leg in route['legs']), places=1)
+        estimate = estimate_route({
+            'current_location': 'Nowhere',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA'
+        })
+        self.assertEqual(estimate['source'], 'estimate')
+        self.assertEqual(estimate['distance_miles'], 1200)
+        self.assertNotIn('legs', estimate)
+
 class TripAPITestCase(APITestCase):
     """Test API endpoints"""
     
@@ -56,6 +677,180 @@ class TripAPITestCase(APITestCase):
         self.assertIn('eld_logs', response.data)
         self.assertIn('compliance_summary', response.data)
     
+    def test_rule_set(self):
+        """Trips are planned and stored under the requested rule set"""
+        data = {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'El Paso, TX',
+            'current_cycle_used': 0,
+            'rule_set': 'texas_intrastate',
+        }
+        response = self.client.post(reverse('trip-calculator'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['eld_logs'][0]['driving_hours'], 12)
+        self.assertEqual(Trip.objects.get(trip_id=response.data['trip_id']).rule_set, 'texas_intrastate')
+        
+        response = self.client.post(reverse('trip-calculator'), {**data, 'rule_set': 'mars'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_trip_is_persisted(self):
+        """Calculated trips are stored and readable by trip_id"""
+        audit_events = []
+        handler = lambda sender, trip, count, **kwargs: audit_events.append(count)
+        eld_logs_created.connect(handler)
+        self.addCleanup(eld_logs_created.disconnect, handler)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('trip-calculator'), {
+                'current_location': 'Dallas, TX',
+                'pickup_location': 'Houston, TX',
+                'dropoff_location': 'Atlanta, GA',
+                'current_cycle_used': 10,
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        trip_id = response.data['trip_id']
+        days = len(response.data['eld_logs'])
+        self.assertEqual(EldLog.objects.filter(trip__trip_id=trip_id).count(), days)
+        self.assertEqual(audit_events, [days])
+        
+        detail = self.client.get(reverse('trip-detail', args=[trip_id]))
+        self.assertEqual(detail.status_code, status.HTTP_200_OK)
+        self.assertEqual(detail.data['compliance_summary'], response.data['compliance_summary'])
+        stored = detail.data['eld_logs'][0]
+        computed = response.data['eld_logs'][0]
+        self.assertEqual(stored['activities'], computed['activities'])
+        self.assertAlmostEqual(stored['driving_hours'], computed['driving_hours'], places=2)
+    
+    def test_planning_inputs_are_stored_exactly(self):
+        """Fractional cycle hours and the per-day cycle history are kept as given"""
+        data = {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 37.75,
+            'cycle_history': [10, 12.5, 15.25],
+        }
+        for accept in ('application/json', 'application/x-ndjson'):
+            response = self.client.post(reverse('trip-calculator'), data, format='json', HTTP_ACCEPT=accept)
+            if response.streaming:
+                trip_id = json.loads(b''.join(response.streaming_content).splitlines()[0])['trip_id']
+            else:
+                trip_id = response.data['trip_id']
+            trip = Trip.objects.get(trip_id=trip_id)
+            self.assertEqual(trip.current_cycle_used, 37.75)
+            self.assertEqual(trip.cycle_history, [10, 12.5, 15.25])
+    
+    def test_ndjson_stream(self):
+        """NDJSON responses stream a header, each day and the summary"""
+        data = {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 10,
+        }
+        response = self.client.post(
+            reverse('trip-calculator'), data, format='json', HTTP_ACCEPT='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(records[0]['type'], 'trip')
+        self.assertEqual(records[-1]['type'], 'summary')
+        days = [record for record in records if record['type'] == 'day']
+        self.assertEqual([day['day_number'] for day in days], list(range(1, len(days) + 1)))
+        
+        plain = self.client.post(reverse('trip-calculator'), data, format='json')
+        self.assertEqual(records[-1]['compliance_summary'], plain.data['compliance_summary'])
+        trip = Trip.objects.get(trip_id=records[0]['trip_id'])
+        self.assertEqual(trip.eld_logs.count(), len(days))
+        self.assertEqual(trip.compliance_summary, plain.data['compliance_summary'])
+    
+    def test_streamed_trip_hidden_until_finished(self):
+        """A trip still being streamed is invisible to readers; unfinished ones are purged"""
+        data = {
+            'current_location': 'Seattle, WA',
+            'pickup_location': 'Chicago, IL',
+            'dropoff_location': 'Miami, FL',
+            'current_cycle_used': 10,
+        }
+        response = self.client.post(
+            reverse('trip-calculator'), data, format='json', HTTP_ACCEPT='application/x-ndjson'
+        )
+        stream = iter(response.streaming_content)
+        trip_id = json.loads(next(stream))['trip_id']
+        next(stream)  # first day: the Trip row now exists
+        
+        self.assertFalse(Trip.objects.get(trip_id=trip_id).is_complete)
+        detail_url = reverse('trip-detail', args=[trip_id])
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_404_NOT_FOUND)
+        history = self.client.get(reverse('trip-history'), {'summary': 'true'}).data
+        self.assertNotIn(trip_id, [trip['trip_id'] for trip in history['results']])
+        
+        # A stream whose process died leaves an incomplete trip for the purge
+        Trip.objects.filter(trip_id=trip_id).update(updated_at=timezone.now() - timedelta(hours=2))
+        call_command('purge_incomplete_trips', stdout=io.StringIO())
+        self.assertFalse(Trip.objects.filter(trip_id=trip_id).exists())
+        response.close()
+        
+        response = self.client.post(
+            reverse('trip-calculator'), data, format='json', HTTP_ACCEPT='application/x-ndjson'
+        )
+        trip_id = json.loads(b''.join(response.streaming_content).splitlines()[0])['trip_id']
+        self.assertTrue(Trip.objects.get(trip_id=trip_id).is_complete)
+        self.assertEqual(self.client.get(reverse('trip-detail', args=[trip_id])).status_code, status.HTTP_200_OK)
+    
+    def test_stream_database_errors(self):
+        """A failed first write is a plain 500; a later one ends the stream with an error record"""
+        data = {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 10,
+        }
+        url = reverse('trip-calculator')
+        with mock.patch('trips.views.TripResultWriter', side_effect=DatabaseError('database is locked')):
+            response = self.client.post(url, data, format='json', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(response.streaming)
+        self.assertIn('database is locked', response.data['error'])
+        
+        with mock.patch('trips.services.trip_store.EldLog.objects.bulk_create',
+                        side_effect=DatabaseError('disk full')):
+            response = self.client.post(url, data, format='json', HTTP_ACCEPT='application/x-ndjson')
+            records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(records[-1], {'type': 'error', 'error': 'disk full'})
+        self.assertFalse(Trip.objects.filter(trip_id=records[0]['trip_id']).exists())
+    
+    def test_unknown_location(self):
+        """Locations outside the gazetteer are planned with the marked estimate; blank ones are rejected"""
+        data = {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Atlantis',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 10,
+        }
+        response = self.client.post(reverse('trip-calculator'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['route']['source'], 'estimate')
+        
+        batch = self.client.post(reverse('trip-batch'), [data], format='json').data
+        self.assertEqual(batch['results'][0]['status'], 'ok')
+        
+        blank = dict(data, pickup_location=' ')
+        for accept in ('application/json', 'application/x-ndjson'):
+            response = self.client.post(reverse('trip-calculator'), blank, format='json', HTTP_ACCEPT=accept)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('pickup_location', response.data['error'])
+        self.assertEqual(Trip.objects.count(), 2)
+    
+    def test_unknown_trip(self):
+        """Unknown trip IDs return 404"""
+        response = self.client.get(reverse('trip-detail', args=['TRIP-MISSING']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
     def test_invalid_weight(self):
         """Test validation for CMV weight"""
         url = reverse('trip-calculator')
@@ -85,6 +880,64 @@ class TripAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class TripHistoryAPITestCase(APITestCase):
+    """Test keyset-paginated trip history"""
+    
+    def setUp(self):
+        for index in range(5):
+            trip = Trip.objects.create(
+                current_location='Dallas, TX',
+                pickup_location='Houston, TX' if index % 2 else 'Memphis, TN',
+                dropoff_location='Atlanta, GA',
+                is_compliant=index != 3,
+            )
+            trip.eld_logs.create(
+                day_number=1, date='2024-01-01', driving_hours=10, on_duty_hours=12,
+                off_duty_hours=12, cycle_7day_total=12, cycle_8day_total=12
+            )
+    
+    def test_pages_cover_all_trips_once(self):
+        """Following next_cursor visits every trip exactly once, newest first"""
+        url = reverse('trip-history')
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            with self.assertNumQueries(2):  # trips + prefetched logs
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(row['trip_id'] for row in response.data['results'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+        
+        expected = list(Trip.objects.order_by('-created_at', '-id').values_list('trip_id', flat=True))
+        self.assertEqual(seen, expected)
+    
+    def test_filters_and_summary_mode(self):
+        """Location and compliance filters apply; summary mode skips the logs"""
+        response = self.client.get(reverse('trip-history'), {
+            'location': 'houston', 'compliant': 'true', 'summary': 'true'
+        })
+        self.assertEqual(response.data['count'], 1)
+        self.assertNotIn('eld_logs', response.data['results'][0])
+    
+    def test_location_is_a_prefix_match(self):
+        """The location filter matches the start of a location, ignoring case"""
+        url = reverse('trip-history')
+        counts = {
+            location: self.client.get(url, {'location': location, 'summary': 'true'}).data['count']
+            for location in ('DALLAS', ' memphis, tn ', 'ouston', 'Atlanta, GAX')
+        }
+        self.assertEqual(counts, {'DALLAS': 5, ' memphis, tn ': 3, 'ouston': 0, 'Atlanta, GAX': 0})
+    
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('trip-history'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class ModelTestCase(TestCase):
     """Test database models"""
     
@@ -125,4 +978,742 @@ class ModelTestCase(TestCase):
         )
         
         self.assertEqual(eld_log.trip, trip)
-        self.assertEqual(eld_log.day_number, 1)
\ No newline at end of file
+        self.assertEqual(eld_log.day_number, 1)
+
+class LogSheetAPITestCase(APITestCase):
+    """Test PDF/SVG daily log sheet rendering"""
+    
+    def setUp(self):
+        response = self.client.post(reverse('trip-calculator'), {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 10,
+        }, format='json')
+        self.trip_id = response.data['trip_id']
+        self.days = len(response.data['eld_logs'])
+        render_cache.clear()
+    
+    def test_pdf_pages_and_xref(self):
+        """The streamed PDF has one page per day and a valid xref table"""
+        response = self.client.get(reverse('trip-pdf', args=[self.trip_id]))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        pdf = b''.join(response.streaming_content)
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertTrue(pdf.endswith(b'%%EOF\n'))
+        self.assertIn(f'/Count {self.days}'.encode(), pdf)
+        
+        startxref = int(pdf.rsplit(b'startxref\n', 1)[1].split()[0])
+        entries = pdf[startxref:].split(b'\n')[3:]
+        for number, entry in enumerate(entries[:4 + 2 * self.days], start=1):
+            offset = int(entry[:10])
+            self.assertTrue(pdf[offset:].startswith(f'{number} 0 obj'.encode()))
+    
+    def test_svg_and_render_cache(self):
+        """SVG pages are well-formed and reprints come from the cache"""
+        url = reverse('trip-svg', args=[self.trip_id])
+        first = b''.join(self.client.get(url, {'day': 1}).streaming_content)
+        root = ET.fromstring(first)
+        self.assertEqual(root.tag, '{http://www.w3.org/2000/svg}svg')
+        self.assertIn(b'REMARKS', first)
+        self.assertEqual(render_cache.stats()['misses'], 1)
+        
+        second = b''.join(self.client.get(url, {'day': 1}).streaming_content)
+        self.assertEqual(first, second)
+        self.assertEqual(render_cache.stats()['local_hits'], 1)
+    
+    def test_missing_day(self):
+        """Unknown trips and days return 404"""
+        self.assertEqual(self.client.get(reverse('trip-svg', args=[self.trip_id]), {'day': 99}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('trip-pdf', args=['TRIP-MISSING'])).status_code, 404)
+
+class ExportAPITestCase(APITestCase):
+    """Test CSV, JSON Lines and ELD output-file exports"""
+    
+    def setUp(self):
+        response = self.client.post(reverse('trip-calculator'), {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 10,
+        }, format='json')
+        self.trip_id = response.data['trip_id']
+        self.days = response.data['eld_logs']
+    
+    def export(self, **params):
+        response = self.client.get(reverse('trip-export', args=[self.trip_id]), params)
+        return response, b''.join(response.streaming_content).decode()
+    
+    def test_csv_and_jsonl(self):
+        """CSV is the default; both formats have one record per day"""
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), len(self.days))
+        self.assertEqual(rows[0]['trip_id'], self.trip_id)
+        
+        response, body = self.export(format='jsonl')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([r['day_number'] for r in records], [d['day_number'] for d in self.days])
+        self.assertEqual(records[0]['activities'], self.days[0]['activities'])
+    
+    def test_fmcsa_output_file(self):
+        """Every line carries a valid check value and the file value matches"""
+        response, body = self.export(format='fmcsa')
+        lines = body.split('\r\n')[:-1]
+        self.assertEqual(lines[0], 'ELD File Header Segment:')
+        self.assertEqual(lines[-2], 'End of File:')
+        
+        values = []
+        for line in lines:
+            if line.endswith(':') or line == lines[-1]:
+                continue
+            text, _, check = line.rpartition(',')
+            self.assertEqual(int(check, 16), line_check_value(text))
+            values.append(int(check, 16))
+        self.assertEqual(int(lines[-1], 16), file_check_value(values))
+        
+        events = lines[lines.index('ELD Event List:') + 1:lines.index('ELD Event Annotations or Comments:')]
+        self.assertTrue(events)
+        self.assertTrue(all(event.split(',')[3] == '1' for event in events))
+        self.assertEqual(lines[4].split(',')[2], '8')
+    
+    def test_fmcsa_multiday_basis_follows_rule_set(self):
+        """The header declares the 7-day basis for rule sets with a 7-day cycle"""
+        self.trip_id = self.client.post(reverse('trip-calculator'), {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'El Paso, TX',
+            'current_cycle_used': 10,
+            'rule_set': 'texas_intrastate',
+        }, format='json').data['trip_id']
+        _, body = self.export(format='fmcsa')
+        self.assertEqual(body.split('\r\n')[4].split(',')[2], '7')
+    
+    def test_date_range_export(self):
+        """Range exports stream every log day in the window"""
+        first, last = self.days[0]['date'], self.days[-1]['date']
+        response = self.client.get(reverse('log-export'), {'format': 'jsonl', 'start': first, 'end': last})
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), len(self.days))
+        
+        bad = self.client.get(reverse('log-export'), {'start': last, 'end': first})
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+
+class TripBatchAPITestCase(APITestCase):
+    """Test the batch trip planning endpoint"""
+    
+    def trip(self, **overrides):
+        data = {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 20,
+        }
+        data.update(overrides)
+        return data
+    
+    def test_batch_preserves_order_and_reports_errors(self):
+        """Invalid trips get per-trip errors without failing the batch"""
+        url = reverse('trip-batch')
+        trips = [
+            self.trip(),
+            self.trip(current_cycle_used=90),
+            self.trip(current_cycle_used=65),
+        ]
+        
+        response = self.client.post(url, trips, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['failed'], 1)
+        
+        results = response.data['results']
+        self.assertEqual([r['index'] for r in results], [0, 1, 2])
+        self.assertEqual([r['status'] for r in results], ['ok', 'error', 'ok'])
+        self.assertIn('current_cycle_used', results[1]['errors'])
+        self.assertTrue(results[0]['trip']['eld_logs'])
+        self.assertIn('compliance_summary', results[2]['trip'])
+    
+    def test_batch_ndjson_stream(self):
+        """Batch results stream one line per trip in input order"""
+        response = self.client.post(
+            reverse('trip-batch'), [self.trip(), self.trip(current_cycle_used=90)],
+            format='json', HTTP_ACCEPT='application/x-ndjson'
+        )
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([r['type'] for r in records], ['result', 'result', 'summary'])
+        self.assertEqual([r['status'] for r in records[:2]], ['ok', 'error'])
+        self.assertEqual(records[2]['succeeded'], 1)
+        self.assertTrue(Trip.objects.filter(trip_id=records[0]['trip']['trip_id']).exists())
+    
+    def test_failed_save_is_a_per_trip_error(self):
+        """A trip that cannot be stored fails alone; the rest of the batch is kept"""
+        calls = []
+        
+        def flaky_save(trip_data, result):
+            calls.append(result['trip_id'])
+            if len(calls) == 1:
+                raise DatabaseError('disk full')
+            return save_trip_result(trip_data, result)
+        
+        with mock.patch('trips.views.save_trip_result', side_effect=flaky_save):
+            response = self.client.post(reverse('trip-batch'), [self.trip(), self.trip()], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['results']], ['error', 'ok'])
+        self.assertIn('disk full', response.data['results'][0]['errors']['non_field_errors'][0])
+        self.assertFalse(Trip.objects.filter(trip_id=calls[0]).exists())
+        self.assertTrue(Trip.objects.filter(trip_id=calls[1]).exists())
+    
+    def test_batch_validates_like_single_trip(self):
+        """Inputs the single-trip endpoint rejects are per-trip errors in a batch"""
+        bad = self.trip(cmv_weight=5000)
+        single = self.client.post(reverse('trip-calculator'), bad, format='json')
+        self.assertEqual(single.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        results = self.client.post(reverse('trip-batch'), [bad, self.trip(state='Texas')], format='json').data['results']
+        self.assertEqual([r['status'] for r in results], ['error', 'error'])
+        self.assertIn('cmv_weight', results[0]['errors'])
+        self.assertIn('state', results[1]['errors'])
+    
+    def test_crashed_worker_fails_only_unfinished_trips(self):
+        """A broken pool keeps the finished results and reports the rest per trip"""
+        def crash(fn, trips, chunksize):
+            yield fn(trips[0])
+            raise BrokenProcessPool('worker died')
+        
+        executor = mock.Mock(map=crash)
+        batch = dict(settings.TRIP_BATCH, MAX_WORKERS=2, MIN_PARALLEL_TRIPS=2)
+        with self.settings(TRIP_BATCH=batch), \
+                mock.patch('trips.services.batch_planner.get_executor', return_value=executor):
+            response = self.client.post(reverse('trip-batch'), [self.trip()] * 3, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['results']], ['ok', 'error', 'error'])
+        self.assertEqual(Trip.objects.count(), 1)
+    
+    def test_empty_batch(self):
+        """An empty batch is rejected"""
+        response = self.client.post(reverse('trip-batch'), [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class AsyncTripAPITestCase(TestCase):
+    """Test the async calculation and history endpoints"""
+    
+    async def test_calculate_and_list(self):
+        """Async endpoints calculate, store and page trips like the sync ones"""
+        response = await self.async_client.post(reverse('async-trip-calculator'), {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 10,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(await EldLog.objects.filter(trip__trip_id=body['trip_id']).acount(),
+                         len(body['eld_logs']))
+        
+        response = await self.async_client.get(reverse('async-trip-history'), {'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['trip_id'], body['trip_id'])
+        self.assertEqual(len(response.json()['results'][0]['eld_logs']), len(body['eld_logs']))
+        
+        response = await self.async_client.get(reverse('async-trip-history'), {'cursor': 'bad'})
+        self.assertEqual(response.status_code, 400)
+        
+        response = await self.async_client.post(reverse('async-trip-calculator'), {
+            'current_location': 'Dallas, TX',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        
+        metrics = (await self.async_client.get(reverse('async-metrics'))).json()
+        self.assertGreaterEqual(metrics['completed'], 1)
+    
+    async def test_pool_is_bounded(self):
+        """Work beyond the workers and wait queue is rejected; metrics track depth"""
+        pool = CalculationPool(max_workers=1, max_queued=1)
+        self.addCleanup(pool.shutdown)
+        release = threading.Event()
+        
+        running = asyncio.ensure_future(pool.run(release.wait, 5))
+        while pool.metrics()['running'] == 0:
+            await asyncio.sleep(0.001)
+        queued = asyncio.ensure_future(pool.run(sum, [1, 2]))
+        await asyncio.sleep(0)
+        with self.assertRaises(PoolBusy):
+            await pool.run(sum, [3])
+        
+        metrics = pool.metrics()
+        self.assertEqual((metrics['running'], metrics['queued'], metrics['rejected']), (1, 1, 1))
+        release.set()
+        self.assertEqual(await queued, 3)
+        self.assertTrue(await running)
+        self.assertEqual(pool.metrics()['completed'], 2)
+
+
+
+class PlanningJobTestCase(APITestCase):
+    """Test the background planning job queue"""
+    
+    trip = {
+        'current_location': 'Dallas, TX',
+        'pickup_location': 'Houston, TX',
+        'dropoff_location': 'Atlanta, GA',
+        'current_cycle_used': 10,
+    }
+    
+    def test_submit_run_and_fetch(self):
+        """Jobs are accepted at once, run by the worker, and return the synchronous response"""
+        response = self.client.post(reverse('planning-job-submit'), {'kind': 'trip', 'input': self.trip}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job_id']
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertTrue(response['Location'].endswith(reverse('planning-job', args=[job_id])))
+        
+        result_url = reverse('planning-job-result', args=[job_id])
+        self.assertEqual(self.client.get(result_url).status_code, status.HTTP_409_CONFLICT)
+        
+        batch = self.client.post(reverse('planning-job-submit'), {
+            'kind': 'batch', 'input': [self.trip, {'current_location': 'Nowhere'}]
+        }, format='json').data['job_id']
+        
+        call_command('run_planning_worker', '--once', stdout=io.StringIO())
+        
+        status_response = self.client.get(reverse('planning-job', args=[job_id]))
+        self.assertEqual(status_response.data['status'], 'succeeded')
+        self.assertEqual(status_response.data['attempts'], 1)
+        result = self.client.get(result_url).data
+        self.assertEqual(Trip.objects.get(trip_id=result['trip_id']).eld_logs.count(), len(result['eld_logs']))
+        
+        batch_result = self.client.get(reverse('planning-job-result', args=[batch])).data
+        self.assertEqual((batch_result['succeeded'], batch_result['failed']), (1, 1))
+    
+    def test_invalid_input_is_rejected_at_submit(self):
+        """Bad input gets the synchronous endpoint's 400, not a failed job"""
+        response = self.client.post(reverse('planning-job-submit'), {
+            'kind': 'trip', 'input': {**self.trip, 'current_cycle_used': 90}
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('planning-job-submit'), {'kind': 'route', 'input': {}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PlanningJob.objects.exists())
+    
+    def test_claims_and_stale_recovery(self):
+        """Each job is claimed once; jobs of dead workers are requeued, then failed"""
+        first = PlanningJob.objects.create(kind='trip', input=self.trip)
+        second = PlanningJob.objects.create(kind='trip', input=self.trip)
+        
+        self.assertEqual(claim_next_job('a').pk, first.pk)
+        self.assertEqual(claim_next_job('b').pk, second.pk)
+        self.assertIsNone(claim_next_job('c'))
+        
+        self.assertEqual(requeue_stale_jobs(stale_seconds=3600), (0, 0))
+        self.assertEqual(requeue_stale_jobs(stale_seconds=-1, max_attempts=2), (2, 0))
+        job = claim_next_job('c')
+        self.assertEqual((job.pk, job.attempts), (first.pk, 2))
+        self.assertEqual(requeue_stale_jobs(stale_seconds=-1, max_attempts=2), (0, 1))
+        
+        # The stale owner's late result is discarded, and its trip is not saved
+        with self.assertLogs('trips.jobs', 'WARNING'):
+            self.assertFalse(run_job(job))
+        self.assertEqual(PlanningJob.objects.get(pk=first.pk).status, PlanningJob.FAILED)
+        self.assertFalse(Trip.objects.exists())
+    
+    def test_rerun_job_saves_its_trips_once(self):
+        """A job reclaimed mid-run leaves no trips behind; the run that finishes saves them"""
+        PlanningJob.objects.create(kind='batch', input=[self.trip, self.trip])
+        stale_run = claim_next_job('a')
+        PlanningJob.objects.filter(pk=stale_run.pk).update(heartbeat_at=None, started_at=None)
+        self.assertEqual(requeue_stale_jobs(stale_seconds=60), (1, 0))
+        
+        rerun = claim_next_job('b')
+        with self.assertLogs('trips.jobs', 'WARNING'):
+            self.assertFalse(run_job(stale_run))
+        self.assertFalse(Trip.objects.exists())
+        
+        self.assertTrue(run_job(rerun))
+        self.assertEqual(rerun.result['succeeded'], 2)
+        self.assertEqual(Trip.objects.count(), 2)
+    
+    def test_heartbeat_keeps_long_jobs_claimed(self):
+        """A job started long ago is not stale while its worker keeps beating"""
+        PlanningJob.objects.create(kind='batch', input=[self.trip])
+        job = claim_next_job('a')
+        PlanningJob.objects.filter(pk=job.pk).update(
+            started_at=job.started_at - timedelta(hours=2), heartbeat_at=job.started_at - timedelta(hours=1)
+        )
+        Heartbeat(job, interval=0).beat()
+        self.assertEqual(requeue_stale_jobs(stale_seconds=600), (0, 0))
+        self.assertTrue(run_job(job))
+        self.assertEqual(PlanningJob.objects.get(pk=job.pk).status, PlanningJob.SUCCEEDED)
+
+
+class BenchmarkTestCase(TestCase):
+    """Test the benchmark suite and its comparison"""
+    
+    def test_quick_run_covers_every_benchmark(self):
+        """Each entry point is timed and nothing is left in the database"""
+        results = run_benchmarks(repeat=1, quick=True, only=['days=1]', 'batch=1]'])
+        self.assertEqual({case['benchmark'] for case in results['results'].values()}, {
+            'hos_calculator.calculate_trip', 'eld_calculator.calculate_trip', 'trip_view.post',
+            'trip_input_serializer.validate', 'eld_log_serializer.data',
+        })
+        self.assertTrue(all(case['median'] > 0 for case in results['results'].values()))
+        self.assertFalse(Trip.objects.exists())
+    
+    def test_compare_flags_regressions(self):
+        """Slower medians beyond the threshold fail the comparison command"""
+        baseline = {'results': {'a': {'median': 1.0}, 'b': {'median': 1.0}, 'c': {'median': 1.0}}}
+        current = {'results': {'a': {'median': 1.05}, 'b': {'median': 1.5}, 'd': {'median': 1.0}}}
+        verdicts = {row['case']: row['verdict'] for row in compare_results(baseline, current, 0.1)}
+        self.assertEqual(verdicts, {'a': 'unchanged', 'b': 'regression', 'c': 'removed', 'd': 'added'})
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for name, results in (('baseline', baseline), ('current', current)):
+                paths.append(os.path.join(tmp, f'{name}.json'))
+                with open(paths[-1], 'w') as f:
+                    json.dump(results, f)
+            with self.assertRaises(CommandError):
+                call_command('compare_benchmarks', *paths, stdout=io.StringIO())
+            call_command('compare_benchmarks', *paths, '--threshold', '0.6', stdout=io.StringIO())
+
+
+class ServerTimingTestCase(APITestCase):
+    """Test per-request phase timing"""
+    
+    def setUp(self):
+        phase_stats.clear()
+    
+    def test_trip_phases_in_header_and_stats(self):
+        """Each TripCalculatorView phase is reported and aggregated"""
+        response = self.client.post(reverse('trip-calculator'), {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        phases = [entry.split(';')[0].strip() for entry in response['Server-Timing'].split(',')]
+        self.assertEqual(phases, ['validate', 'route', 'hos', 'compliance', 'save', 'render', 'total'])
+        
+        stats = self.client.get(reverse('phase-timing')).data['endpoints']['trip-calculator']
+        self.assertEqual(set(stats), set(phases))
+        self.assertEqual(stats['total']['count'], 1)
+        self.assertLessEqual(stats['hos']['p50_ms'], stats['total']['p99_ms'])
+    
+    async def test_middleware_stays_async(self):
+        """Wrapping an async view keeps the chain async, so ASGI requests need no thread"""
+        async def view(request):
+            return HttpResponse(b'{"a": 1}' * 256, content_type='application/json')
+        
+        handler = ServerTimingMiddleware(CompressionMiddleware(view))
+        self.assertTrue(iscoroutinefunction(handler))
+        response = await handler(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('total', response['Server-Timing'])
+
+
+class MetricsTestCase(APITestCase):
+    """Test the metrics registry and the /metrics endpoint"""
+    
+    def test_workers_are_merged(self):
+        """Thread shards and per-worker snapshot files add up in one exposition"""
+        with tempfile.TemporaryDirectory() as tmp:
+            workers = [MetricsRegistry(tmp), MetricsRegistry(tmp)]
+            counters = [w.counter('jobs_total', 'Jobs', labels=('status',)) for w in workers]
+            histograms = [w.histogram('latency_seconds', 'Latency', buckets=(1, 2)) for w in workers]
+            
+            threads = [threading.Thread(target=lambda: [counters[0].inc(status=201) for _ in range(500)])
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            counters[1].inc(status=500)
+            histograms[0].observe(0.5)
+            histograms[1].observe(1.5)
+            histograms[1].observe(5)
+            workers[1].flush()
+            
+            text = render_prometheus(workers[0].collect())
+        
+        self.assertIn('jobs_total{status="201"} 2000', text)
+        self.assertIn('jobs_total{status="500"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="2"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count 3', text)
+        with self.assertRaises(ValueError):
+            counters[0].inc(code=200)
+    
+    def test_exited_workers_are_dropped(self):
+        """Snapshots of processes that no longer run are deleted instead of summed"""
+        worker = subprocess.Popen([sys.executable, '-c', 'pass'])
+        worker.wait()
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = MetricsRegistry(tmp)
+            registry.counter('jobs_total', 'Jobs').inc()
+            stale = os.path.join(tmp, f'{worker.pid}-deadbeef.json')
+            with open(stale, 'w', encoding='utf-8') as f:
+                json.dump(registry.snapshot(), f)
+            
+            text = render_prometheus(registry.collect())
+            self.assertFalse(os.path.exists(stale))
+        self.assertIn('jobs_total 1', text)
+    
+    def test_trip_request_is_instrumented(self):
+        """Trip requests, HOS calculations and exception checks are recorded"""
+        self.client.post(reverse('trip-calculator'), {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 10,
+        }, format='json')
+        HOSCalculator({'current_cycle_used': 0}).calculate_trip(distance_miles=500, driving_hours=9)
+        ExceptionChecker().check_all_exceptions({'requires_cdl': True})
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        for line in ('eld_trip_requests_total{status="201"}', 'eld_trip_request_seconds_count',
+                     'eld_trip_days_bucket', 'eld_hos_calculation_seconds_count',
+                     'eld_exception_check_seconds_count', 'eld_calc_cache_lookups_total'):
+            self.assertIn(line, text)
+
+
+class CompactFormatTestCase(APITestCase):
+    """Test the compact columnar format and field selection"""
+    
+    trip = {
+        'current_location': 'Dallas, TX',
+        'pickup_location': 'Houston, TX',
+        'dropoff_location': 'Atlanta, GA',
+        'current_cycle_used': 10,
+    }
+    
+    def test_compact_trip_decodes_to_full_trip(self):
+        """Activities and remarks round-trip through the arrays and string table"""
+        full = self.client.post(reverse('trip-calculator'), self.trip, format='json').data
+        detail_url = reverse('trip-detail', args=[full['trip_id']])
+        response = self.client.get(detail_url, {'format': 'compact'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.eld.compact+json')
+        compact = json.loads(response.content)
+        
+        self.assertEqual(compact['format'], 'compact-v1')
+        strings, codes = compact['strings'], compact['status_codes']
+        for day, packed in zip(full['eld_logs'], compact['eld_logs']):
+            activities = packed['activities']
+            self.assertEqual(
+                [(a['status'], a['description']) for a in day['activities']],
+                [(codes[c], strings[t]) for c, t in zip(activities['status'], activities['text'])]
+            )
+            self.assertEqual(activities['start'][0], 0)
+            self.assertEqual([strings[t] for t in packed['remarks']['text']],
+                             [r['description'] for r in day['remarks']])
+        
+        catalog = self.client.get(reverse('legal-references')).data['legal_references']
+        ids = [ref['id'] for ref in catalog]
+        created = json.loads(self.client.post(
+            reverse('trip-calculator') + '?format=compact', self.trip, format='json'
+        ).content)
+        self.assertEqual(created['legal_references'], ids)
+    
+    def test_fields_selection_shrinks_payload(self):
+        """?fields= drops sections; combined with compact the payload is several times smaller"""
+        trip_id = self.client.post(reverse('trip-calculator'), self.trip, format='json').data['trip_id']
+        url = reverse('trip-detail', args=[trip_id])
+        full = self.client.get(url, {'format': 'json'}).content
+        
+        selected = json.loads(self.client.get(url, {'fields': 'trip_id,eld_logs.date,eld_logs.activities'}).content)
+        self.assertEqual(set(selected), {'trip_id', 'eld_logs'})
+        self.assertEqual(set(selected['eld_logs'][0]), {'date', 'activities'})
+        
+        small = self.client.get(url, {'format': 'compact', 'fields': 'trip_id,eld_logs.date,eld_logs.activities'}).content
+        self.assertLess(len(small) * 3, len(full))
+
+
+class ConditionalGetTestCase(APITestCase):
+    """Test ETags, 304 responses and response compression"""
+    
+    def setUp(self):
+        response = self.client.post(reverse('trip-calculator'), {
+            'current_location': 'Dallas, TX',
+            'pickup_location': 'Houston, TX',
+            'dropoff_location': 'Atlanta, GA',
+            'current_cycle_used': 10,
+        }, format='json')
+        self.result = response.data
+        self.trip_id = response.data['trip_id']
+    
+    def test_hash_stored_at_write_time(self):
+        """The stored hash matches the calculated result, streamed or not"""
+        self.assertEqual(Trip.objects.get(trip_id=self.trip_id).content_hash, result_hash(self.result))
+    
+    def test_if_none_match_skips_logs(self):
+        """A matching ETag is answered with 304 from the Trip row alone"""
+        url = reverse('trip-detail', args=[self.trip_id])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached['ETag'], etag)
+        
+        # Each representation has its own tag
+        compact = self.client.get(url, {'format': 'compact'})['ETag']
+        csv_export = self.client.get(reverse('trip-export', args=[self.trip_id]))['ETag']
+        self.assertEqual(len({etag, compact, csv_export}), 3)
+        self.assertEqual(self.client.get(url, {'format': 'compact'}, HTTP_IF_NONE_MATCH=compact).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        
+        # A changed trip no longer matches
+        Trip.objects.filter(trip_id=self.trip_id).update(content_hash='0' * 64)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+    
+    def test_legacy_trip_is_hashed_on_first_read(self):
+        """Trips stored before hashing get their hash computed once, from the served rows"""
+        written = Trip.objects.get(trip_id=self.trip_id).content_hash
+        Trip.objects.filter(trip_id=self.trip_id).update(content_hash='')
+        etag = self.client.get(reverse('trip-detail', args=[self.trip_id]))['ETag']
+        self.assertEqual(Trip.objects.get(trip_id=self.trip_id).content_hash, written)
+        self.assertEqual(self.client.get(reverse('trip-detail', args=[self.trip_id]))['ETag'], etag)
+    
+    def test_gzip_negotiation(self):
+        """Large JSON bodies are gzipped for clients that accept it"""
+        url = reverse('trip-detail', args=[self.trip_id])
+        plain = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=1.0, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), json.loads(plain.content))
+        self.assertFalse(self.client.get(url, HTTP_ACCEPT_ENCODING='identity').has_header('Content-Encoding'))
+
+
+class TripReplanTestCase(APITestCase):
+    """Test checkpointed, incremental replanning of stored trips"""
+    
+    trip = {
+        'current_location': 'Seattle, WA',
+        'pickup_location': 'Miami, FL',
+        'dropoff_location': 'Atlanta, GA',
+        'current_cycle_used': 10,
+    }
+    
+    def setUp(self):
+        response = self.client.post(reverse('trip-calculator'), self.trip, format='json')
+        self.result = response.data
+        self.trip_id = response.data['trip_id']
+        self.url = reverse('trip-detail', args=[self.trip_id])
+        self.days = response.data['eld_logs']
+    
+    def test_resumed_engine_matches_full_run(self):
+        """Resuming from any day's checkpoint reproduces the rest of the trip"""
+        route = {'distance_miles': 2500, 'driving_hours': 2500 / 55}
+        tasks = build_trip_tasks(self.trip, route)
+        checkpoints = []
+        days = list(iter_eld_logs(self.trip, route, date(2024, 3, 1), checkpoints=checkpoints))
+        self.assertEqual(len(checkpoints), len(days))
+        
+        for index, checkpoint in enumerate(checkpoints):
+            engine = HOSEngine.from_checkpoint(json.loads(json.dumps(checkpoint)), date(2024, 3, 1))
+            self.assertEqual(list(engine.iter_days(tasks)), days[index:])
+        
+        with self.assertRaises(ValueError):
+            HOSEngine.from_checkpoint(checkpoints[0], date(2024, 3, 1), get_rule_plan('passenger'))
+    
+    def test_checkpoints_stored_not_returned(self):
+        """Every stored day keeps its checkpoint; responses never include them"""
+        self.assertFalse(EldLog.objects.filter(trip__trip_id=self.trip_id, checkpoint=None).exists())
+        self.assertNotIn('checkpoints', self.result)
+        self.assertNotIn('checkpoints', self.client.get(self.url).data)
+    
+    def test_unknown_location_is_estimated(self):
+        """A new stop outside the gazetteer is replanned with the marked estimate"""
+        response = self.client.patch(self.url, {'dropoff_location': 'Atlantis'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        trip = Trip.objects.get(trip_id=self.trip_id)
+        self.assertEqual(trip.dropoff_location, 'Atlantis')
+        self.assertEqual(trip.route_info['source'], 'estimate')
+    
+    def test_trip_without_checkpoints_is_not_replanned(self):
+        """Trips stored before checkpoints were kept are refused rather than replanned from other inputs"""
+        EldLog.objects.filter(trip__trip_id=self.trip_id).update(checkpoint=None)
+        response = self.client.patch(self.url, {'dropoff_location': 'Chicago, IL'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn('error', response.data)
+        trip = Trip.objects.get(trip_id=self.trip_id)
+        self.assertEqual(trip.dropoff_location, 'Atlanta, GA')
+        self.assertEqual(trip.eld_logs.count(), len(self.days))
+    
+    def test_dropoff_change_reuses_earlier_days(self):
+        """Only the days from the first one affected by the new dropoff are recalculated"""
+        kept = list(EldLog.objects.filter(trip__trip_id=self.trip_id).values_list('day_number', 'id'))
+        
+        response = self.client.patch(self.url, {'dropoff_location': 'Chicago, IL'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        replan = response.data['replan']
+        self.assertGreater(replan['reused_days'], 0)
+        self.assertEqual(replan['first_recomputed_day'], replan['reused_days'] + 1)
+        
+        # Reused rows are untouched, the rest match a full plan for the new trip
+        reused = dict(kept[:replan['reused_days']])
+        stored = EldLog.objects.filter(trip__trip_id=self.trip_id, day_number__in=reused)
+        self.assertEqual({log.day_number: log.id for log in stored}, reused)
+        
+        new_trip = {**self.trip, 'dropoff_location': 'Chicago, IL'}
+        start = date.fromisoformat(self.days[0]['date'])
+        full = list(iter_eld_logs(new_trip, estimate_route(new_trip), start))
+        self.assertEqual(response.data['eld_logs'][replan['reused_days']:], full[replan['reused_days']:])
+        self.assertEqual(Trip.objects.get(trip_id=self.trip_id).dropoff_location, 'Chicago, IL')
+        self.assertEqual(EldLog.objects.filter(trip__trip_id=self.trip_id).count(), len(full))
+    
+    def test_reported_day(self):
+        """A reported day replaces the plan and the remaining work moves to later days"""
+        off_all_day = [{'status': 'off_duty', 'start': '00:00', 'end': '24:00', 'description': 'Weather delay'}]
+        response = self.client.patch(self.url, {
+            'actual_days': [{'day_number': 2, 'activities': off_all_day}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['replan']['first_recomputed_day'], 2)
+        self.assertEqual(response.data['replan']['reused_days'], 1)
+        
+        days = response.data['eld_logs']
+        self.assertTrue(days[1]['reported'])
+        self.assertEqual(days[1]['driving_hours'], 0)
+        self.assertGreater(len(days), len(self.days))
+        self.assertAlmostEqual(sum(day['driving_hours'] for day in days),
+                               sum(day['driving_hours'] for day in self.days), delta=0.05)
+        
+        # The report survives a replan from an earlier day
+        response = self.client.patch(self.url, {'pickup_location': 'Chicago, IL'}, format='json')
+        self.assertEqual(response.data['replan']['first_recomputed_day'], 1)
+        stored = EldLog.objects.get(trip__trip_id=self.trip_id, day_number=2)
+        self.assertTrue(stored.extra['reported'])
+        self.assertEqual(stored.activities[0]['description'], 'Weather delay')
+        
+        for body in ({'actual_days': [{'day_number': 2, 'activities': off_all_day[:1] * 2}]},
+                     {'actual_days': [{'day_number': 0, 'activities': off_all_day}]},
+                     {'rule_set': 'passenger'}):
+            self.assertEqual(self.client.patch(self.url, body, format='json').status_code,
+                             status.HTTP_400_BAD_REQUEST)
+    
+    def test_if_match_and_etag(self):
+        """Updates are guarded by If-Match and change the trip's ETag"""
+        etag = self.client.get(self.url)['ETag']
+        
+        response = self.client.patch(self.url, {'dropoff_location': 'Chicago, IL'}, format='json',
+                                     HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        
+        stale = self.client.patch(self.url, {'dropoff_location': 'Denver, CO'}, format='json',
+                                  HTTP_IF_MATCH=etag)
+        self.assertEqual(stale.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Trip.objects.get(trip_id=self.trip_id).dropoff_location, 'Chicago, IL')
@@ -0,0 +1,125 @@
+"""
+Per-request phase timing
+
+Code marks its phases with `span('name')`. While a request is being
+handled by ServerTimingMiddleware the spans are collected on a
+RequestTimer held in a context variable; the middleware then sends them
+to the client in a `Server-Timing` header and adds them to the
+in-process PhaseStats, which keeps a bounded sample of recent durations
+per (endpoint, phase) for p50/p99 reporting. Outside a timed request
+(management commands, pool threads) `span` costs one context lookup.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_current_timer = ContextVar('trips_request_timer', default=None)
+
+
+class RequestTimer:
+    """Spans recorded while handling one request, in completion order"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def add(self, name, seconds):
+        self.spans.append((name, seconds))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def header(self, total=None):
+        """Server-Timing header value, durations in milliseconds"""
+        entries = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.spans]
+        if total is not None:
+            entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def start_request_timer():
+    """Make a fresh timer current; returns (timer, token for `stop_request_timer`)"""
+    timer = RequestTimer()
+    return timer, _current_timer.set(timer)
+
+
+def stop_request_timer(token):
+    _current_timer.reset(token)
+
+
+def current_timer():
+    return _current_timer.get()
+
+
+@contextmanager
+def span(name):
+    """Time a block as phase `name` of the current request, if any"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class PhaseStats:
+    """
+    Recent phase durations per endpoint
+
+    Each (endpoint, phase) keeps the last `samples` durations plus running
+    count and sum, so memory stays bounded however long the worker lives.
+    """
+
+    def __init__(self, samples=1024):
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def record(self, endpoint, spans):
+        with self._lock:
+            for name, seconds in spans:
+                entry = self._phases.get((endpoint, name))
+                if entry is None:
+                    entry = self._phases[(endpoint, name)] = [0, 0.0, deque(maxlen=self.samples)]
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2].append(seconds)
+
+    def snapshot(self):
+        """{endpoint: {phase: {count, mean_ms, p50_ms, p99_ms, max_ms}}} over the kept samples"""
+        with self._lock:
+            phases = [(key, count, total, sorted(recent)) for key, (count, total, recent) in self._phases.items()]
+
+        result = {}
+        for (endpoint, name), count, total, recent in phases:
+            result.setdefault(endpoint, {})[name] = {
+                'count': count,
+                'mean_ms': round(total / count * 1000, 3),
+                'p50_ms': round(percentile(recent, 0.50) * 1000, 3),
+                'p99_ms': round(percentile(recent, 0.99) * 1000, 3),
+                'max_ms': round(recent[-1] * 1000, 3),
+            }
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._phases.clear()
+
+
+phase_stats = PhaseStats(samples=settings.SERVER_TIMING['SAMPLES'])
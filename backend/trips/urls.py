@@ -1,7 +1,21 @@
 ﻿from django.urls import path
-from . import views
+from . import async_views, job_views, views
 
 urlpatterns = [
     path('trip/', views.TripCalculatorView.as_view(), name='trip-calculator'),
+    path('trip/<str:trip_id>/', views.TripDetailView.as_view(), name='trip-detail'),
+    path('trip/<str:trip_id>/pdf/', views.TripLogSheetView.as_view(sheet_format='pdf'), name='trip-pdf'),
+    path('trip/<str:trip_id>/svg/', views.TripLogSheetView.as_view(sheet_format='svg'), name='trip-svg'),
+    path('trip/<str:trip_id>/export/', views.TripExportView.as_view(), name='trip-export'),
+    path('trips/export/', views.LogRangeExportView.as_view(), name='log-export'),
+    path('trips/batch/', views.TripBatchView.as_view(), name='trip-batch'),
     path('trips/history/', views.TripHistoryView.as_view(), name='trip-history'),
+    path('jobs/', job_views.PlanningJobSubmitView.as_view(), name='planning-job-submit'),
+    path('jobs/<str:job_id>/', job_views.PlanningJobView.as_view(), name='planning-job'),
+    path('jobs/<str:job_id>/result/', job_views.PlanningJobResultView.as_view(), name='planning-job-result'),
+    path('async/trip/', async_views.AsyncTripCalculatorView.as_view(), name='async-trip-calculator'),
+    path('async/trips/history/', async_views.AsyncTripHistoryView.as_view(), name='async-trip-history'),
+    path('hos/regulations/', views.LegalReferencesView.as_view(), name='legal-references'),
+    path('timing/', views.PhaseTimingView.as_view(), name='phase-timing'),
+    path('async/metrics/', async_views.CalculationPoolMetricsView.as_view(), name='async-metrics'),
 ]
\ No newline at end of file
@@ -1,84 +1,138 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from rest_framework import status
+import hashlib
 import json
-from datetime import datetime, timedelta
-import math
+import logging
+import os
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
+from .hos_engine import iter_eld_logs, parse_reported_activities, plan_eld_logs
+from .pagination import KeysetPaginator
+from .exporters import ITERATOR_CHUNK_SIZE, iter_csv, iter_fmcsa_file, iter_jsonl
+from .log_sheet import trip_pdf, trip_svg
+from .renderers import (
+    EXPORT_RENDERER_CLASSES, STREAMING_RENDERER_CLASSES, TRIP_RENDERER_CLASSES, NDJSONRenderer, PDFRenderer,
+    PrometheusRenderer, SVGRenderer, ndjson_line, wants_ndjson
+)
+from .compact import select_fields
+from .serializers import TripHistorySerializer, TripInputSerializer
+from .services.batch_planner import iter_plan_trips, plan_trips
+from .models import EldLog, Trip
+from .services.replanner import LOCATION_FIELDS, ReplanUnavailable, replan_trip
+from .services.trip_planner import (
+    LEGAL_REFERENCES, ComplianceSummary, InvalidTripInput, check_trip_input, estimate_route, generate_trip_id,
+    summarize_compliance
+)
+from .services.trip_store import (
+    TripResultWriter, completed_trips, ensure_content_hash, result_logs, result_logs_prefetch, save_trip_result,
+    trip_to_result
+)
+from .metrics import observe_view, registry, render_prometheus, trip_days, trip_miles, trip_request_seconds, trip_requests
+from .timing import phase_stats, span
+
+logger = logging.getLogger(__name__)
+
+def trip_etag(request, trip):
+    """
+    Weak ETag for one representation of a stored trip
+    
+    The stored content hash identifies the data; the endpoint, the
+    negotiated format and the query string (fields, day, ...) identify
+    the representation.
+    """
+    variant = json.dumps([
+        request.resolver_match.url_name if request.resolver_match else '',
+        request.accepted_renderer.format,
+        sorted(request.query_params.lists()),
+    ])
+    variant_hash = hashlib.sha256(variant.encode()).hexdigest()[:12]
+    return f'W/"{ensure_content_hash(trip)[:32]}-{variant_hash}"'
+
+
+def not_modified(request, etag):
+    """304 response when If-None-Match matches `etag`, else None"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def precondition_failed(request, etag):
+    """
+    412 response when If-Match does not list `etag`, else None
+    
+    Trip ETags are weak (they also name the representation), so they are
+    compared weakly: the ETag from a GET of the same URL guards an update.
+    """
+    header = request.META.get('HTTP_IF_MATCH')
+    if header is None:
+        return None
+    etags = [tag.removeprefix('W/') for tag in parse_etags(header)]
+    if '*' in etags or etag.removeprefix('W/') in etags:
+        return None
+    return Response(
+        {'error': 'Trip has changed since it was read; fetch it again and retry'},
+        status=status.HTTP_412_PRECONDITION_FAILED
+    )
+
+
+def with_etag(response, etag):
+    """Tag a trip response; clients revalidate instead of re-downloading"""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
 
 class TripCalculatorView(APIView):
     """
     API endpoint to calculate trip and generate ELD logs
+    
+    With `Accept: application/x-ndjson` the response is streamed: a trip
+    header line, one line per day as it is calculated, then the summary.
+    
+    `?format=compact` returns the columnar encoding (see trips.compact) and
+    `?fields=trip_id,eld_logs.date,...` keeps only the listed sections.
+    
+    Phases (validate, route, hos, compliance, save) are timed with
+    `span` and reported in the Server-Timing header.
     """
+    renderer_classes = STREAMING_RENDERER_CLASSES
     
+    @observe_view(trip_request_seconds, trip_requests)
     def post(self, request):
         try:
             data = request.data
             
-            # Validate required fields
-            required_fields = ['current_location', 'pickup_location', 'dropoff_location', 'current_cycle_used']
-            for field in required_fields:
-                if field not in data:
-                    return Response(
-                        {'error': f'Missing required field: {field}'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            
-            # Validate current_cycle_used
-            try:
-                current_cycle_used = float(data['current_cycle_used'])
-                if current_cycle_used < 0 or current_cycle_used > 70:
-                    return Response(
-                        {'error': 'current_cycle_used must be between 0 and 70 hours'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            except ValueError:
-                return Response(
-                    {'error': 'current_cycle_used must be a number'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            with span('validate'):
+                error = self.validate_input(data)
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Generate trip ID
-            import uuid
-            trip_id = f"TRIP-{uuid.uuid4().hex[:8].upper()}"
+            # Stream day by day when the client asked for NDJSON
+            if wants_ndjson(request):
+                return self.stream_trip(data)
             
-            # Calculate route information (simplified for now)
-            route_info = self.calculate_route_info(data)
+            response_data = self.calculate_trip(data)
             
-            # Calculate ELD logs
-            eld_logs = self.calculate_eld_logs(data, route_info)
+            # Persist the trip and all of its days in one transaction
+            with span('save'):
+                save_trip_result(data, response_data)
             
-            # Prepare response
-            response_data = {
-                'trip_id': trip_id,
-                'route': route_info,
-                'eld_logs': eld_logs,
-                'compliance_summary': self.generate_compliance_summary(eld_logs),
-                'legal_references': [
-                    {
-                        'section': '49 CFR §395.3(a)(3)',
-                        'title': '11-Hour Driving Limit',
-                        'reference': 'PDF Page 6'
-                    },
-                    {
-                        'section': '49 CFR §395.3(a)(2)',
-                        'title': '14-Hour Driving Window',
-                        'reference': 'PDF Page 6'
-                    },
-                    {
-                        'section': '49 CFR §395.3(a)(3)(ii)',
-                        'title': '30-Minute Break Requirement',
-                        'reference': 'PDF Page 10'
-                    },
-                    {
-                        'section': '49 CFR §395.3(b)',
-                        'title': '70-Hour/8-Day Limit',
-                        'reference': 'PDF Page 10'
-                    }
-                ],
-                'generated_at': datetime.now().isoformat()
-            }
-            
-            return Response(response_data, status=status.HTTP_201_CREATED)
+            return Response(
+                select_fields(response_data, request.query_params.get('fields')),
+                status=status.HTTP_201_CREATED
+            )
             
         except Exception as e:
             return Response(
@@ -86,250 +140,602 @@ class TripCalculatorView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def calculate_route_info(self, data):
-        """Calculate simplified route information"""
-        # For demo purposes, we'll use estimated values
-        # In production, you would integrate with a mapping API
+    def validate_input(self, data):
+        """Return an error message for invalid trip input, or None"""
+        try:
+            check_trip_input(data)
+        except InvalidTripInput as e:
+            return str(e)
+        return None
+    
+    def calculate_trip(self, data):
+        """
+        Route the trip and calculate its ELD logs; returns the response body
         
-        estimated_distance = 1200  # miles
-        estimated_hours = estimated_distance / 55  # Assuming 55 mph average
-        estimated_days = math.ceil(estimated_hours / 11)  # Max 11 hours per day
+        The body also carries the per-day engine `checkpoints`, which
+        save_trip_result stores and removes.
+        """
+        # Generate trip ID
+        trip_id = generate_trip_id()
+        
+        # Calculate route information (per leg, local road routing)
+        with span('route'):
+            route_info = self.calculate_route_info(data)
+        
+        # Calculate ELD logs
+        with span('hos'):
+            eld_logs, checkpoints = self.plan_eld_logs(data, route_info)
+        
+        with span('compliance'):
+            compliance_summary = self.generate_compliance_summary(eld_logs)
+        
+        trip_days.observe(len(eld_logs))
+        trip_miles.observe(route_info['distance_miles'])
         
         return {
-            'distance_miles': estimated_distance,
-            'driving_hours': estimated_hours,
-            'estimated_days': estimated_days,
-            'average_speed': 55,
-            'note': 'Using estimated values for demo purposes'
+            'trip_id': trip_id,
+            'route': route_info,
+            'eld_logs': eld_logs,
+            'compliance_summary': compliance_summary,
+            'legal_references': LEGAL_REFERENCES,
+            'generated_at': datetime.now().isoformat(),
+            'checkpoints': checkpoints,
         }
     
-    def calculate_eld_logs(self, data, route_info):
-        """Calculate ELD logs based on HOS regulations"""
-        current_cycle_used = float(data.get('current_cycle_used', 0))
-        total_driving_hours = route_info['driving_hours']
-        days_needed = math.ceil(total_driving_hours / 11)
+    def stream_trip(self, data):
+        """
+        NDJSON response; days are calculated, saved and sent one at a time
+        
+        The Trip row is created before the response starts, so a database
+        error here is still an ordinary 500 rather than a cut-off stream.
+        """
+        trip_id = generate_trip_id()
+        with span('route'):
+            route_info = self.calculate_route_info(data)
+        writer = TripResultWriter(data, trip_id, route_info)
+        response = StreamingHttpResponse(
+            self.iter_trip_records(data, writer, route_info),
+            content_type=NDJSONRenderer.media_type,
+            status=status.HTTP_201_CREATED
+        )
+        response['X-Trip-Id'] = trip_id
+        return response
+    
+    def iter_trip_records(self, data, writer, route_info):
+        """Yield the trip header, each day, then the compliance summary (or an error record)"""
+        yield ndjson_line({
+            'type': 'trip',
+            'trip_id': writer.trip.trip_id,
+            'route': route_info,
+            'legal_references': LEGAL_REFERENCES,
+            'generated_at': datetime.now().isoformat()
+        })
         
-        eld_logs = []
-        remaining_hours = total_driving_hours
-        cycle_total = current_cycle_used
+        summary = ComplianceSummary()
+        checkpoints = []
+        completed = False
+        try:
+            for day in self.iter_eld_logs(data, route_info, date.today(), checkpoints):
+                writer.add(day, checkpoints[-1])
+                summary.add(day)
+                yield ndjson_line({'type': 'day', **day})
+            writer.finish(summary.as_dict())
+            completed = True
+            trip_days.observe(summary.total_days)
+            trip_miles.observe(route_info['distance_miles'])
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield ndjson_line({'type': 'error', 'error': str(e)})
+        finally:
+            if not completed:
+                try:
+                    writer.abort()
+                except Exception:
+                    # Left incomplete, so readers skip it until purge_incomplete_trips
+                    logger.exception('Could not delete unfinished streamed trip %s', writer.trip.trip_id)
         
-        for day in range(1, days_needed + 1):
-            # Calculate driving hours for this day (max 11)
-            driving_hours = min(11, remaining_hours)
-            
-            # Calculate on-duty hours (driving + other duties)
-            on_duty_hours = min(14, driving_hours + 2.5)  # Add 2.5 hours for other duties
-            
-            # Calculate off-duty hours (must be at least 10)
-            off_duty_hours = max(10, 24 - on_duty_hours)
-            
-            # Update cycle totals
-            cycle_total += on_duty_hours
-            
-            # Check if 30-minute break is needed
-            requires_break = driving_hours > 8
-            
-            # Check for fuel stop (every 1000 miles)
-            has_fuel_stop = (day * 1200 / days_needed) >= 1000
-            
-            # Generate activities
-            activities = self.generate_activities(driving_hours, requires_break, has_fuel_stop)
-            
-            # Generate remarks
-            remarks = self.generate_remarks(day, data)
+        if completed:
+            yield ndjson_line({'type': 'summary', 'compliance_summary': summary.as_dict()})
+    
+    def calculate_route_info(self, data):
+        """Route the trip legs with the local routing engine"""
+        return estimate_route(data)
+    
+    def plan_eld_logs(self, data, route_info, start_date=None):
+        """(ELD logs, per-day checkpoints) from the HOS engine (cached by input hash)"""
+        return plan_eld_logs(data, route_info, start_date or date.today())
+    
+    def iter_eld_logs(self, data, route_info, start_date, checkpoints=None):
+        """Yield each day's log as soon as the engine completes it"""
+        return iter_eld_logs(data, route_info, start_date, checkpoints=checkpoints)
+    
+    def generate_compliance_summary(self, eld_logs):
+        """Generate compliance summary for all logs"""
+        return summarize_compliance(eld_logs)
+
+
+class PhaseTimingView(APIView):
+    """Per-endpoint phase latencies (p50/p99) recorded by ServerTimingMiddleware in this worker"""
+    
+    def get(self, request):
+        return Response({
+            'endpoints': phase_stats.snapshot(),
+            'samples_per_phase': phase_stats.samples,
+            'pid': os.getpid(),
+        })
+
+
+class MetricsView(APIView):
+    """Counters and histograms of every worker, in Prometheus text format"""
+    renderer_classes = [PrometheusRenderer]
+    
+    def get(self, request):
+        return Response(render_prometheus(registry.collect()).encode('utf-8'),
+                        content_type=PrometheusRenderer.content_type)
+
+
+class LegalReferencesView(APIView):
+    """Catalog of the legal references that compact responses send by ID"""
+    
+    def get(self, request):
+        return Response({'legal_references': LEGAL_REFERENCES})
+
+
+class TripDetailView(APIView):
+    """
+    Return a stored trip and its ELD logs without recalculating
+    
+    Supports `?format=compact` and `?fields=` like TripCalculatorView.
+    Responses carry an ETag; `If-None-Match` gets a 304 answered from the
+    Trip row without reading its logs.
+    
+    PATCH updates a trip mid-route: new locations (any of current_location,
+    pickup_location, dropoff_location) and/or `actual_days`, a list of
+    {day_number, activities} the driver reports as driven. Only the days
+    from the first affected one are recalculated (see
+    trips.services.replanner); the response is the updated trip plus a
+    `replan` summary. Send the ETag in `If-Match` to guard against
+    concurrent updates (412). Trips stored before planning checkpoints
+    were kept cannot be replanned (409).
+    """
+    renderer_classes = TRIP_RENDERER_CLASSES
+    
+    def get(self, request, trip_id):
+        try:
+            trip = completed_trips().get(trip_id=trip_id)
+        except Trip.DoesNotExist:
+            return Response(
+                {'error': f'Trip {trip_id} not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        etag = trip_etag(request, trip)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        
+        result = select_fields(trip_to_result(trip, result_logs(trip)), request.query_params.get('fields'))
+        return with_etag(Response(result), etag)
+    
+    def patch(self, request, trip_id):
+        try:
+            locations, actual_days = self.validate_update(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            try:
+                trip = completed_trips().select_for_update().get(trip_id=trip_id)
+            except Trip.DoesNotExist:
+                return Response(
+                    {'error': f'Trip {trip_id} not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
             
-            day_log = {
-                'day_number': day,
-                'date': (datetime.now() + timedelta(days=day-1)).strftime('%Y-%m-%d'),
-                'driving_hours': driving_hours,
-                'on_duty_hours': on_duty_hours,
-                'off_duty_hours': off_duty_hours,
-                'sleeper_hours': 0,
-                'cycle_7day_total': cycle_total if day <= 7 else cycle_total - eld_logs[day-8]['on_duty_hours'] if day > 8 else cycle_total,
-                'cycle_8day_total': cycle_total if day <= 8 else cycle_total - eld_logs[day-9]['on_duty_hours'] if day > 9 else cycle_total,
-                'requires_restart': cycle_total >= 70,
-                'requires_break': requires_break,
-                'has_fuel_stop': has_fuel_stop,
-                'activities': activities,
-                'remarks': remarks,
-                'compliance': self.check_day_compliance(driving_hours, on_duty_hours, off_duty_hours, cycle_total)
-            }
+            failed = precondition_failed(request, trip_etag(request, trip))
+            if failed is not None:
+                return failed
             
-            eld_logs.append(day_log)
-            remaining_hours -= driving_hours
-        
-        return eld_logs
-    
-    def generate_activities(self, driving_hours, requires_break, has_fuel_stop):
-        """Generate activities for the day"""
-        activities = []
-        
-        # Off duty (sleep)
-        activities.append({
-            'status': 'off_duty',
-            'start': '00:00',
-            'end': '05:00',
-            'duration': 5,
-            'description': 'Off duty - rest period'
-        })
+            try:
+                with span('replan'):
+                    result, replan = replan_trip(trip, locations, actual_days)
+            except ReplanUnavailable as e:
+                return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Pre-trip inspection
-        activities.append({
-            'status': 'on_duty',
-            'start': '05:00',
-            'end': '05:30',
-            'duration': 0.5,
-            'description': 'Pre-trip vehicle inspection'
-        })
+        body = select_fields(result, request.query_params.get('fields'))
+        body['replan'] = replan
+        return with_etag(Response(body), trip_etag(request, trip))
+    
+    @staticmethod
+    def validate_update(data):
+        """
+        (locations, {day_number: activities}) from a PATCH body
         
-        # First driving segment
-        first_segment = min(4, driving_hours)
-        activities.append({
-            'status': 'driving',
-            'start': '05:30',
-            'end': self.format_time(5.5 + first_segment),
-            'duration': first_segment,
-            'description': 'Driving'
-        })
+        Raises ValueError with a client-facing message.
+        """
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be a JSON object')
         
-        current_time = 5.5 + first_segment
-        remaining_driving = driving_hours - first_segment
-        
-        # 30-minute break if needed
-        if requires_break:
-            activities.append({
-                'status': 'off_duty',
-                'start': self.format_time(current_time),
-                'end': self.format_time(current_time + 0.5),
-                'duration': 0.5,
-                'description': '30-minute break required after 8 hours'
-            })
-            current_time += 0.5
-        
-        # Second driving segment
-        if remaining_driving > 0:
-            second_segment = remaining_driving
-            activities.append({
-                'status': 'driving',
-                'start': self.format_time(current_time),
-                'end': self.format_time(current_time + second_segment),
-                'duration': second_segment,
-                'description': 'Driving'
-            })
-            current_time += second_segment
-        
-        # Fuel stop if needed
-        if has_fuel_stop:
-            activities.append({
-                'status': 'on_duty',
-                'start': self.format_time(current_time),
-                'end': self.format_time(current_time + 1),
-                'duration': 1,
-                'description': 'Fuel stop - every 1000 miles'
-            })
-            current_time += 1
-        
-        # Post-trip and off-duty
-        activities.append({
-            'status': 'on_duty',
-            'start': self.format_time(current_time),
-            'end': self.format_time(current_time + 0.5),
-            'duration': 0.5,
-            'description': 'Post-trip inspection and paperwork'
-        })
+        locations = {}
+        for field in LOCATION_FIELDS:
+            if field in data:
+                if not isinstance(data[field], str) or not data[field].strip():
+                    raise ValueError(f'{field} must be a non-empty string')
+                locations[field] = data[field].strip()
         
-        return activities
-    
-    def generate_remarks(self, day, data):
-        """Generate remarks for the ELD log"""
-        remarks = [
-            {
-                'time': '05:00',
-                'location': 'Terminal',
-                'description': 'Reported for duty, began pre-trip inspection'
-            }
-        ]
-        
-        if day == 1:
-            remarks.append({
-                'time': '08:00',
-                'location': data.get('pickup_location', 'Pickup Location'),
-                'description': 'Arrived for pickup, 1 hour loading time'
-            })
+        actual_days = {}
+        reported = data.get('actual_days', [])
+        if not isinstance(reported, list):
+            raise ValueError('actual_days must be a list of {day_number, activities}')
+        for day in reported:
+            if not isinstance(day, dict) or not isinstance(day.get('activities'), list):
+                raise ValueError('actual_days must be a list of {day_number, activities}')
+            day_number = day.get('day_number')
+            if not isinstance(day_number, int) or isinstance(day_number, bool) or day_number < 1:
+                raise ValueError('day_number must be a positive integer')
+            if day_number in actual_days:
+                raise ValueError(f'Day {day_number} is reported more than once')
+            try:
+                parse_reported_activities(day['activities'])
+            except (TypeError, ValueError, AttributeError) as e:
+                raise ValueError(f'Day {day_number}: {e}')
+            actual_days[day_number] = day['activities']
         
-        return remarks
+        if not locations and not actual_days:
+            raise ValueError(
+                'Nothing to update; send current_location, pickup_location, dropoff_location or actual_days'
+            )
+        return locations, actual_days
+
+
+class TripLogSheetView(APIView):
+    """
+    Printable daily log sheets for a stored trip, one page per day
     
-    def check_day_compliance(self, driving_hours, on_duty_hours, off_duty_hours, cycle_total):
-        """Check HOS compliance for the day"""
-        violations = []
+    Served as a streamed PDF (`trip/<id>/pdf/`) or a single SVG with the
+    pages stacked vertically (`trip/<id>/svg/`). `?day=N` limits the
+    output to one day.
+    """
+    renderer_classes = [JSONRenderer, PDFRenderer, SVGRenderer]
+    sheet_format = 'pdf'
+    
+    def get(self, request, trip_id):
+        try:
+            trip = completed_trips().get(trip_id=trip_id)
+        except Trip.DoesNotExist:
+            return Response(
+                {'error': f'Trip {trip_id} not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        # Check 11-hour driving limit
-        if driving_hours > 11:
-            violations.append({
-                'rule': '11-hour driving limit (§395.3(a)(3))',
-                'limit': 11,
-                'actual': driving_hours,
-                'status': 'VIOLATION'
-            })
+        day_number = request.query_params.get('day')
+        if day_number is not None:
+            try:
+                day_number = int(day_number)
+            except ValueError:
+                return Response(
+                    {'error': 'day must be a day number'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
-        # Check 14-hour window
-        if on_duty_hours > 14:
-            violations.append({
-                'rule': '14-hour driving window (§395.3(a)(2))',
-                'limit': 14,
-                'actual': on_duty_hours,
-                'status': 'VIOLATION'
-            })
+        etag = trip_etag(request, trip)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
         
-        # Check 10-hour off-duty
-        if off_duty_hours < 10:
-            violations.append({
-                'rule': '10-hour off-duty requirement (§395.3(a)(1))',
-                'limit': 10,
-                'actual': off_duty_hours,
-                'status': 'VIOLATION'
-            })
+        if self.sheet_format == 'svg':
+            pages, content = trip_svg(trip, day_number)
+            content_type = SVGRenderer.media_type
+        else:
+            pages, content = trip_pdf(trip, day_number)
+            content_type = PDFRenderer.media_type
         
-        # Check 70-hour/8-day limit
-        if cycle_total > 70:
-            violations.append({
-                'rule': '70-hour/8-day limit (§395.3(b))',
-                'limit': 70,
-                'actual': cycle_total,
-                'status': 'VIOLATION',
-                'action': '34-hour restart required'
-            })
+        if day_number is not None and not pages:
+            return Response(
+                {'error': f'Trip {trip_id} has no day {day_number}'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        return {
-            'is_compliant': len(violations) == 0,
-            'violations': violations
-        }
+        response = StreamingHttpResponse(content, content_type=content_type)
+        suffix = f'_day{day_number}' if day_number is not None else ''
+        response['Content-Disposition'] = f'inline; filename="ELD_{trip_id}{suffix}.{self.sheet_format}"'
+        return with_etag(response, etag)
+
+
+class TripExportView(APIView):
+    """
+    Export a stored trip's logs as `?format=csv` (default), `jsonl` or
+    `fmcsa` (the ELD output file handed over at roadside inspections)
+    """
+    renderer_classes = EXPORT_RENDERER_CLASSES
     
-    def generate_compliance_summary(self, eld_logs):
-        """Generate compliance summary for all logs"""
-        total_violations = sum(len(log['compliance']['violations']) for log in eld_logs)
-        requires_restart = any(log['requires_restart'] for log in eld_logs)
+    def get(self, request, trip_id):
+        try:
+            trip = completed_trips().get(trip_id=trip_id)
+        except Trip.DoesNotExist:
+            return Response(
+                {'error': f'Trip {trip_id} not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        return {
-            'is_compliant': total_violations == 0,
-            'violation_count': total_violations,
-            'total_trip_hours': sum(log['driving_hours'] for log in eld_logs),
-            'total_days': len(eld_logs),
-            'requires_34hr_restart': requires_restart
-        }
+        etag = trip_etag(request, trip)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        
+        export_format = request.accepted_renderer.format
+        logs = result_logs(trip).order_by('day_number').iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        if export_format == 'fmcsa':
+            content = iter_fmcsa_file(trip, logs)
+            filename = f'ELD_{trip_id}.txt'
+        else:
+            content = iter_csv(logs) if export_format == 'csv' else iter_jsonl(logs)
+            filename = f'ELD_{trip_id}.{export_format}'
+        
+        response = StreamingHttpResponse(content, content_type=request.accepted_renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return with_etag(response, etag)
+
+
+class LogRangeExportView(APIView):
+    """
+    Export every stored log day between `start` and `end` (YYYY-MM-DD,
+    inclusive) as `?format=csv` (default) or `jsonl`
     
-    def format_time(self, decimal_hours):
-        """Format decimal hours to HH:MM"""
-        hours = int(decimal_hours)
-        minutes = int((decimal_hours - hours) * 60)
-        return f"{hours:02d}:{minutes:02d}"
+    Rows are streamed from a chunked queryset iterator, so long ranges are
+    never loaded into memory at once.
+    """
+    renderer_classes = EXPORT_RENDERER_CLASSES
+    
+    def get(self, request):
+        export_format = request.accepted_renderer.format
+        if export_format == 'fmcsa':
+            return Response(
+                {'error': 'The ELD output file covers one record of duty status; export it per trip'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            start = parse_date(request.query_params.get('start') or '')
+            end = parse_date(request.query_params.get('end') or '')
+        except ValueError:
+            start = end = None
+        if start is None or end is None or end < start:
+            return Response(
+                {'error': 'start and end must be dates (YYYY-MM-DD) with start <= end'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        logs = (
+            EldLog.objects
+            .defer('checkpoint')
+            .filter(date__range=(start, end), trip__is_complete=True)
+            .select_related('trip')
+            .order_by('date', 'trip_id', 'day_number')
+            .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        )
+        content = iter_csv(logs) if export_format == 'csv' else iter_jsonl(logs)
+        response = StreamingHttpResponse(content, content_type=request.accepted_renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="eld_logs_{start}_{end}.{export_format}"'
+        return response
 
 
 class TripHistoryView(APIView):
-    """View to get trip history (simplified for now)"""
+    """
+    Trip history with keyset pagination
+    
+    Query parameters:
+      cursor            opaque cursor from the previous page's next_cursor
+      limit             page size (default 20, max 100)
+      location          case-insensitive prefix of the current, pickup or
+                        dropoff location ("dallas" matches "Dallas, TX")
+      created_after     YYYY-MM-DD, inclusive
+      created_before    YYYY-MM-DD, inclusive
+      compliant         true / false
+      summary           true to omit route and ELD logs
+      format            compact for the columnar encoding of ELD logs
+    """
+    
+    SUMMARY_FIELDS = TripHistorySerializer.Meta.fields + ['id']
+    renderer_classes = TRIP_RENDERER_CLASSES
     
     def get(self, request):
-        return Response({
-            'message': 'Trip history endpoint',
-            'note': 'This would return trip history from database in production'
+        params = request.query_params
+        try:
+            trips, summary_only = self.filter_trips(params)
+            paginator = KeysetPaginator(params.get('limit'))
+            page, next_cursor = paginator.paginate(trips, params.get('cursor'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(self.page_body(page, next_cursor, summary_only))
+    
+    @classmethod
+    def filter_trips(cls, params):
+        """
+        (queryset, summary_only) for the query parameters
+        
+        Raises ValueError with a client-facing message for bad parameters.
+        """
+        trips = completed_trips()
+        
+        location = params.get('location', '').strip().lower()
+        if location:
+            trips = trips.alias(**{f'{field}_lower': Lower(field) for field in LOCATION_FIELDS})
+            trips = trips.filter(cls.location_prefix_match(location))
+        
+        # Date bounds become created_at ranges so the index can be used
+        tz = timezone.get_current_timezone()
+        for param, lookup, offset in (('created_after', 'created_at__gte', 0),
+                                      ('created_before', 'created_at__lt', 1)):
+            if params.get(param):
+                day = parse_date(params[param])
+                if day is None:
+                    raise ValueError(f'{param} must be a date (YYYY-MM-DD)')
+                bound = datetime.combine(day + timedelta(days=offset), datetime.min.time())
+                trips = trips.filter(**{lookup: timezone.make_aware(bound, tz)})
+        
+        compliant = params.get('compliant')
+        if compliant is not None:
+            if compliant.lower() not in ('true', 'false'):
+                raise ValueError('compliant must be true or false')
+            trips = trips.filter(is_compliant=compliant.lower() == 'true')
+        
+        summary_only = params.get('summary', '').lower() == 'true'
+        if summary_only:
+            trips = trips.only(*cls.SUMMARY_FIELDS)
+        else:
+            trips = trips.prefetch_related(result_logs_prefetch())
+        return trips, summary_only
+    
+    @staticmethod
+    def location_prefix_match(prefix):
+        """
+        Q for trips with a location starting with the lowercase `prefix`
+        
+        The range on lower(location) is what the functional indexes serve
+        (a substring match could only scan); startswith keeps the result
+        exact under any database collation.
+        """
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        match = Q()
+        for field in LOCATION_FIELDS:
+            match |= Q(**{
+                f'{field}_lower__gte': prefix,
+                f'{field}_lower__lt': upper,
+                f'{field}_lower__startswith': prefix,
+            })
+        return match
+    
+    @staticmethod
+    def page_body(page, next_cursor, summary_only):
+        """Response body for one page of trips (no queries; logs are prefetched)"""
+        results = TripHistorySerializer(page, many=True).data
+        if not summary_only:
+            for row, trip in zip(results, page):
+                stored = trip_to_result(trip)
+                row['route'] = stored['route']
+                row['eld_logs'] = stored['eld_logs']
+        
+        return {
+            'results': results,
+            'count': len(results),
+            'next_cursor': next_cursor
+        }
+
+
+class TripBatchView(APIView):
+    """
+    API endpoint to plan many trips in one request
+    
+    Accepts a JSON array of trip inputs (or {"trips": [...]}) and returns
+    one result per trip, in input order. With `Accept: application/x-ndjson`
+    each result is streamed as soon as it is ready, followed by a summary.
+    """
+    renderer_classes = STREAMING_RENDERER_CLASSES
+    
+    def post(self, request):
+        try:
+            results, valid_indexes, valid_trips = self.validate_batch(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if wants_ndjson(request):
+            return StreamingHttpResponse(
+                self.iter_batch_records(results, valid_indexes, valid_trips),
+                content_type=NDJSONRenderer.media_type
+            )
+        
+        return Response(self.run_batch(results, valid_indexes, valid_trips), status=status.HTTP_200_OK)
+    
+    @staticmethod
+    def check_batch_size(trips):
+        """The trip list from a request body; raises ValueError when it is not acceptable"""
+        if isinstance(trips, dict):
+            trips = trips.get('trips')
+        
+        if not isinstance(trips, list) or not trips:
+            raise ValueError('Expected a non-empty array of trips')
+        
+        max_trips = settings.TRIP_BATCH['MAX_TRIPS']
+        if len(trips) > max_trips:
+            raise ValueError(f'A batch may contain at most {max_trips} trips')
+        return trips
+    
+    @classmethod
+    def validate_batch(cls, trips):
+        """
+        (results, valid_indexes, valid_trips) for a request body
+        
+        Invalid trips already have their error result; the others are
+        left as None for run_batch to fill in.
+        """
+        trips = cls.check_batch_size(trips)
+        
+        # Validate every trip up front; only valid ones go to the pool
+        results = [None] * len(trips)
+        valid_indexes = []
+        valid_trips = []
+        for index, trip in enumerate(trips):
+            serializer = TripInputSerializer(data=trip)
+            if serializer.is_valid():
+                valid_indexes.append(index)
+                valid_trips.append(dict(serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+        return results, valid_indexes, valid_trips
+    
+    @staticmethod
+    def save_outcome(trip_data, outcome):
+        """Store a planned trip; a failed write becomes that trip's error, like a failed calculation"""
+        if outcome['status'] != 'ok':
+            return outcome
+        try:
+            save_trip_result(trip_data, outcome['trip'])
+        except Exception as e:
+            logger.exception('Saving a batch trip failed')
+            return {'status': 'error', 'errors': {'non_field_errors': [f'Could not save trip: {e}']}}
+        return outcome
+    
+    @staticmethod
+    def run_batch(results, valid_indexes, valid_trips):
+        """Plan and store the valid trips; returns the response body"""
+        return TripBatchView.store_batch(results, valid_indexes, valid_trips, plan_trips(valid_trips))
+    
+    @staticmethod
+    def store_batch(results, valid_indexes, valid_trips, outcomes):
+        """Store the planning outcomes of the valid trips; returns the response body"""
+        for index, trip_data, outcome in zip(valid_indexes, valid_trips, outcomes):
+            results[index] = {'index': index, **TripBatchView.save_outcome(trip_data, outcome)}
+        
+        succeeded = sum(1 for result in results if result['status'] == 'ok')
+        return {
+            'count': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+            'generated_at': datetime.now().isoformat()
+        }
+    
+    def iter_batch_records(self, results, valid_indexes, valid_trips):
+        """Yield one line per trip in input order, then the batch totals"""
+        outcomes = iter_plan_trips(valid_trips)
+        valid = dict(zip(valid_indexes, valid_trips))
+        succeeded = 0
+        for index, result in enumerate(results):
+            if result is None:
+                outcome = TripBatchView.save_outcome(valid[index], next(outcomes))
+                if outcome['status'] == 'ok':
+                    succeeded += 1
+                result = {'index': index, **outcome}
+            yield ndjson_line({'type': 'result', **result})
+        
+        yield ndjson_line({
+            'type': 'summary',
+            'count': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'generated_at': datetime.now().isoformat()
         })
\ No newline at end of file
@@ -84,6 +84,36 @@ export const tripAPI = {
   }),
 };
 
+// Background planning jobs: long runs are queued and polled instead of
+// holding one request open past the 30-second timeout
+export const jobAPI = {
+  // Queue a trip ({...trip}) or a batch ([...trips])
+  submitTrip: (tripData) => api.post('/jobs/', { kind: 'trip', input: tripData }),
+  submitBatch: (trips) => api.post('/jobs/', { kind: 'batch', input: trips }),
+  
+  // Job status: queued, running, succeeded or failed
+  getJob: (jobId) => api.get(`/jobs/${jobId}/`),
+  
+  // Response body of a finished job
+  getResult: (jobId) => api.get(`/jobs/${jobId}/result/`),
+  
+  // Poll until the job finishes, then resolve with its result
+  waitForResult: async (jobId, { interval = 2000, timeout = 15 * 60 * 1000 } = {}) => {
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+      const { data } = await api.get(`/jobs/${jobId}/`);
+      if (data.status === 'succeeded') {
+        return api.get(`/jobs/${jobId}/result/`);
+      }
+      if (data.status === 'failed') {
+        throw new Error(data.error || 'Planning job failed');
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+    throw new Error('Timed out waiting for planning job');
+  },
+};
+
 // HOS Regulations API
 export const hosAPI = {
   // Get HOS regulations reference